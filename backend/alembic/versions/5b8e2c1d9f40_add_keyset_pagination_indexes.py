@@ -0,0 +1,35 @@
+"""Add keyset pagination indexes for cards and public decks
+
+Revision ID: 5b8e2c1d9f40
+Revises: 77dd7a25cc76
+Create Date: 2026-10-19 11:30:12.418205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2c1d9f40'
+down_revision: Union[str, Sequence[str], None] = '77dd7a25cc76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cards_deck_id_id', 'cards', ['deck_id', 'id'], unique=False)
+    op.create_index('ix_cards_deck_id_created_at_id', 'cards', ['deck_id', 'created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_decks_public_last_modified_id', 'decks', ['last_modified', 'id'],
+        unique=False, postgresql_where=sa.text('is_public')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_decks_public_last_modified_id', table_name='decks')
+    op.drop_index('ix_cards_deck_id_created_at_id', table_name='cards')
+    op.drop_index('ix_cards_deck_id_id', table_name='cards')
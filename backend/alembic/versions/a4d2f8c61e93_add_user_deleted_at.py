@@ -0,0 +1,28 @@
+"""Add deleted_at to users for asynchronous account deletion
+
+Revision ID: a4d2f8c61e93
+Revises: f2a7d9c4e8b1
+Create Date: 2026-10-19 18:42:05.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d2f8c61e93'
+down_revision: Union[str, Sequence[str], None] = 'f2a7d9c4e8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'deleted_at')
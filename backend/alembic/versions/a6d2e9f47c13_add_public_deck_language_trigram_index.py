@@ -0,0 +1,32 @@
+"""Add a trigram index on public deck languages for catalog search
+
+Revision ID: a6d2e9f47c13
+Revises: f3c8a1d5e762
+Create Date: 2026-10-19 23:31:08.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2e9f47c13'
+down_revision: Union[str, Sequence[str], None] = 'f3c8a1d5e762'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_decks_public_language_trgm', 'decks', ['language'],
+        unique=False, postgresql_using='gin', postgresql_ops={'language': 'gin_trgm_ops'},
+        postgresql_where=sa.text('is_public')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_decks_public_language_trgm', table_name='decks')
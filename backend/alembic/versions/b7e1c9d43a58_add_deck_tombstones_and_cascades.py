@@ -0,0 +1,63 @@
+"""Add deck tombstones and ON DELETE CASCADE to deck foreign keys
+
+Revision ID: b7e1c9d43a58
+Revises: a4d2f8c61e93
+Create Date: 2026-10-19 19:20:48.531907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e1c9d43a58'
+down_revision: Union[str, Sequence[str], None] = 'a4d2f8c61e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('decks', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_decks_deleted_at', 'decks', ['deleted_at'],
+        postgresql_where=sa.text('deleted_at IS NOT NULL')
+    )
+
+    # Deleting a deck row removes its cards and study sessions; decks
+    # subscribed to it lose the subscription
+    op.drop_constraint('cards_deck_id_fkey', 'cards', type_='foreignkey')
+    op.drop_constraint('study_sessions_deck_id_fkey', 'study_sessions', type_='foreignkey')
+    op.drop_constraint('decks_subscribed_deck_id_fkey', 'decks', type_='foreignkey')
+
+    op.create_foreign_key(
+        'cards_deck_id_fkey', 'cards', 'decks',
+        ['deck_id'], ['id'],
+        ondelete='CASCADE'
+    )
+    op.create_foreign_key(
+        'study_sessions_deck_id_fkey', 'study_sessions', 'decks',
+        ['deck_id'], ['id'],
+        ondelete='CASCADE'
+    )
+    op.create_foreign_key(
+        'decks_subscribed_deck_id_fkey', 'decks', 'decks',
+        ['subscribed_deck_id'], ['id'],
+        ondelete='SET NULL'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('cards_deck_id_fkey', 'cards', type_='foreignkey')
+    op.drop_constraint('study_sessions_deck_id_fkey', 'study_sessions', type_='foreignkey')
+    op.drop_constraint('decks_subscribed_deck_id_fkey', 'decks', type_='foreignkey')
+
+    op.create_foreign_key('cards_deck_id_fkey', 'cards', 'decks', ['deck_id'], ['id'])
+    op.create_foreign_key('study_sessions_deck_id_fkey', 'study_sessions', 'decks', ['deck_id'], ['id'])
+    op.create_foreign_key('decks_subscribed_deck_id_fkey', 'decks', 'decks', ['subscribed_deck_id'], ['id'])
+
+    op.drop_index('ix_decks_deleted_at', table_name='decks')
+    op.drop_column('decks', 'deleted_at')
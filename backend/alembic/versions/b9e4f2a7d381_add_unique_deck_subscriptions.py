@@ -0,0 +1,74 @@
+"""Allow one subscription per user and source deck
+
+Revision ID: b9e4f2a7d381
+Revises: a6d2e9f47c13
+Create Date: 2026-10-19 23:48:22.105736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e4f2a7d381'
+down_revision: Union[str, Sequence[str], None] = 'a6d2e9f47c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Extra subscriptions (self-subscriptions included) are detached like before a source deck is deleted:
+    # their inherited cards become cards of their own and the subscription ends
+    op.execute("""
+        CREATE TEMPORARY TABLE detached_subscriptions ON COMMIT DROP AS
+        SELECT d.id FROM decks d
+        JOIN decks source ON source.id = d.subscribed_deck_id
+        WHERE d.deleted_at IS NULL AND (
+            source.user_id = d.user_id
+            OR EXISTS (
+                SELECT 1 FROM decks k
+                WHERE k.user_id = d.user_id AND k.subscribed_deck_id = d.subscribed_deck_id
+                  AND k.deleted_at IS NULL AND k.id < d.id
+            )
+        )
+    """)
+    op.execute("""
+        INSERT INTO sync_tombstones (user_id, deck_id, card_id, deleted_at)
+        SELECT d.user_id, d.id, s.id, now()
+        FROM decks d
+        JOIN cards s ON s.deck_id = d.subscribed_deck_id
+        LEFT JOIN card_review_states st ON st.deck_id = d.id AND st.card_id = s.id
+        WHERE d.id IN (SELECT id FROM detached_subscriptions)
+          AND NOT coalesce(st.hidden, false)
+          AND NOT EXISTS (SELECT 1 FROM cards c WHERE c.deck_id = d.id AND c.source_card_id = s.id)
+    """)
+    op.execute("""
+        INSERT INTO cards (deck_id, source_card_id, front, back, accuracy, total_attempts, correct_answers,
+                           last_reviewed_at, created_at, audio_path, custom_data)
+        SELECT d.id, s.id, s.front, s.back, coalesce(st.accuracy, 0.0), coalesce(st.total_attempts, 0),
+               coalesce(st.correct_answers, 0), st.last_reviewed_at, s.created_at, s.audio_path, s.custom_data
+        FROM decks d
+        JOIN cards s ON s.deck_id = d.subscribed_deck_id
+        LEFT JOIN card_review_states st ON st.deck_id = d.id AND st.card_id = s.id
+        WHERE d.id IN (SELECT id FROM detached_subscriptions)
+          AND NOT coalesce(st.hidden, false)
+          AND NOT EXISTS (SELECT 1 FROM cards c WHERE c.deck_id = d.id AND c.source_card_id = s.id)
+    """)
+    op.execute("DELETE FROM card_review_states WHERE deck_id IN (SELECT id FROM detached_subscriptions)")
+    op.execute("""
+        UPDATE decks SET subscribed_deck_id = NULL, version = version + 1
+        WHERE id IN (SELECT id FROM detached_subscriptions)
+    """)
+
+    op.create_index(
+        'uq_decks_user_id_subscribed_deck_id', 'decks', ['user_id', 'subscribed_deck_id'],
+        unique=True, postgresql_where=sa.text('subscribed_deck_id IS NOT NULL AND deleted_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_decks_user_id_subscribed_deck_id', table_name='decks')
@@ -0,0 +1,52 @@
+"""Add full-text and trigram search indexes for the public catalog
+
+Revision ID: c3a9d7e4b215
+Revises: 5b8e2c1d9f40
+Create Date: 2026-10-19 11:52:40.126734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9d7e4b215'
+down_revision: Union[str, Sequence[str], None] = '5b8e2c1d9f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column('decks', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', coalesce(name, ''))", persisted=True),
+        nullable=True
+    ))
+    op.create_index(
+        'ix_decks_public_search_vector', 'decks', ['search_vector'],
+        unique=False, postgresql_using='gin', postgresql_where=sa.text('is_public')
+    )
+    op.create_index(
+        'ix_decks_public_name_trgm', 'decks', ['name'],
+        unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+        postgresql_where=sa.text('is_public')
+    )
+    op.create_index(
+        'ix_users_name_trgm', 'users', ['name'],
+        unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_name_trgm', table_name='users')
+    op.drop_index('ix_decks_public_name_trgm', table_name='decks')
+    op.drop_index('ix_decks_public_search_vector', table_name='decks')
+    op.drop_column('decks', 'search_vector')
@@ -0,0 +1,46 @@
+"""Add card updated_at and the sync tombstone log for delta sync
+
+Revision ID: c5f0a2e87d16
+Revises: b7e1c9d43a58
+Create Date: 2026-10-19 20:05:17.640291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f0a2e87d16'
+down_revision: Union[str, Sequence[str], None] = 'b7e1c9d43a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default doesn't rewrite the table; existing cards count as changed at migration time
+    op.add_column('cards', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+    op.create_index('ix_cards_deck_id_updated_at', 'cards', ['deck_id', 'updated_at'], unique=False)
+
+    op.create_table('sync_tombstones',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('deck_id', sa.Integer(), nullable=False),
+        sa.Column('card_id', sa.Integer(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.uid'], ondelete='CASCADE', onupdate='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_tombstones_user_id_deleted_at', 'sync_tombstones', ['user_id', 'deleted_at'], unique=False)
+    op.create_index('ix_sync_tombstones_deck_id_deleted_at', 'sync_tombstones', ['deck_id', 'deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sync_tombstones_deck_id_deleted_at', table_name='sync_tombstones')
+    op.drop_index('ix_sync_tombstones_user_id_deleted_at', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+    op.drop_index('ix_cards_deck_id_updated_at', table_name='cards')
+    op.drop_column('cards', 'updated_at')
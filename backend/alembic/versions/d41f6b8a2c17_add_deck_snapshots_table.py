@@ -0,0 +1,38 @@
+"""Add deck_snapshots table for published public deck card lists
+
+Revision ID: d41f6b8a2c17
+Revises: c3a9d7e4b215
+Create Date: 2026-10-19 14:05:41.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f6b8a2c17'
+down_revision: Union[str, Sequence[str], None] = 'c3a9d7e4b215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'deck_snapshots',
+        sa.Column('deck_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('source_modified', sa.DateTime(), nullable=False),
+        sa.Column('card_count', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['deck_id'], ['decks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('deck_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('deck_snapshots')
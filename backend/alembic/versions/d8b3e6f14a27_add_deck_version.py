@@ -0,0 +1,29 @@
+"""Add deck version for conditional GETs of the deck endpoints
+
+Revision ID: d8b3e6f14a27
+Revises: c5f0a2e87d16
+Create Date: 2026-10-19 21:12:44.108362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3e6f14a27'
+down_revision: Union[str, Sequence[str], None] = 'c5f0a2e87d16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default doesn't rewrite the table
+    op.add_column('decks', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('decks', 'version')
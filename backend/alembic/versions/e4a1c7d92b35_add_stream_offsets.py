@@ -0,0 +1,33 @@
+"""Add stream offsets for folding buffered study answers into cards
+
+Revision ID: e4a1c7d92b35
+Revises: d8b3e6f14a27
+Create Date: 2026-10-19 22:03:51.527904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a1c7d92b35'
+down_revision: Union[str, Sequence[str], None] = 'd8b3e6f14a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stream_offsets',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('last_id', sa.String(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stream_offsets')
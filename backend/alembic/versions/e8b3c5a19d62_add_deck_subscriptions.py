@@ -0,0 +1,56 @@
+"""Add copy-on-write deck subscriptions
+
+Revision ID: e8b3c5a19d62
+Revises: d41f6b8a2c17
+Create Date: 2026-10-19 15:22:08.613970
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3c5a19d62'
+down_revision: Union[str, Sequence[str], None] = 'd41f6b8a2c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('decks', sa.Column('subscribed_deck_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('decks_subscribed_deck_id_fkey', 'decks', 'decks', ['subscribed_deck_id'], ['id'])
+    op.create_index(op.f('ix_decks_subscribed_deck_id'), 'decks', ['subscribed_deck_id'], unique=False)
+
+    op.add_column('cards', sa.Column('source_card_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'cards_source_card_id_fkey', 'cards', 'cards', ['source_card_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index('ix_cards_deck_id_source_card_id', 'cards', ['deck_id', 'source_card_id'], unique=False)
+
+    op.create_table(
+        'card_review_states',
+        sa.Column('deck_id', sa.Integer(), nullable=False),
+        sa.Column('card_id', sa.Integer(), nullable=False),
+        sa.Column('accuracy', sa.Float(), nullable=False),
+        sa.Column('total_attempts', sa.Integer(), nullable=False),
+        sa.Column('correct_answers', sa.Integer(), nullable=False),
+        sa.Column('last_reviewed_at', sa.DateTime(), nullable=True),
+        sa.Column('hidden', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.ForeignKeyConstraint(['card_id'], ['cards.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['deck_id'], ['decks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('deck_id', 'card_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('card_review_states')
+    op.drop_index('ix_cards_deck_id_source_card_id', table_name='cards')
+    op.drop_constraint('cards_source_card_id_fkey', 'cards', type_='foreignkey')
+    op.drop_column('cards', 'source_card_id')
+    op.drop_index(op.f('ix_decks_subscribed_deck_id'), table_name='decks')
+    op.drop_constraint('decks_subscribed_deck_id_fkey', 'decks', type_='foreignkey')
+    op.drop_column('decks', 'subscribed_deck_id')
@@ -0,0 +1,30 @@
+"""Add columns for pulling updates into copied decks
+
+Revision ID: f2a7d9c4e8b1
+Revises: e8b3c5a19d62
+Create Date: 2026-10-19 16:10:37.275514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7d9c4e8b1'
+down_revision: Union[str, Sequence[str], None] = 'e8b3c5a19d62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cards', sa.Column('source_hash', sa.String(length=32), nullable=True))
+    op.add_column('decks', sa.Column('last_synced_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('decks', 'last_synced_at')
+    op.drop_column('cards', 'source_hash')
@@ -0,0 +1,38 @@
+"""Make the keyset pagination sort columns NOT NULL
+
+Revision ID: f3c8a1d5e762
+Revises: e4a1c7d92b35
+Create Date: 2026-10-19 23:12:40.318255
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8a1d5e762'
+down_revision: Union[str, Sequence[str], None] = 'e4a1c7d92b35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A NULL sort key makes the cursor's row-value comparison NULL and ends paging early
+    op.execute("UPDATE decks SET created_at = now() WHERE created_at IS NULL")
+    op.execute("UPDATE decks SET last_modified = created_at WHERE last_modified IS NULL")
+    op.execute("UPDATE cards SET created_at = now() WHERE created_at IS NULL")
+
+    op.alter_column('decks', 'created_at', existing_type=sa.DateTime(), nullable=False, server_default=sa.func.now())
+    op.alter_column('decks', 'last_modified', existing_type=sa.DateTime(), nullable=False,
+                    server_default=sa.func.now())
+    op.alter_column('cards', 'created_at', existing_type=sa.DateTime(), nullable=False, server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('cards', 'created_at', existing_type=sa.DateTime(), nullable=True, server_default=None)
+    op.alter_column('decks', 'last_modified', existing_type=sa.DateTime(), nullable=True, server_default=None)
+    op.alter_column('decks', 'created_at', existing_type=sa.DateTime(), nullable=True, server_default=None)
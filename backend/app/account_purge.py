@@ -0,0 +1,215 @@
+"""
+Background purge of deleted accounts.
+
+Deleting an account only marks the user as deleted (``User.deleted_at``) and
+unpublishes their decks; this job then removes the data in bounded batches,
+each in its own short transaction, so no single statement holds locks for
+long however large the account is:
+
+    study sessions -> analytics -> per deck: subscribers detached, review
+    states, cards (and the voice files only they referenced), the deck
+    -> the user row -> the Firebase user
+
+Every step deletes whatever is left, so an interrupted purge is simply run
+again. Progress is published to the shared cache.
+
+Usage:
+    python -m app.account_purge         # purge every account marked deleted
+"""
+
+import argparse
+from datetime import datetime
+from typing import Optional, Set
+import logging
+
+from firebase_admin import auth
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models import (
+    User as UserORM, Deck as DeckORM, Card as CardORM, CardReviewState as CardReviewStateORM,
+    StudySession as StudySessionORM, TestAnalytics as TestAnalyticsORM
+)
+from app.schemas import AccountDeletionProgress
+from app.cache import blob_cache
+from app.audio_gc import AudioGarbageCollector
+from app.deck_tombstones import INCLUDE_DELETED_DECKS, detach_subscribers_in_batches, register as register_tombstones
+from app.voice_service import voice_generator
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 1000
+PURGE_PROGRESS_TTL_SECONDS = 7 * 24 * 3600
+
+
+def _progress_key(user_id: str) -> str:
+    return f"account_deletion:{user_id}"
+
+
+class AccountPurgeProgressTracker:
+    """Publishes a purge's progress to the shared cache, where any replica can read it"""
+
+    def __init__(self, user_id: str, requested_at: Optional[datetime] = None):
+        self.user_id = user_id
+        now = datetime.utcnow()
+        self.progress = AccountDeletionProgress(status="pending", requested_at=requested_at or now, updated_at=now)
+
+    def update(self, **changes):
+        for name, value in changes.items():
+            setattr(self.progress, name, value)
+        self.progress.updated_at = datetime.utcnow()
+        blob_cache.set(
+            _progress_key(self.user_id),
+            {"progress": self.progress.model_dump_json().encode("utf-8")},
+            ttl=PURGE_PROGRESS_TTL_SECONDS
+        )
+
+
+def get_purge_progress(user_id: str) -> Optional[AccountDeletionProgress]:
+    fields = blob_cache.get(_progress_key(user_id))
+    return AccountDeletionProgress.model_validate_json(fields["progress"]) if fields else None
+
+
+class AccountPurgeService:
+    def __init__(self, db: Session, batch_size: int = PURGE_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.gc = AudioGarbageCollector(db)
+        self.deleted_audio: Set[str] = set()
+
+    def _delete_in_batches(self, model, key, *conditions) -> int:
+        """Delete matching rows batch_size at a time (selected by key), committing after each batch"""
+        deleted = 0
+        while True:
+            batch = select(key).where(*conditions).limit(self.batch_size).scalar_subquery()
+            count = self.db.execute(delete(model).where(key.in_(batch), *conditions)).rowcount
+            self.db.commit()
+            if not count:
+                return deleted
+            deleted += count
+
+    def _purge_cards(self, deck_id: int, tracker: AccountPurgeProgressTracker):
+        while True:
+            batch = select(CardORM.id).where(CardORM.deck_id == deck_id).limit(self.batch_size).scalar_subquery()
+            audio_paths = [
+                audio_path for (audio_path,) in self.db.execute(
+                    delete(CardORM).where(CardORM.id.in_(batch)).returning(CardORM.audio_path)
+                )
+            ]
+            self.db.commit()
+            if not audio_paths:
+                return
+
+            # Voice files are shared by every card with the same word, so only
+            # those nothing references any more are removed
+            self.deleted_audio |= self.gc.delete_unreferenced(path for path in audio_paths if path)
+            tracker.update(
+                deleted_cards=tracker.progress.deleted_cards + len(audio_paths),
+                deleted_audio_files=len(self.deleted_audio)
+            )
+
+    def _purge_deck(self, deck_id: int, tracker: AccountPurgeProgressTracker):
+        # Other users' subscriptions to the deck become private copies
+        detach_subscribers_in_batches(self.db, deck_id)
+        self._delete_in_batches(
+            CardReviewStateORM, CardReviewStateORM.card_id, CardReviewStateORM.deck_id == deck_id
+        )
+        self._purge_cards(deck_id, tracker)
+        # Snapshots and the user's own review states cascade
+        self.db.execute(delete(DeckORM).where(DeckORM.id == deck_id))
+        self.db.commit()
+        tracker.update(deleted_decks=tracker.progress.deleted_decks + 1)
+
+    def purge(self, user_id: str, tracker: Optional[AccountPurgeProgressTracker] = None) -> AccountDeletionProgress:
+        """Delete everything of an account marked deleted, in batches. Does nothing for other accounts."""
+        user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
+        tracker = tracker or AccountPurgeProgressTracker(user_id, user.deleted_at if user else None)
+        if not user or not user.deleted_at:
+            tracker.update(status="failed", message="Account is not marked for deletion")
+            return tracker.progress
+
+        try:
+            total_cards = self.db.scalar(
+                select(func.count()).select_from(CardORM).join(DeckORM, CardORM.deck_id == DeckORM.id)
+                .where(DeckORM.user_id == user_id).execution_options(**{INCLUDE_DELETED_DECKS: True})
+            )
+            tracker.update(status="running", total_cards=total_cards)
+
+            deleted_sessions = self._delete_in_batches(
+                StudySessionORM, StudySessionORM.id, StudySessionORM.user_id == user_id
+            )
+            tracker.update(deleted_study_sessions=deleted_sessions)
+            self.db.execute(delete(TestAnalyticsORM).where(TestAnalyticsORM.user_id == user_id))
+
+            # The user's own subscriptions are deleted with their decks, not materialized
+            self.db.execute(
+                update(DeckORM).where(DeckORM.user_id == user_id, DeckORM.subscribed_deck_id.isnot(None))
+                .values(subscribed_deck_id=None).execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+
+            # Tombstoned decks not reaped yet are purged too
+            deck_ids = list(self.db.scalars(
+                select(DeckORM.id).where(DeckORM.user_id == user_id)
+                .execution_options(**{INCLUDE_DELETED_DECKS: True})
+            ))
+            for deck_id in deck_ids:
+                self._purge_deck(deck_id, tracker)
+
+            self.db.execute(delete(UserORM).where(UserORM.uid == user_id))
+            self.db.commit()
+
+            try:
+                auth.delete_user(user_id)
+            except Exception as firebase_error:
+                # The account data is gone either way; the login is disabled already
+                logger.warning(f"Failed to delete Firebase user {user_id}: {firebase_error}")
+
+            tracker.update(status="completed")
+            logger.info(
+                f"Purged account {user_id}: {tracker.progress.deleted_decks} decks, "
+                f"{tracker.progress.deleted_cards} cards, {len(self.deleted_audio)} voice files"
+            )
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Failed to purge account {user_id}: {str(e)}")
+            tracker.update(status="failed", message=str(e))
+        finally:
+            # Entries are dropped as each file is deleted; this catches the ones cached
+            # before the path index existed, even when the purge stops half-way
+            voice_generator.purge_cached_paths(self.deleted_audio)
+        return tracker.progress
+
+
+def purge_account(user_id: str):
+    """Background task entry point: purge an account in a session of its own"""
+    from app.database import SessionLocal
+
+    register_tombstones()
+    db = SessionLocal()
+    try:
+        AccountPurgeService(db).purge(user_id)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Purge the data of accounts marked deleted")
+    parser.add_argument("--batch-size", type=int, default=PURGE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+
+    register_tombstones()
+    db = SessionLocal()
+    try:
+        user_ids = list(db.scalars(select(UserORM.uid).where(UserORM.deleted_at.isnot(None))))
+        for user_id in user_ids:
+            progress = AccountPurgeService(db, batch_size=args.batch_size).purge(user_id)
+            print(f"{user_id}: {progress.status} ({progress.deleted_cards} cards, {progress.deleted_decks} decks)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Buffer of study answers reported one at a time.
+
+``POST /study/sessions/{id}/answers`` appends each answer to a Redis stream
+(one XADD), which makes it durable without a database transaction per card
+flip. The flusher folds the buffered answers into card statistics (review
+states for inherited cards) in batches: one SELECT and one bulk UPDATE per
+batch, deck rollups included.
+
+The last folded stream entry is stored in ``stream_offsets`` and committed
+with the statistics it produced, so a batch is applied exactly once even if
+the flusher dies half-way; folded entries are trimmed from the stream
+afterwards.
+
+Without Redis there is nothing to buffer into and answers are written to the
+database as they arrive.
+
+The flusher runs as the ``answer-flusher`` service of docker-compose.yml.
+
+Usage:
+    python -m app.answer_buffer                 # flush every few seconds
+    python -m app.answer_buffer --once          # flush what is buffered and exit
+"""
+
+import argparse
+import time
+import logging
+
+import redis
+from sqlalchemy.orm import Session
+
+from app.cache import redis_client
+from app.models import StreamOffset as StreamOffsetORM
+
+logger = logging.getLogger(__name__)
+
+ANSWER_STREAM = "study_answers"
+FLUSH_BATCH_SIZE = 1000
+FLUSH_INTERVAL_SECONDS = 5
+
+
+def buffer_answer(user_id: str, card_id: int, inherited: bool, remembered: bool) -> bool:
+    """Append an answer to the stream; False if it couldn't be buffered (the caller then records it directly)"""
+    if redis_client is None:
+        return False
+    try:
+        redis_client.xadd(ANSWER_STREAM, {
+            "u": user_id,
+            "c": card_id,
+            "i": int(inherited),
+            "r": int(remembered)
+        })
+        return True
+    except redis.RedisError as e:
+        logger.warning(f"Failed to buffer answer for card {card_id}: {e}")
+        return False
+
+
+def _stream_offset(db: Session) -> StreamOffsetORM:
+    """The stream's offset row, locked until the batch commits so concurrent flushers take turns"""
+    offset = db.query(StreamOffsetORM).filter(StreamOffsetORM.name == ANSWER_STREAM).with_for_update().first()
+    if offset is None:
+        offset = StreamOffsetORM(name=ANSWER_STREAM, last_id="0-0")
+        db.add(offset)
+        db.flush()
+    return offset
+
+
+def flush_answers(db: Session, batch_size: int = FLUSH_BATCH_SIZE) -> int:
+    """Fold every buffered answer into card statistics, a batch per transaction. Returns the answers flushed."""
+    from app.session_service import SessionService
+
+    if redis_client is None:
+        return 0
+
+    flushed = 0
+    while True:
+        offset = _stream_offset(db)
+        entries = redis_client.xrange(ANSWER_STREAM, min=f"({offset.last_id}", count=batch_size)
+        if not entries:
+            db.commit()
+            break
+
+        reviews = [
+            (fields[b"u"].decode(), int(fields[b"c"]), fields[b"i"] == b"1", fields[b"r"] == b"1")
+            for _, fields in entries
+        ]
+        recorded = SessionService(db).record_reviews(reviews)
+        last_id = entries[-1][0].decode()
+        offset.last_id = last_id
+        db.commit()
+
+        # Entries before the offset are folded; the last one goes with the next trim
+        redis_client.xtrim(ANSWER_STREAM, minid=last_id, approximate=False)
+        flushed += len(entries)
+        logger.info(f"Flushed {len(entries)} buffered answers ({recorded} recorded) up to {last_id}")
+        if len(entries) < batch_size:
+            break
+    return flushed
+
+
+def flush_buffered_answers():
+    """Background task entry point: flush the buffer in a session of its own"""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        flush_answers(db)
+    except Exception as e:
+        db.rollback()
+        # Nothing is lost: the offset didn't move, so the next flush retries
+        logger.error(f"Failed to flush buffered answers: {str(e)}")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold buffered study answers into card statistics")
+    parser.add_argument("--once", action="store_true", help="Flush what is buffered and exit")
+    parser.add_argument("--interval", type=float, default=FLUSH_INTERVAL_SECONDS)
+    parser.add_argument("--batch-size", type=int, default=FLUSH_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+
+    while True:
+        db = SessionLocal()
+        try:
+            flushed = flush_answers(db, batch_size=args.batch_size)
+            if args.once:
+                print(f"Flushed {flushed} answers")
+                return
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to flush buffered answers: {str(e)}")
+            if args.once:
+                raise
+        finally:
+            db.close()
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
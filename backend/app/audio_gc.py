@@ -0,0 +1,219 @@
+"""
+Garbage collector for voice files that no card references any more.
+
+Deleting cards, decks or users and editing a card's front all leave audio
+behind. The collector walks the referenced ``Card.audio_path`` values and the
+stored voice objects as two key-ordered streams and merges them, so neither
+side is ever loaded into memory in full.
+
+Usage:
+    python -m app.audio_gc              # dry run, prints a report
+    python -m app.audio_gc --delete     # delete orphaned files
+    python -m app.audio_gc --metrics    # cumulative reclaimed-disk metrics
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional, Set
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Card as CardORM
+from app.schemas import AudioGCReport
+from app.voice_service import VoiceGenerator, voice_generator
+from app.voice_storage import StoredObject, VoiceStorage, VOICES_PREFIX, voice_storage
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "audio_gc:metrics"
+SAMPLE_SIZE = 20
+
+
+class AudioGarbageCollector:
+    def __init__(self, db: Session, storage: VoiceStorage = None, generator: VoiceGenerator = None):
+        self.db = db
+        self.storage = storage or voice_storage
+        self.generator = generator or voice_generator
+
+    def _referenced_paths(self, chunk_size: int) -> Iterator[str]:
+        """Stream distinct audio paths in byte order (matching storage key order)"""
+        stmt = (
+            select(CardORM.audio_path)
+            .where(CardORM.audio_path.isnot(None))
+            .group_by(CardORM.audio_path)
+            .order_by(CardORM.audio_path.collate("C"))
+            .execution_options(yield_per=chunk_size)
+        )
+        for (audio_path,) in self.db.execute(stmt):
+            yield audio_path
+
+    def find_orphans(self, grace_period: timedelta, chunk_size: int = 1000,
+                     report: Optional[AudioGCReport] = None) -> Iterator[StoredObject]:
+        """Yield stored voice objects that no card references (streaming set difference)"""
+        report = report or AudioGCReport(dry_run=True)
+        cutoff = datetime.now(timezone.utc) - grace_period
+        references = self._referenced_paths(chunk_size)
+        current_ref = next(references, None)
+
+        for obj in self.storage.iter_objects(VOICES_PREFIX):
+            report.scanned_files += 1
+            report.scanned_bytes += obj.size
+
+            while current_ref is not None and current_ref < obj.key:
+                current_ref = next(references, None)
+
+            if current_ref == obj.key:
+                report.referenced_files += 1
+                continue
+
+            # Recent files may belong to a card whose transaction hasn't committed yet
+            if obj.last_modified > cutoff:
+                report.skipped_recent_files += 1
+                continue
+
+            report.orphaned_files += 1
+            report.orphaned_bytes += obj.size
+            yield obj
+
+    def run(self, dry_run: bool = True, batch_size: int = 500,
+            grace_period: timedelta = timedelta(hours=1)) -> AudioGCReport:
+        """Find orphaned audio and, unless dry_run, delete it in batches"""
+        started = time.monotonic()
+        report = AudioGCReport(dry_run=dry_run)
+        deleted_paths = set()
+        batch: List[StoredObject] = []
+
+        for obj in self.find_orphans(grace_period, report=report):
+            if len(report.sample_orphans) < SAMPLE_SIZE:
+                report.sample_orphans.append(obj.key)
+            if dry_run:
+                continue
+
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                self._delete_batch(batch, report, deleted_paths)
+                batch = []
+
+        if batch:
+            self._delete_batch(batch, report, deleted_paths)
+
+        # Drop voice:* cache entries so the generator doesn't hand out deleted paths
+        report.cache_entries_removed = self.generator.purge_cached_paths(deleted_paths)
+        report.duration_seconds = round(time.monotonic() - started, 3)
+
+        if not dry_run:
+            self._record_metrics(report)
+        logger.info(
+            f"Audio GC ({'dry run' if dry_run else 'delete'}): scanned {report.scanned_files} files, "
+            f"{report.orphaned_files} orphaned ({report.orphaned_bytes} bytes), "
+            f"deleted {report.deleted_files} ({report.reclaimed_bytes} bytes reclaimed)"
+        )
+        return report
+
+    def _delete_batch(self, batch: List[StoredObject], report: AudioGCReport, deleted_paths: set):
+        # Re-check references for the batch right before deleting, in case a card
+        # picked up one of these paths (e.g. a copied deck) since the scan started
+        keys = [obj.key for obj in batch]
+        still_referenced = {
+            path for (path,) in self.db.execute(
+                select(CardORM.audio_path).where(CardORM.audio_path.in_(keys)).distinct()
+            )
+        }
+
+        for obj in batch:
+            if obj.key in still_referenced:
+                continue
+            try:
+                if self.storage.delete(obj.key):
+                    report.deleted_files += 1
+                    report.reclaimed_bytes += obj.size
+                    deleted_paths.add(obj.key)
+            except Exception as e:
+                logger.error(f"Failed to delete orphaned audio {obj.key}: {e}")
+
+    def delete_unreferenced(self, paths: Iterable[str]) -> Set[str]:
+        """Delete the given voice files that no card references now, returning the deleted paths
+
+        Used when cards are deleted in bulk, to drop their audio right away
+        instead of waiting for the next collection. The voice cache entry of
+        each file is dropped together with it.
+        """
+        paths = set(paths)
+        if not paths:
+            return set()
+        still_referenced = {
+            path for (path,) in self.db.execute(
+                select(CardORM.audio_path).where(CardORM.audio_path.in_(paths)).distinct()
+            )
+        }
+
+        deleted = set()
+        for path in paths - still_referenced:
+            try:
+                if self.storage.delete(path):
+                    deleted.add(path)
+                    self.generator.forget_paths((path,))
+            except Exception as e:
+                logger.error(f"Failed to delete orphaned audio {path}: {e}")
+        return deleted
+
+    def _record_metrics(self, report: AudioGCReport):
+        redis_client = self.generator.redis_client if self.generator.use_redis else None
+        if not redis_client:
+            return
+        try:
+            pipe = redis_client.pipeline()
+            pipe.hincrby(METRICS_KEY, "runs", 1)
+            pipe.hincrby(METRICS_KEY, "deleted_files", report.deleted_files)
+            pipe.hincrby(METRICS_KEY, "reclaimed_bytes", report.reclaimed_bytes)
+            pipe.hset(METRICS_KEY, mapping={
+                "last_run_at": datetime.now(timezone.utc).isoformat(),
+                "last_deleted_files": report.deleted_files,
+                "last_reclaimed_bytes": report.reclaimed_bytes,
+            })
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to record audio GC metrics: {e}")
+
+
+def get_gc_metrics(generator: VoiceGenerator = None) -> dict:
+    """Cumulative metrics recorded by previous (non dry-run) collections"""
+    generator = generator or voice_generator
+    if not (generator.use_redis and generator.redis_client):
+        return {}
+    return generator.redis_client.hgetall(METRICS_KEY)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete voice files no card references")
+    parser.add_argument("--delete", action="store_true", help="Delete orphans (default is a dry run)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--grace-minutes", type=int, default=60,
+                        help="Ignore files newer than this many minutes")
+    parser.add_argument("--metrics", action="store_true", help="Print cumulative metrics and exit")
+    args = parser.parse_args()
+
+    if args.metrics:
+        print(json.dumps(get_gc_metrics(), indent=2))
+        return
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        report = AudioGarbageCollector(db).run(
+            dry_run=not args.delete,
+            batch_size=args.batch_size,
+            grace_period=timedelta(minutes=args.grace_minutes)
+        )
+        print(report.model_dump_json(indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,54 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from firebase_admin import auth
+from sqlalchemy.orm import Session
 from typing import Dict, Optional
 import logging
+import time
+
+from app.cache import blob_cache
+from app.database import get_db
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
+# Firebase ID tokens expire within an hour, so revocations need remembering no longer
+REVOCATION_TTL_SECONDS = 3600
+
+
+def _revocation_key(uid: str) -> str:
+    return f"auth_revoked:{uid}"
+
+
+def record_token_revocation(uid: str):
+    """Refuse the user's ID tokens issued until now (account deletion), without asking Firebase per request"""
+    blob_cache.set(_revocation_key(uid), {"at": str(int(time.time())).encode()}, ttl=REVOCATION_TTL_SECONDS)
 
-def verify_firebase_token(token: str) -> Dict:
+
+def _token_revoked(decoded_token: Dict) -> bool:
+    fields = blob_cache.get(_revocation_key(decoded_token.get("uid", "")))
+    return bool(fields) and decoded_token.get("iat", 0) <= int(fields["at"])
+
+
+def verify_firebase_token(token: str, check_revoked: bool = False) -> Dict:
     """
     Verify Firebase ID token and return decoded token
+
+    With check_revoked, Firebase is asked (one request per call) whether the
+    user is disabled or their tokens were revoked; get_current_user relies on
+    record_token_revocation instead.
     """
     try:
-        decoded_token = auth.verify_id_token(token)
+        decoded_token = auth.verify_id_token(token, check_revoked=check_revoked)
         return decoded_token
+    except (auth.RevokedIdTokenError, auth.UserDisabledError) as e:
+        logger.warning(f"Refused Firebase token: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     except auth.InvalidIdTokenError as e:
         logger.error(f"Invalid Firebase token: {e}")
         raise HTTPException(
@@ -39,10 +72,7 @@ def verify_firebase_token(token: str) -> Dict:
         )
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict:
-    """
-    FastAPI dependency to get current authenticated user from Firebase token
-    """
+def _authenticate(credentials: Optional[HTTPAuthorizationCredentials]) -> Dict:
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -61,6 +91,46 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     }
 
 
+def _ensure_account_active(db: Session, uid: str):
+    """Refuse users whose account was deleted (410) while their data is being purged"""
+    from app.models import User as UserORM
+    from app.user_service import AccountDeletedError
+
+    deleted_at = db.query(UserORM.deleted_at).filter(UserORM.uid == uid).scalar()
+    if deleted_at:
+        raise AccountDeletedError("Account has been deleted")
+
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security),
+                     db: Session = Depends(get_db)) -> Dict:
+    """
+    FastAPI dependency to get current authenticated user from Firebase token
+
+    Tokens of deleted accounts are refused here, before any endpoint code
+    runs: by the account's deleted_at (looked up in the request's session)
+    and, once the purge has removed the row, by the recorded revocation.
+    """
+    current_user = _authenticate(credentials)
+    if _token_revoked(current_user["firebase_token"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    _ensure_account_active(db, current_user["uid"])
+    return current_user
+
+
+def get_deleting_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict:
+    """
+    FastAPI dependency for the account deletion endpoints: the token's user, even if the account was deleted
+
+    Deleting an account revokes its tokens, so only the signature and expiry
+    are checked; the client can still follow the purge with its last token.
+    """
+    return _authenticate(credentials)
+
+
 def get_user_id(current_user: Dict = Depends(get_current_user)) -> str:
     """
     FastAPI dependency to get just the user ID
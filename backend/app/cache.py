@@ -0,0 +1,175 @@
+"""
+Shared Redis-backed caching primitives.
+
+Like the voice cache, everything here degrades to a process-local in-memory
+fallback when Redis is unavailable, so a single node keeps working (with
+per-process caches) without it.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+
+import msgpack
+import redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 3600
+MEMORY_CACHE_MAX_ENTRIES = 1000
+
+_DATETIME_EXT = 1
+
+
+def _encode(value: Any):
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_DATETIME_EXT, value.isoformat().encode("ascii"))
+    raise TypeError(f"Object of type {type(value).__name__} can't be cached")
+
+
+def _decode_ext(code: int, data: bytes):
+    if code == _DATETIME_EXT:
+        return datetime.fromisoformat(data.decode("ascii"))
+    return msgpack.ExtType(code, data)
+
+
+def pack(value: Any) -> bytes:
+    """Compact (msgpack) encoding of plain data for cache entries; datetimes are supported, tuples come back as lists"""
+    return msgpack.packb(value, default=_encode, use_bin_type=True)
+
+
+def unpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_decode_ext, raw=False)
+
+
+def _connect_redis() -> Optional[redis.Redis]:
+    host = os.getenv('REDIS_HOST', 'localhost')
+    port = int(os.getenv('REDIS_PORT', 6379))
+    try:
+        client = redis.Redis(host=host, port=port, db=0, socket_connect_timeout=2)
+        client.ping()
+        return client
+    except (redis.ConnectionError, redis.TimeoutError) as e:
+        logger.warning(f"Redis not available, using in-memory response cache: {e}")
+        return None
+
+
+class VersionCounters:
+    """
+    Monotonic version numbers used to invalidate every cache key derived from them at once
+
+    A counter can start over (a Redis flush or restart, a new process with
+    the in-memory fallback), so each one has a random epoch, created along
+    with it; tag() combines both and never repeats for different content.
+    """
+
+    def __init__(self, client: Optional[redis.Redis]):
+        self.client = client
+        self._memory: Dict[str, int] = {}
+        # In-memory counters start over with the process, so the process gets its own epoch
+        self._memory_epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> int:
+        if self.client:
+            try:
+                value = self.client.get(name)
+                return int(value) if value else 0
+            except redis.RedisError as e:
+                logger.warning(f"Failed to read version {name}: {e}")
+        return self._memory.get(name, 0)
+
+    def tag(self, name: str) -> str:
+        """Epoch and current version of a counter, for cache keys and ETags"""
+        if self.client:
+            try:
+                epoch_key = f"{name}:epoch"
+                value, epoch = self.client.mget(name, epoch_key)
+                if epoch is None:
+                    # First use, or the counter was lost with the rest of Redis
+                    self.client.set(epoch_key, uuid.uuid4().hex[:8], nx=True)
+                    value, epoch = self.client.mget(name, epoch_key)
+                return f"{epoch.decode()}.{int(value) if value else 0}"
+            except redis.RedisError as e:
+                logger.warning(f"Failed to read version {name}: {e}")
+        return f"{self._memory_epoch}.{self._memory.get(name, 0)}"
+
+    def bump(self, name: str) -> int:
+        if self.client:
+            try:
+                return int(self.client.incr(name))
+            except redis.RedisError as e:
+                logger.warning(f"Failed to bump version {name}: {e}")
+        with self._lock:
+            self._memory[name] = self._memory.get(name, 0) + 1
+            return self._memory[name]
+
+
+class BlobCache:
+    """Byte blobs stored as small field maps (Redis hashes), with a TTL"""
+
+    def __init__(self, client: Optional[redis.Redis], max_entries: int = MEMORY_CACHE_MAX_ENTRIES):
+        self.client = client
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, bytes]]:
+        if self.client:
+            try:
+                fields = self.client.hgetall(key)
+                return {k.decode(): v for k, v in fields.items()} if fields else None
+            except redis.RedisError as e:
+                logger.warning(f"Failed to read cache entry {key}: {e}")
+                return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if not entry:
+                return None
+            expires_at, fields = entry
+            if expires_at < time.monotonic():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return fields
+
+    def set(self, key: str, fields: Dict[str, bytes], ttl: int = DEFAULT_TTL_SECONDS):
+        if self.client:
+            try:
+                pipe = self.client.pipeline()
+                pipe.delete(key)
+                pipe.hset(key, mapping=fields)
+                pipe.expire(key, ttl)
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.warning(f"Failed to write cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self._memory[key] = (time.monotonic() + ttl, dict(fields))
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def delete(self, key: str):
+        if self.client:
+            try:
+                self.client.delete(key)
+            except redis.RedisError as e:
+                logger.warning(f"Failed to delete cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            self._memory.pop(key, None)
+
+
+# Global instances
+redis_client = _connect_redis()
+version_counters = VersionCounters(redis_client)
+blob_cache = BlobCache(redis_client)
@@ -0,0 +1,291 @@
+"""
+Bulk card ingestion from CSV/TSV files (including Anki's plain-text exports).
+
+The upload is read row by row and the cards are bulk-loaded in batches, so
+memory stays constant however many rows the file has. Columns are chosen by
+header name (or 1-based position for files without a header): one for the
+front, one for the back and any number for deck custom fields. Anki's header
+directives ``#separator:`` and ``#columns:`` are honoured and other leading
+``#`` lines are skipped.
+
+Cards are inserted without audio; fill_missing_audio generates it afterwards
+in batches, outside the request.
+"""
+
+import csv
+import io
+import itertools
+import os
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models import Deck as DeckORM, Card as CardORM, User as UserORM
+from app.schemas import CardIngestResult, CustomField
+from app.utils import label_to_field_name, validate_custom_fields
+from app.voice_service import voice_generator
+from app.snapshot_service import DeckSnapshotService
+from app.deck_rollups import apply_deck_delta
+from app.deck_versions import bump_deck_versions
+from app.import_service import bulk_load_cards
+
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = 5000
+AUDIO_BATCH_SIZE = 100
+SKIPPED_ROW_SAMPLE = 20
+
+# Values of Anki's "#separator:" directive
+ANKI_SEPARATORS = {"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|", "space": " ", "colon": ":"}
+
+
+def _default_delimiter(filename: str) -> str:
+    # Anki exports notes as tab-separated .txt files
+    return "," if os.path.splitext(filename or "")[1].lower() == ".csv" else "\t"
+
+
+def _read_directives(text: io.TextIOBase) -> Tuple[Dict[str, str], int, Optional[str]]:
+    """Consume the leading '#key:value' lines, returning them, their count and the first data line"""
+    directives = {}
+    count = 0
+    for line in text:
+        if not line.startswith("#"):
+            return directives, count, line
+        count += 1
+        key, _, value = line[1:].strip().partition(":")
+        directives[key.strip().lower()] = value.strip()
+    return directives, count, None
+
+
+def _column_index(reference: str, header: Optional[List[str]]) -> int:
+    """Resolve a column given by header name (case-insensitive) or 1-based position"""
+    reference = reference.strip()
+    if header is not None:
+        for index, name in enumerate(header):
+            if name.strip().lower() == reference.lower():
+                return index
+    if reference.isdigit() and int(reference) >= 1:
+        return int(reference) - 1
+    if header is None:
+        raise ValueError(f"Column '{reference}' must be a 1-based column number when the file has no header")
+    raise ValueError(f"Column '{reference}' not found in header")
+
+
+def _cell(row: Sequence[str], index: int) -> str:
+    return row[index].strip() if index < len(row) else ""
+
+
+class CardIngestService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _target_deck(self, user_id: str, deck_id: Optional[int], name: Optional[str], is_public: bool) -> DeckORM:
+        if deck_id is not None:
+            deck = self.db.query(DeckORM).filter(DeckORM.id == deck_id, DeckORM.user_id == user_id).first()
+            if not deck:
+                raise Exception("Deck not found or access denied")
+            return deck
+
+        if not name or not name.strip():
+            raise ValueError("Either deck_id or a deck name is required")
+        user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
+        deck = DeckORM(
+            name=name.strip(),
+            is_public=is_public,
+            user_id=user_id,
+            language=user.selected_language if user and user.selected_language else 'en',
+            created_at=datetime.now(),
+            progress=0.0,
+            card_count=0
+        )
+        self.db.add(deck)
+        self.db.flush()
+        return deck
+
+    def _custom_fields(self, deck: DeckORM, labels: List[str]) -> List[dict]:
+        """Add a custom field for each label the deck doesn't have yet, returning the field of each label"""
+        deck_fields = list(deck.custom_fields or [])
+        fields = []
+        for label in labels:
+            name = label_to_field_name(label)
+            field = next((f for f in deck_fields if f["name"] == name), None)
+            if field is None:
+                field = {"name": name, "label": label}
+                deck_fields.append(field)
+            fields.append(field)
+
+        if len(deck_fields) != len(deck.custom_fields or []):
+            is_valid, error_msg = validate_custom_fields(deck_fields)
+            if not is_valid:
+                raise ValueError(f"Invalid custom fields: {error_msg}")
+            deck.custom_fields = deck_fields
+        return fields
+
+    def ingest(self, user_id: str, fileobj: BinaryIO, filename: str, *,
+               deck_id: Optional[int] = None, name: Optional[str] = None, is_public: bool = False,
+               front_column: Optional[str] = None, back_column: Optional[str] = None,
+               custom_columns: Optional[List[str]] = None, has_header: Optional[bool] = None,
+               delimiter: Optional[str] = None) -> CardIngestResult:
+        """
+        Add the rows of a CSV/TSV file as cards of an existing deck (deck_id) or a new one (name)
+
+        The front and back default to the "front" and "back" columns, or the
+        first two without a header. has_header defaults to True, except for
+        Anki exports (files with '#' directives), which have none. Rows without
+        a front or back are skipped. Raises ValueError for an
+        unreadable file or bad column mapping, and rolls back so nothing is
+        imported.
+        """
+        try:
+            deck = self._target_deck(user_id, deck_id, name, is_public)
+
+            text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="strict", newline="")
+            directives, directive_lines, first_line = _read_directives(text)
+            if delimiter is None:
+                delimiter = ANKI_SEPARATORS.get(directives.get("separator", "").lower(),
+                                                directives.get("separator") or _default_delimiter(filename))
+            if len(delimiter) != 1:
+                raise ValueError("Delimiter must be a single character")
+
+            lines = itertools.chain([first_line], text) if first_line is not None else iter(())
+            reader = csv.reader(lines, delimiter=delimiter)
+
+            header = None
+            if "columns" in directives:
+                header = directives["columns"].split(delimiter)
+            elif has_header if has_header is not None else not directives:
+                header = next(reader, None)
+                if header is None:
+                    raise ValueError("File is empty")
+            front_index = _column_index(front_column or ("front" if header is not None else "1"), header)
+            back_index = _column_index(back_column or ("back" if header is not None else "2"), header)
+
+            custom_columns = [column for column in (custom_columns or []) if column.strip()]
+            custom_indexes = [_column_index(column, header) for column in custom_columns]
+            labels = [header[index].strip() if header is not None and index < len(header) else column.strip()
+                      for column, index in zip(custom_columns, custom_indexes)]
+            fields = self._custom_fields(deck, labels)
+
+            imported = 0
+            skipped = 0
+            skipped_rows = []
+            rows = []
+            created_at = datetime.now()
+            for row in reader:
+                front = _cell(row, front_index)
+                back = _cell(row, back_index)
+                if not front or not back:
+                    # Blank lines are not rows the user meant to import
+                    if any(cell.strip() for cell in row):
+                        skipped += 1
+                        if len(skipped_rows) < SKIPPED_ROW_SAMPLE:
+                            skipped_rows.append(reader.line_num + directive_lines)
+                    continue
+
+                custom_data = {}
+                for field, index in zip(fields, custom_indexes):
+                    value = _cell(row, index)
+                    if value:
+                        custom_data[field["name"]] = value
+                rows.append((deck.id, front, back, 0.0, 0, 0, None, created_at, None, custom_data or None))
+                if len(rows) >= INGEST_BATCH_SIZE:
+                    bulk_load_cards(self.db, rows)
+                    imported += len(rows)
+                    rows = []
+            bulk_load_cards(self.db, rows)
+            imported += len(rows)
+
+            apply_deck_delta(self.db, deck.id, card_delta=imported)
+            if imported:
+                deck.last_modified = datetime.utcnow()
+                bump_deck_versions(self.db, [deck.id])
+            if deck.is_public:
+                self.db.flush()
+                DeckSnapshotService(self.db).build(deck)
+            self.db.commit()
+
+            logger.info(f"Ingested {imported} cards into deck {deck.id} for user {user_id} ({skipped} rows skipped)")
+            return CardIngestResult(
+                deck_id=deck.id,
+                imported_cards=imported,
+                skipped_rows=skipped,
+                skipped_row_numbers=skipped_rows,
+                custom_fields=[CustomField(**field) for field in deck.custom_fields or []] or None,
+                audio_pending=bool(imported) and voice_generator.is_language_supported(deck.language)
+            )
+
+        except (UnicodeDecodeError, csv.Error) as e:
+            self.db.rollback()
+            raise ValueError(f"Could not read file: {str(e)}")
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Failed to ingest cards for user {user_id}: {str(e)}")
+            raise Exception(f"Failed to ingest cards: {str(e)}")
+        except Exception:
+            self.db.rollback()
+            raise
+
+
+def fill_missing_audio(deck_id: int, batch_size: int = AUDIO_BATCH_SIZE) -> int:
+    """
+    Generate audio for the deck's cards that have none, committing a batch at a time
+
+    Runs after an ingestion, in its own session. Cards whose audio can't be
+    generated are left without it; the walk goes by card id, so each card is
+    tried once. Every batch advances the deck's version with its commit.
+    """
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    generated = 0
+    try:
+        deck = db.get(DeckORM, deck_id)
+        if not deck or not voice_generator.is_language_supported(deck.language):
+            return 0
+
+        last_id = 0
+        while True:
+            batch = db.execute(
+                select(CardORM.id, CardORM.front).where(
+                    CardORM.deck_id == deck_id,
+                    CardORM.audio_path.is_(None),
+                    CardORM.id > last_id
+                ).order_by(CardORM.id).limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            updates = []
+            for card_id, front in batch:
+                try:
+                    audio_path = voice_generator.get_voice(deck.language, front)
+                except Exception as e:
+                    logger.error(f"Audio generation failed for '{front}' in {deck.language}: {e}")
+                    audio_path = None
+                if audio_path:
+                    updates.append({"id": card_id, "audio_path": audio_path})
+            if updates:
+                db.execute(update(CardORM), updates)
+                # Each committed batch is visible to ETags and cached readers right away
+                deck.last_modified = datetime.utcnow()
+                bump_deck_versions(db, [deck_id])
+                generated += len(updates)
+            db.commit()
+
+        if generated and deck.is_public:
+            # Readers rebuild a stale snapshot themselves, so only the final one is built here
+            DeckSnapshotService(db).build(deck)
+            db.commit()
+        logger.info(f"Generated audio for {generated} cards of deck {deck_id}")
+        return generated
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to fill missing audio for deck {deck_id}: {str(e)}")
+        return generated
+    finally:
+        db.close()
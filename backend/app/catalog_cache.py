@@ -0,0 +1,138 @@
+"""
+Versioned response cache for the public deck catalog.
+
+Catalog responses depend only on their query parameters and on public deck
+rows (plus author names), so they are cached under a global catalog version.
+Session events advance the version after any commit that touched a public
+deck, a deck's visibility or an author name; every previously cached
+response and ETag becomes stale at once without tracking individual keys.
+
+Bulk statements on decks bypass that tracking and count as catalog changes,
+unless they carry the ``skip_catalog_invalidation`` execution option: hot
+per-user updates (version bumps, rollups) set it and report changes to public
+decks themselves with ``mark_catalog_changed``.
+"""
+
+import hashlib
+import json
+from typing import Callable, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.cache import blob_cache, version_counters
+from app.database import SessionLocal
+from app.etag import etag_matches, make_etag, not_modified
+from app.models import Deck as DeckORM, User as UserORM
+from app.pagination import NEXT_CURSOR_HEADER
+
+CATALOG_VERSION_KEY = "catalog:version"
+CATALOG_RESPONSE_PREFIX = "catalog:response"
+# Shared caches may store the response but must revalidate (cheap 304) on every use
+CATALOG_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+# Execution option of bulk statements that can't change what the catalog shows (or report it themselves)
+SKIP_CATALOG_INVALIDATION = "skip_catalog_invalidation"
+
+_DIRTY_FLAG = "catalog_dirty"
+
+
+def get_catalog_version() -> int:
+    return version_counters.get(CATALOG_VERSION_KEY)
+
+
+def get_catalog_tag() -> str:
+    """Catalog version with its epoch, so ETags don't repeat when the counter starts over"""
+    return version_counters.tag(CATALOG_VERSION_KEY)
+
+
+def mark_catalog_changed(session: Session):
+    """Advance the catalog version when session's transaction commits"""
+    session.info[_DIRTY_FLAG] = True
+
+
+def _deck_affects_catalog(deck: DeckORM) -> bool:
+    if deck.is_public:
+        return True
+    history = inspect(deck).attrs.is_public.history
+    return any(history.deleted)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _track_catalog_changes(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, DeckORM) and obj.is_public:
+            mark_catalog_changed(session)
+            return
+    for obj in session.dirty:
+        if isinstance(obj, DeckORM) and _deck_affects_catalog(obj):
+            mark_catalog_changed(session)
+            return
+        if isinstance(obj, UserORM) and inspect(obj).attrs.name.history.has_changes():
+            mark_catalog_changed(session)
+            return
+    for obj in session.deleted:
+        if isinstance(obj, DeckORM) and obj.is_public:
+            mark_catalog_changed(session)
+            return
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _track_bulk_catalog_changes(orm_execute_state):
+    # Bulk UPDATE/DELETE statements bypass the unit of work; treat any that touch
+    # decks or users as catalog changes unless they opt out
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get(SKIP_CATALOG_INVALIDATION):
+        return
+    mappers = {mapper.class_ for mapper in orm_execute_state.all_mappers}
+    if DeckORM in mappers or UserORM in mappers:
+        mark_catalog_changed(orm_execute_state.session)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_catalog_version(session):
+    if session.info.pop(_DIRTY_FLAG, False):
+        version_counters.bump(CATALOG_VERSION_KEY)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_catalog_changes(session):
+    session.info.pop(_DIRTY_FLAG, None)
+
+
+def cached_catalog_response(request: Request, endpoint: str, params: dict,
+                            build: Callable[[], Tuple[bytes, Optional[str]]]) -> Response:
+    """
+    Serve a catalog response from the shared cache, answering 304 when the client's copy is current
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        endpoint: Name distinguishing cached responses of different endpoints
+        params: Query parameters the response depends on
+        build: Produces (JSON body, next page cursor) on a cache miss
+    """
+    version = get_catalog_tag()
+    params_key = hashlib.sha1(
+        json.dumps([endpoint, params], sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:20]
+    etag = make_etag("catalog", version, params_key)
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+
+    # Unchanged catalog: no query, no body
+    if etag_matches(request, etag):
+        return not_modified(etag, {"Cache-Control": CATALOG_CACHE_CONTROL})
+
+    cache_key = f"{CATALOG_RESPONSE_PREFIX}:{version}:{params_key}"
+    entry = blob_cache.get(cache_key)
+    if entry is not None:
+        body = entry["body"]
+        next_cursor = entry.get("next_cursor", b"").decode() or None
+    else:
+        body, next_cursor = build()
+        blob_cache.set(cache_key, {"body": body, "next_cursor": (next_cursor or "").encode()})
+
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
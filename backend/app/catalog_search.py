@@ -0,0 +1,160 @@
+import re
+from typing import List, Optional
+import logging
+
+from sqlalchemy import Float, and_, cast, func, literal, or_, select, union
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import ColumnElement
+
+from app.models import Deck as DeckORM, User as UserORM
+from app.pagination import keyset_page
+from app.schemas import LanguageFacet, PublicDeckSearchResponse, PublicDeckSearchResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Author matches count for less than deck name matches
+AUTHOR_WEIGHT = 0.5
+LIKE_ESCAPE = "!"
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def _prefix_tsquery(term: str) -> Optional[str]:
+    """Build a to_tsquery string matching every word of term as a prefix"""
+    tokens = re.findall(r"[^\W_]+", term.lower())
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+class CatalogSearchService:
+    """
+    Public deck catalog search.
+
+    Matching is served by indexes on the public catalog: a GIN index on the
+    generated ``decks.search_vector`` column for word-prefix matches and
+    pg_trgm GIN indexes on deck names, languages and author names for substring
+    (ILIKE) and fuzzy matches. Results are ranked by full-text rank plus trigram
+    word similarity and paged with a keyset cursor on (score, last_modified, id).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def match_condition(term: str) -> ColumnElement:
+        """
+        Index-backed predicate on DeckORM.id matching a search term against public decks
+
+        Deck-side and author-side matches are collected separately and combined
+        with UNION, so each branch can use its own GIN index instead of the
+        planner falling back to filtering the whole join.
+        """
+        term = term.strip()
+        like_term = f"%{_escape_like(term)}%"
+
+        deck_conditions = [
+            DeckORM.name.ilike(like_term, escape=LIKE_ESCAPE),
+            DeckORM.language.ilike(like_term, escape=LIKE_ESCAPE),
+        ]
+        tsquery = _prefix_tsquery(term)
+        if tsquery:
+            deck_conditions.append(DeckORM.search_vector.op("@@")(func.to_tsquery("simple", tsquery)))
+
+        deck_matches = select(DeckORM.id).where(DeckORM.is_public == True, or_(*deck_conditions))
+        author_matches = select(DeckORM.id).join(UserORM, DeckORM.user_id == UserORM.uid).where(
+            DeckORM.is_public == True,
+            UserORM.name.ilike(like_term, escape=LIKE_ESCAPE)
+        )
+        return DeckORM.id.in_(union(deck_matches, author_matches))
+
+    @staticmethod
+    def rank_expression(term: str) -> ColumnElement:
+        term = term.strip()
+        tsquery = _prefix_tsquery(term)
+        text_rank = (
+            func.ts_rank(DeckORM.search_vector, func.to_tsquery("simple", tsquery))
+            if tsquery else literal(0.0)
+        )
+        similarity = func.greatest(
+            func.word_similarity(term, DeckORM.name),
+            func.word_similarity(term, func.coalesce(UserORM.name, "")) * AUTHOR_WEIGHT
+        )
+        # Double precision, so the score round-trips exactly through a keyset cursor
+        return cast(text_rank + similarity, Float).label("score")
+
+    def search(self, query: str, language: Optional[str] = None, limit: Optional[int] = None,
+               cursor: Optional[str] = None) -> PublicDeckSearchResponse:
+        """Ranked search over public decks with per-language facets"""
+        try:
+            query = (query or "").strip()
+            if not query:
+                raise ValueError("Search query must not be empty")
+
+            limit = min(limit or DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+
+            match = and_(DeckORM.is_public == True, self.match_condition(query))
+            language_filter = language.lower() if language and language.lower() != 'all' else None
+
+            score = self.rank_expression(query)
+            results_query = self.db.query(
+                DeckORM.id,
+                DeckORM.name,
+                DeckORM.language,
+                DeckORM.card_count,
+                DeckORM.created_at,
+                DeckORM.last_modified,
+                DeckORM.is_public,
+                UserORM.name.label('author_name'),
+                score
+            ).join(UserORM, DeckORM.user_id == UserORM.uid).filter(match)
+
+            if language_filter:
+                results_query = results_query.filter(DeckORM.language == language_filter)
+
+            # Best matches first; the cursor holds the last row's key, so deep pages cost no more than the first
+            rows, next_cursor = keyset_page(
+                results_query, [score, DeckORM.last_modified, DeckORM.id], limit, cursor, descending=True
+            )
+
+            results = [
+                PublicDeckSearchResult(
+                    id=row.id,
+                    name=row.name,
+                    language=row.language,
+                    card_count=row.card_count,
+                    author_name=row.author_name or "Unknown",
+                    created_at=row.created_at,
+                    last_modified=row.last_modified or row.created_at,
+                    is_public=row.is_public,
+                    score=round(float(row.score or 0.0), 4)
+                )
+                for row in rows
+            ]
+
+            return PublicDeckSearchResponse(
+                results=results,
+                facets=self.language_facets(query),
+                next_cursor=next_cursor
+            )
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to search public decks: {str(e)}")
+            raise Exception(f"Failed to search public decks: {str(e)}")
+
+    def language_facets(self, query: str) -> List[LanguageFacet]:
+        """Match counts per language, ignoring any language filter so clients can switch facets"""
+        rows = self.db.query(
+            DeckORM.language,
+            func.count(DeckORM.id)
+        ).join(UserORM, DeckORM.user_id == UserORM.uid).filter(
+            DeckORM.is_public == True,
+            self.match_condition(query)
+        ).group_by(DeckORM.language).order_by(func.count(DeckORM.id).desc(), DeckORM.language).all()
+
+        return [LanguageFacet(language=language, count=count) for language, count in rows]
@@ -16,6 +16,15 @@ engine = create_engine(DATABASE_URL, echo=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def get_db():
+    """FastAPI dependency: the request's database session (one per request, shared by its dependencies)"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 Base = declarative_base()
 
 # Note: Table creation is now handled by Alembic migrations
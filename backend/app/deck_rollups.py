@@ -0,0 +1,194 @@
+"""
+Deck card count and progress rollups.
+
+``Deck.card_count`` and ``Deck.progress`` (mean card accuracy) are maintained
+by delta updates issued in the same transaction as the card change, so no
+write path recounts a deck's cards. The checker recomputes both from the cards
+in batches of decks and repairs any drift, e.g. rows written before rollups
+were maintained.
+
+Decks subscribed to a deck whose author added or removed cards are repaired
+after the author's change commits, by a background task
+(``refresh_deck_subscribers``), so the author's write doesn't grow with the
+number of subscribers.
+
+Usage:
+    python -m app.deck_rollups              # dry run, reports drifted decks
+    python -m app.deck_rollups --repair     # fix drifted decks in bulk
+"""
+
+import argparse
+import time
+from typing import List
+import logging
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.catalog_cache import SKIP_CATALOG_INVALIDATION, mark_catalog_changed
+from app.models import Deck as DeckORM
+from app.schemas import DeckRollupReport
+from app.subscription_service import deck_cards_subquery
+from app.user_deck_cache import note_deck_changes
+
+logger = logging.getLogger(__name__)
+
+# Differences in progress below this are rounding, not drift
+PROGRESS_TOLERANCE = 1e-6
+SAMPLE_SIZE = 20
+
+
+def apply_deck_delta(db: Session, deck_id: int, card_delta: int = 0, accuracy_delta: float = 0.0):
+    """
+    Adjust a deck's rollups for a change in its cards with a single UPDATE
+
+    The catalog (which shows card counts) is only invalidated when the deck is public.
+
+    Args:
+        card_delta: Cards added minus cards removed
+        accuracy_delta: Change in the sum of the deck's card accuracies
+    """
+    if not card_delta and not accuracy_delta:
+        return
+
+    note_deck_changes(db, [deck_id])
+    card_count = func.coalesce(DeckORM.card_count, 0)
+    new_card_count = card_count + card_delta
+    accuracy_sum = func.coalesce(DeckORM.progress, 0.0) * card_count
+    is_public = db.execute(
+        update(DeckORM).where(DeckORM.id == deck_id).values(
+            card_count=new_card_count,
+            progress=case((new_card_count > 0, (accuracy_sum + accuracy_delta) / new_card_count), else_=0.0)
+        ).returning(DeckORM.is_public)
+        .execution_options(synchronize_session="fetch", **{SKIP_CATALOG_INVALIDATION: True})
+    ).scalar()
+    if is_public:
+        mark_catalog_changed(db)
+
+
+def _actual_rollups(deck_ids: List[int]):
+    cards = deck_cards_subquery(deck_ids)
+    per_deck = select(
+        cards.c.deck_id,
+        func.count().label("card_count"),
+        func.avg(cards.c.accuracy).label("progress")
+    ).group_by(cards.c.deck_id).subquery("per_deck")
+    # Decks without cards have no row in per_deck
+    deck = select(DeckORM.id).where(DeckORM.id.in_(deck_ids)).subquery("checked_deck")
+    return select(
+        deck.c.id,
+        func.coalesce(per_deck.c.card_count, 0).label("card_count"),
+        func.coalesce(per_deck.c.progress, 0.0).label("progress")
+    ).outerjoin(per_deck, per_deck.c.deck_id == deck.c.id).subquery("actual")
+
+
+def _drifted(actual):
+    return and_(
+        DeckORM.id == actual.c.id,
+        or_(
+            func.coalesce(DeckORM.card_count, -1) != actual.c.card_count,
+            func.abs(func.coalesce(DeckORM.progress, -1.0) - actual.c.progress) > PROGRESS_TOLERANCE
+        )
+    )
+
+
+def repair_rollups(db: Session, deck_ids: List[int], dry_run: bool = False) -> List[int]:
+    """Recompute the rollups of the given decks in one statement, returning the ids that had drifted"""
+    if not deck_ids:
+        return []
+
+    actual = _actual_rollups(deck_ids)
+    if dry_run:
+        return list(db.scalars(select(DeckORM.id).join(actual, _drifted(actual))))
+
+    repaired = db.execute(
+        update(DeckORM).where(_drifted(actual)).values(
+            card_count=actual.c.card_count,
+            progress=actual.c.progress,
+            version=DeckORM.version + 1
+        ).returning(DeckORM.id, DeckORM.is_public)
+        .execution_options(synchronize_session="fetch", **{SKIP_CATALOG_INVALIDATION: True})
+    ).all()
+    note_deck_changes(db, [deck_id for deck_id, _ in repaired])
+    if any(is_public for _, is_public in repaired):
+        mark_catalog_changed(db)
+    return [deck_id for deck_id, _ in repaired]
+
+
+def refresh_subscriber_rollups(db: Session, source_deck_id: int, batch_size: int = 500) -> List[int]:
+    """Repair the rollups of decks subscribed to a deck whose cards were added or removed, a batch per transaction"""
+    repaired = []
+    last_id = 0
+    while True:
+        subscriber_ids = list(db.scalars(
+            select(DeckORM.id).where(DeckORM.subscribed_deck_id == source_deck_id, DeckORM.id > last_id)
+            .order_by(DeckORM.id).limit(batch_size)
+        ))
+        if not subscriber_ids:
+            return repaired
+        last_id = subscriber_ids[-1]
+        repaired.extend(repair_rollups(db, subscriber_ids))
+        db.commit()
+
+
+def refresh_deck_subscribers(source_deck_id: int):
+    """Background task entry point: refresh the rollups of a deck's subscribers in a session of its own"""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        refresh_subscriber_rollups(db, source_deck_id)
+    except Exception as e:
+        db.rollback()
+        # Drift is left for the checker (python -m app.deck_rollups --repair) to fix
+        logger.error(f"Failed to refresh rollups of decks subscribed to deck {source_deck_id}: {str(e)}")
+    finally:
+        db.close()
+
+
+def check_rollups(db: Session, repair: bool = False, batch_size: int = 500) -> DeckRollupReport:
+    """Compare every deck's rollups with its cards, batch by batch, and optionally repair drift"""
+    started = time.monotonic()
+    report = DeckRollupReport(dry_run=not repair)
+    last_id = 0
+
+    while True:
+        deck_ids = list(db.scalars(
+            select(DeckORM.id).where(DeckORM.id > last_id).order_by(DeckORM.id).limit(batch_size)
+        ))
+        if not deck_ids:
+            break
+        last_id = deck_ids[-1]
+
+        drifted = repair_rollups(db, deck_ids, dry_run=not repair)
+        if repair:
+            db.commit()
+        report.checked_decks += len(deck_ids)
+        report.drifted_decks += len(drifted)
+        if repair:
+            report.repaired_decks += len(drifted)
+        report.sample_deck_ids.extend(drifted[:SAMPLE_SIZE - len(report.sample_deck_ids)])
+
+    report.duration_seconds = round(time.monotonic() - started, 3)
+    logger.info(f"Deck rollup check: {report.drifted_decks}/{report.checked_decks} decks drifted, {report.repaired_decks} repaired")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check deck card counts and progress against their cards")
+    parser.add_argument("--repair", action="store_true", help="Repair drifted decks (default is a dry run)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        report = check_rollups(db, repair=args.repair, batch_size=args.batch_size)
+        print(report.model_dump_json(indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
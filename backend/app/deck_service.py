@@ -1,22 +1,73 @@
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple
 import logging
 
+from sqlalchemy import Row, delete, func, insert, literal, null, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.models import Deck as DeckORM, Card as CardORM, User as UserORM
-from app.schemas import DeckCreate, DeckWithCardsCreate, DeckWithCardsResponse, Card as CardSchema, CardCreate
+from app.models import Deck as DeckORM, Card as CardORM, User as UserORM, DeckSnapshot as DeckSnapshotORM
+from app.schemas import DeckCreate, DeckWithCardsCreate, DeckWithCardsResponse, Card as CardSchema, CardCreate, DeckCardsDelta, DeckOut, DeckStats
 from app.voice_service import voice_generator
 from app.utils import label_to_field_name, validate_custom_fields
+from app.card_serialization import CARD_LIST_COLUMNS
+from app.pagination import keyset_page
+from app.catalog_search import CatalogSearchService
+from app.snapshot_service import DeckSnapshotService
+from app.subscription_service import SubscriptionService, user_cards_subquery
+from app.deck_sync_service import content_hash
+from app.deck_rollups import apply_deck_delta
+from app.sync_log import record_card_deletions, record_deck_deletions
+from app.user_deck_cache import cached_user_data
+import app.catalog_cache  # noqa: F401  Registers catalog version tracking on sessions
+from app.deck_tombstones import register as register_tombstones
 
 logger = logging.getLogger(__name__)
 
+# Hide deleted decks from session queries
+register_tombstones()
+
+# Accuracy at which a card counts as mastered (as in the analytics)
+MASTERED_ACCURACY = 0.9
+
 
 class DeckService:
     def __init__(self, db: Session):
         self.db = db
 
+    def _update_rollups(self, deck: DeckORM, card_delta: int = 0, accuracy_delta: float = 0.0):
+        """
+        Apply a change in a deck's cards to its card count and progress
+
+        Decks subscribed to it are refreshed afterwards by the caller's
+        background task (see app.deck_rollups.refresh_deck_subscribers).
+        """
+        self.db.flush()
+        apply_deck_delta(self.db, deck.id, card_delta, accuracy_delta)
+
+    def _generate_audio(self, language: str, front: str) -> Optional[str]:
+        """Get TTS audio for a card front with fault tolerance (None if unavailable)"""
+        try:
+            if voice_generator.is_language_supported(language):
+                audio_path = voice_generator.get_voice(language, front)
+                if audio_path:
+                    logger.info(f"Generated audio for '{front}' in {language}: {audio_path}")
+                else:
+                    logger.warning(f"Failed to generate audio for '{front}' in {language}")
+                return audio_path
+            logger.info(f"Audio generation skipped for '{front}' - language '{language}' not supported for TTS")
+        except Exception as e:
+            logger.error(f"Audio generation failed for '{front}' in {language}: {e}")
+        return None
+
+    def _touch_deck(self, deck: DeckORM):
+        """Mark a deck as modified (it or its cards changed) and republish its snapshot if it is public"""
+        deck.last_modified = datetime.utcnow()
+        deck.version = DeckORM.version + 1
+        if deck.is_public:
+            self.db.flush()
+            DeckSnapshotService(self.db).build(deck)
+
     def create_deck(self, deck_data: DeckCreate, user_id: str) -> DeckORM:
         """Create a single deck without cards"""
         # Get user's selected language
@@ -127,6 +178,11 @@ class DeckService:
                 self.db.add(db_card)
                 db_cards.append(db_card)
             
+            # Publish the card snapshot together with the deck
+            if db_deck.is_public:
+                self.db.flush()
+                DeckSnapshotService(self.db).build(db_deck)
+            
             # Commit transaction
             self.db.commit()
             
@@ -154,17 +210,64 @@ class DeckService:
             self.db.rollback()
             raise Exception(f"Failed to create deck with cards: {str(e)}")
 
-    def get_user_decks(self, user_id: str) -> List[DeckORM]:
-        """Get all decks for a specific user filtered by their selected language"""
+    def get_user_decks(self, user_id: str) -> List[DeckOut]:
+        """Get all decks for a specific user filtered by their selected language (cached, see app.user_deck_cache)"""
+        def build():
+            # Get user's selected language
+            user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
+            user_language = user.selected_language if user and user.selected_language else 'en'
+
+            decks = self.db.query(DeckORM).filter(
+                DeckORM.user_id == user_id,
+                DeckORM.language == user_language
+            ).all()
+            return [DeckOut.model_validate(deck, from_attributes=True).model_dump() for deck in decks]
+
+        return [DeckOut.model_validate(deck) for deck in cached_user_data(user_id, "decks", (), build)]
+
+    def get_user_decks_with_stats(self, user_id: str, threshold: Optional[float] = None) -> List[DeckOut]:
+        """
+        Get all decks for a user in their selected language with per-deck study stats
+
+        The stats of every deck come from one GROUP BY deck_id over the user's cards
+        (inherited cards of subscribed decks included), instead of one stats query per deck.
+        """
         # Get user's selected language
         user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
         user_language = user.selected_language if user and user.selected_language else 'en'
-        
-        return self.db.query(DeckORM).filter(
+
+        # Use provided threshold or default to 0.5 (50%) for unfamiliar count
+        accuracy_threshold = threshold if threshold is not None else 0.5
+
+        user_cards = user_cards_subquery(user_id, user_language)
+        per_deck = select(
+            user_cards.c.deck_id,
+            func.count().filter(user_cards.c.total_attempts == 0).label("new_count"),
+            func.count().filter(user_cards.c.accuracy < accuracy_threshold).label("unfamiliar_count"),
+            func.count().filter(user_cards.c.accuracy >= MASTERED_ACCURACY).label("mastered_count"),
+            func.max(user_cards.c.last_reviewed_at).label("last_reviewed_at")
+        ).group_by(user_cards.c.deck_id).subquery("deck_stats")
+
+        rows = self.db.query(DeckORM, per_deck).outerjoin(
+            per_deck, per_deck.c.deck_id == DeckORM.id
+        ).filter(
             DeckORM.user_id == user_id,
             DeckORM.language == user_language
         ).all()
 
+        decks = []
+        for row in rows:
+            deck = DeckOut.model_validate(row.Deck, from_attributes=True)
+            # Decks without cards have no stats row
+            deck.stats = DeckStats(
+                new_count=row.new_count or 0,
+                unfamiliar_count=row.unfamiliar_count or 0,
+                mastered_count=row.mastered_count or 0,
+                last_reviewed_at=row.last_reviewed_at
+            )
+            decks.append(deck)
+        return decks
+
     def get_deck_by_id(self, deck_id: int, user_id: str) -> DeckORM:
         """Get a specific deck by ID for a user in their selected language"""
         # Get user's selected language
@@ -183,8 +286,21 @@ class DeckService:
         
         return deck
 
-    def get_user_deck_cards(self, deck_id: int, user_id: str) -> List[CardORM]:
-        """Get all cards for a specific deck belonging to a user in their selected language"""
+    def get_user_deck_cards(self, deck_id: int, user_id: str, limit: Optional[int] = None,
+                            cursor: Optional[str] = None, full: bool = False) -> Tuple[List[Sequence], Optional[str]]:
+        """
+        Get a page of cards for a user's deck in their selected language (cached, see app.user_deck_cache)
+
+        Rows hold the response columns (CARD_LIST_COLUMNS order) and are ordered by id.
+        """
+        rows, next_cursor = cached_user_data(
+            user_id, "deck_cards", (deck_id, limit, cursor, full),
+            lambda: self._load_user_deck_cards(deck_id, user_id, limit, cursor, full)
+        )
+        return rows, next_cursor
+
+    def _load_user_deck_cards(self, deck_id: int, user_id: str, limit: Optional[int],
+                              cursor: Optional[str], full: bool = False) -> Tuple[List[tuple], Optional[str]]:
         # Get user's selected language
         user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
         user_language = user.selected_language if user and user.selected_language else 'en'
@@ -199,22 +315,42 @@ class DeckService:
         if not deck:
             raise Exception("Deck not found or access denied")
         
-        return self.db.query(CardORM).filter(CardORM.deck_id == deck_id).all()
+        if deck.subscribed_deck_id:
+            # Inherited cards come from the source deck, merged with the deck's own cards
+            cards = user_cards_subquery(user_id, deck_ids=[deck_id])
+            rows, next_cursor = keyset_page(self.db.query(cards), [cards.c.id], limit, cursor, full=full)
+        else:
+            query = self.db.query(*CARD_LIST_COLUMNS).filter(CardORM.deck_id == deck_id)
+            rows, next_cursor = keyset_page(query, [CardORM.id], limit, cursor, full=full)
+        return [tuple(row) for row in rows], next_cursor
     
-    def get_all_user_cards(self, user_id: str) -> List[CardORM]:
-        """Get all cards from all decks belonging to a user in their selected language"""
-        # Get user's selected language
-        user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
-        user_language = user.selected_language if user and user.selected_language else 'en'
-        
-        # Query all cards from all user's decks that match their language
-        return self.db.query(CardORM).join(DeckORM).filter(
-            DeckORM.user_id == user_id,
-            DeckORM.language == user_language
-        ).all()
+    def get_all_user_cards(self, user_id: str, limit: Optional[int] = None,
+                           cursor: Optional[str] = None, full: bool = False) -> Tuple[List[Sequence], Optional[str]]:
+        """
+        Get a page of cards from all of a user's decks in their selected language (cached, see app.user_deck_cache)
+
+        Rows hold the response columns (CARD_LIST_COLUMNS order) and are ordered by id.
+        """
+        def build():
+            # Get user's selected language
+            user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
+            user_language = user.selected_language if user and user.selected_language else 'en'
+
+            # Query all cards from all user's decks (including subscribed ones) that match their language
+            cards = user_cards_subquery(user_id, user_language)
+            rows, next_cursor = keyset_page(self.db.query(cards), [cards.c.id], limit, cursor, full=full)
+            return [tuple(row) for row in rows], next_cursor
+
+        rows, next_cursor = cached_user_data(user_id, "all_cards", (limit, cursor, full), build)
+        return rows, next_cursor
     
     def delete_deck(self, deck_id: int, user_id: str) -> bool:
-        """Delete a deck and all associated cards for a specific user"""
+        """
+        Delete a deck for a specific user by tombstoning it
+
+        The deck disappears at once; its cards are removed later by the reaper
+        (app.deck_tombstones), so this takes the same time for any deck size.
+        """
         try:
             # Get user's selected language
             user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
@@ -230,11 +366,10 @@ class DeckService:
             if not deck:
                 raise Exception("Deck not found or access denied")
             
-            # Delete all cards associated with the deck first
-            self.db.query(CardORM).filter(CardORM.deck_id == deck_id).delete()
-            
-            # Delete the deck
-            self.db.delete(deck)
+            # Subscribers keep reading its cards until the reaper makes them private copies
+            deck.deleted_at = datetime.utcnow()
+            deck.is_public = False
+            record_deck_deletions(self.db, user_id, [deck_id])
             self.db.commit()
             
             return True
@@ -294,8 +429,9 @@ class DeckService:
             
             self.db.add(db_card)
             
-            # Update deck card count
-            deck.card_count = self.db.query(CardORM).filter(CardORM.deck_id == deck_id).count() + 1
+            # Update deck card count (new cards start at zero accuracy)
+            self._update_rollups(deck, card_delta=1)
+            self._touch_deck(deck)
             
             self.db.commit()
             self.db.refresh(db_card)
@@ -328,8 +464,23 @@ class DeckService:
             if not deck:
                 raise Exception("Deck not found or access denied")
             
-            # Get existing cards
-            existing_cards = {card.id: card for card in self.db.query(CardORM).filter(CardORM.deck_id == deck_id).all()}
+            # A published deck must own its cards, so end any subscription first
+            if deck_data.is_public and deck.subscribed_deck_id:
+                SubscriptionService(self.db).detach([deck.id])
+                self.db.refresh(deck)
+            
+            # Taken private: subscribers keep copies of the cards as published, not what comes next
+            if deck.is_public and not deck_data.is_public:
+                SubscriptionService(self.db).detach_subscribers([deck.id])
+            
+            # Get the existing cards named in the request (not the whole deck)
+            requested_ids = [card_data.id for card_data in deck_data.cards if getattr(card_data, 'id', None)]
+            existing_cards = {
+                card.id: card for card in self.db.query(CardORM).filter(
+                    CardORM.deck_id == deck_id,
+                    CardORM.id.in_(requested_ids)
+                ).all()
+            } if requested_ids else {}
             
             # Start transaction
             # Check if this is transitioning from private to public
@@ -350,12 +501,22 @@ class DeckService:
             
             # Process cards from request
             updated_cards = []
+            subscriptions = SubscriptionService(self.db)
             for card_data in deck_data.cards:
                 card_id = getattr(card_data, 'id', None)
                 
+                if card_id and card_id not in existing_cards and deck.subscribed_deck_id:
+                    # Inherited card: keep reading the source unless the user changed it
+                    changed = subscriptions.inherited_card_changed(deck, card_id, card_data)
+                    if changed is False:
+                        continue
+                    if changed:
+                        existing_cards[card_id] = subscriptions.materialize_card(deck, card_id)
+                
                 if card_id and card_id in existing_cards:
                     # Update existing card, preserve statistics
                     existing_card = existing_cards[card_id]
+                    front_changed = existing_card.front != card_data.front
                     
                     # Update content fields only
                     existing_card.front = card_data.front
@@ -363,26 +524,20 @@ class DeckService:
                     existing_card.custom_data = getattr(card_data, 'custom_data', None)
                     
                     # Generate new audio if front text changed
-                    try:
-                        if voice_generator.is_language_supported(user_language):
-                            audio_path = voice_generator.get_voice(user_language, card_data.front)
-                            if audio_path:
-                                existing_card.audio_path = audio_path
-                                logger.info(f"Updated audio for '{card_data.front}' in {user_language}: {audio_path}")
-                            else:
-                                logger.warning(f"Failed to generate audio for '{card_data.front}' in {user_language}")
-                        else:
-                            logger.info(f"Audio generation skipped for '{card_data.front}' - language '{user_language}' not supported for TTS")
-                    except Exception as e:
-                        logger.error(f"Audio generation failed for '{card_data.front}' in {user_language}: {e}")
+                    if front_changed:
+                        audio_path = self._generate_audio(user_language, card_data.front)
+                        if audio_path:
+                            existing_card.audio_path = audio_path
                     
                     # Keep existing statistics: accuracy, total_attempts, correct_answers, last_reviewed_at, created_at
                     updated_cards.append(existing_card)
                 else:
                     logger.warning(f"Card with ID {card_id} not found in deck {deck_id}. Use POST /decks/{deck_id}/cards to add new cards.")
             
-            # Update deck card count to reflect actual number of cards in database
-            deck.card_count = self.db.query(CardORM).filter(CardORM.deck_id == deck_id).count()
+            # Unpublished decks no longer need a snapshot; public ones get a fresh one
+            if not deck.is_public:
+                self.db.query(DeckSnapshotORM).filter(DeckSnapshotORM.deck_id == deck_id).delete()
+            self._touch_deck(deck)
             
             # Commit transaction
             self.db.commit()
@@ -415,6 +570,141 @@ class DeckService:
             logger.error(f"Error patching deck {deck_id}: {str(e)}")
             raise e
     
+    def apply_card_delta(self, deck_id: int, delta: DeckCardsDelta,
+                         user_id: str) -> Tuple[List[Row], List[Row], List[int], Dict[int, int], int]:
+        """
+        Apply added, changed and removed cards to a deck with bulk statements
+
+        Only the cards named in the delta are read or written, and audio is
+        regenerated only for cards whose front actually changed.
+
+        Returns:
+            (added card rows, changed card rows, removed card ids, replaced card ids
+            (inherited id -> id of the materialized copy), new card count);
+            rows have CARD_LIST_COLUMNS
+        """
+        try:
+            # Get user's selected language
+            user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
+            user_language = user.selected_language if user and user.selected_language else 'en'
+            
+            # Verify deck belongs to user and matches their language
+            deck = self.db.query(DeckORM).filter(
+                DeckORM.id == deck_id, 
+                DeckORM.user_id == user_id,
+                DeckORM.language == user_language
+            ).first()
+            
+            if not deck:
+                raise Exception("Deck not found or access denied")
+            
+            changes = {change.id: change for change in delta.changed}
+            if changes.keys() & set(delta.removed):
+                raise ValueError("A card cannot be both changed and removed")
+            
+            subscriptions = SubscriptionService(self.db)
+            
+            # Current fronts of the changed cards, to detect which need new audio
+            current_fronts = dict(self.db.query(CardORM.id, CardORM.front).filter(
+                CardORM.deck_id == deck_id,
+                CardORM.id.in_(changes.keys())
+            ).all()) if changes else {}
+            replaced = {}
+            if deck.subscribed_deck_id:
+                # Changing an inherited card gives the user their own copy of it
+                for card_id in changes.keys() - current_fronts.keys():
+                    card = subscriptions.materialize_card(deck, card_id)
+                    if card:
+                        changes[card.id] = changes.pop(card_id)
+                        current_fronts[card.id] = card.front
+                        replaced[card_id] = card.id
+            
+            missing = changes.keys() - current_fronts.keys()
+            if missing:
+                raise Exception(f"Cards {sorted(missing)} not found or access denied")
+            
+            audio_by_front = {}
+            def audio_for(front: str) -> Optional[str]:
+                if front not in audio_by_front:
+                    audio_by_front[front] = self._generate_audio(user_language, front)
+                return audio_by_front[front]
+            
+            # Removed cards: one DELETE (inherited cards of a subscription are hidden instead)
+            removed = []
+            removed_accuracy = 0.0
+            if delta.removed:
+                for card_id, accuracy in self.db.execute(
+                    delete(CardORM).where(
+                        CardORM.deck_id == deck_id,
+                        CardORM.id.in_(delta.removed)
+                    ).returning(CardORM.id, CardORM.accuracy).execution_options(synchronize_session=False)
+                ):
+                    removed.append(card_id)
+                    removed_accuracy += accuracy or 0.0
+                if deck.subscribed_deck_id:
+                    for card_id in set(delta.removed) - set(removed):
+                        accuracy = subscriptions.hide_card(deck, card_id)
+                        if accuracy is not None:
+                            removed.append(card_id)
+                            removed_accuracy += accuracy
+            
+            # Changed cards: one executemany UPDATE by primary key, statistics untouched
+            changed = []
+            if changes:
+                updates = []
+                for card_id, change in changes.items():
+                    values = change.model_dump(include=change.model_fields_set - {"id"})
+                    for field in ("front", "back"):
+                        if values.get(field) is None:
+                            values.pop(field, None)
+                    if "front" in values and values["front"] != current_fronts[card_id]:
+                        values["audio_path"] = audio_for(values["front"])
+                    if values:
+                        updates.append({"id": card_id, **values})
+                if updates:
+                    self.db.execute(update(CardORM), updates)
+                changed = self.db.query(*CARD_LIST_COLUMNS).filter(
+                    CardORM.id.in_(changes.keys())
+                ).order_by(CardORM.id).all()
+            
+            # Added cards: one multi-row INSERT ... RETURNING
+            added = []
+            if delta.added:
+                created_at = datetime.now()
+                added = self.db.execute(
+                    insert(CardORM).returning(*CARD_LIST_COLUMNS, sort_by_parameter_order=True),
+                    [
+                        {
+                            "deck_id": deck_id,
+                            "front": card_data.front.strip(),
+                            "back": card_data.back.strip(),
+                            "accuracy": 0.0,
+                            "total_attempts": 0,
+                            "correct_answers": 0,
+                            "created_at": created_at,
+                            "audio_path": audio_for(card_data.front.strip()),
+                            "custom_data": card_data.custom_data
+                        }
+                        for card_data in delta.added
+                    ]
+                ).all()
+            
+            record_card_deletions(self.db, user_id, deck_id, removed)
+            self._update_rollups(deck, len(added) - len(removed), -removed_accuracy)
+            self._touch_deck(deck)
+            self.db.commit()
+            
+            return added, changed, removed, replaced, deck.card_count
+            
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Failed to apply card changes to deck {deck_id}: {str(e)}")
+            raise Exception(f"Failed to apply card changes: {str(e)}")
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error applying card changes to deck {deck_id}: {str(e)}")
+            raise e
+    
     def delete_card(self, deck_id: int, card_id: int, user_id: str) -> bool:
         """Delete a specific card from a deck for a specific user"""
         try:
@@ -438,14 +728,20 @@ class DeckService:
                 CardORM.deck_id == deck_id
             ).first()
             
-            if not card:
-                raise Exception("Card not found or access denied")
+            if card:
+                # Delete the card
+                removed_accuracy = card.accuracy or 0.0
+                self.db.delete(card)
+            else:
+                removed_accuracy = SubscriptionService(self.db).hide_card(deck, card_id)
+                if removed_accuracy is None:
+                    raise Exception("Card not found or access denied")
             
-            # Delete the card
-            self.db.delete(card)
+            record_card_deletions(self.db, user_id, deck_id, [card_id])
             
-            # Update deck card count
-            deck.card_count = self.db.query(CardORM).filter(CardORM.deck_id == deck_id).count() - 1
+            # Update deck card count and progress
+            self._update_rollups(deck, card_delta=-1, accuracy_delta=-removed_accuracy)
+            self._touch_deck(deck)
             
             self.db.commit()
             
@@ -483,28 +779,27 @@ class DeckService:
                 CardORM.deck_id == deck_id
             ).first()
             
+            # Editing an inherited card of a subscribed deck gives the user their own copy
+            if not card and deck.subscribed_deck_id:
+                card = SubscriptionService(self.db).materialize_card(deck, card_id)
+            
             if not card:
                 raise Exception("Card not found or access denied")
             
+            front_changed = card.front != card_data.front
+            
             # Update content fields only, preserve statistics
             card.front = card_data.front
             card.back = card_data.back
             card.custom_data = getattr(card_data, 'custom_data', None)
             
             # Generate new audio if front text changed
-            try:
-                if voice_generator.is_language_supported(user_language):
-                    audio_path = voice_generator.get_voice(user_language, card_data.front)
-                    if audio_path:
-                        card.audio_path = audio_path
-                        logger.info(f"Updated audio for '{card_data.front}' in {user_language}: {audio_path}")
-                    else:
-                        logger.warning(f"Failed to generate audio for '{card_data.front}' in {user_language}")
-                else:
-                    logger.info(f"Audio generation skipped for '{card_data.front}' - language '{user_language}' not supported for TTS")
-            except Exception as e:
-                logger.error(f"Audio generation failed for '{card_data.front}' in {user_language}: {e}")
+            if front_changed:
+                audio_path = self._generate_audio(user_language, card_data.front)
+                if audio_path:
+                    card.audio_path = audio_path
             
+            self._touch_deck(deck)
             self.db.commit()
             self.db.refresh(card)
             
@@ -519,8 +814,9 @@ class DeckService:
             logger.error(f"Error updating card {card_id} in deck {deck_id}: {str(e)}")
             raise e
 
-    def get_public_decks(self, language: str = None, search: str = None):
-        """Get all public decks with author information"""
+    def get_public_decks(self, language: str = None, search: str = None, limit: Optional[int] = None,
+                         cursor: Optional[str] = None, full: bool = False):
+        """Get a page of public decks with author information, most recently updated first"""
         try:
             from app.schemas import PublicDeckOut
 
@@ -542,19 +838,14 @@ class DeckService:
             if language and language.lower() != 'all':
                 query = query.filter(DeckORM.language == language.lower())
 
-            # Apply search filter if provided
-            if search:
-                search_term = f"%{search}%"
-                query = query.filter(
-                    (DeckORM.name.ilike(search_term)) |
-                    (UserORM.name.ilike(search_term)) |
-                    (DeckORM.language.ilike(search_term))
-                )
+            # Apply search filter if provided (index-backed, see CatalogSearchService)
+            if search and search.strip():
+                query = query.filter(CatalogSearchService.match_condition(search))
 
-            # Order by last_modified descending (most recently updated first)
-            query = query.order_by(DeckORM.last_modified.desc())
-
-            results = query.all()
+            # Order by last_modified descending (most recently updated first), id breaks ties
+            results, next_cursor = keyset_page(
+                query, [DeckORM.last_modified, DeckORM.id], limit, cursor, descending=True, full=full
+            )
 
             # Convert to PublicDeckOut objects
             public_decks = []
@@ -571,7 +862,7 @@ class DeckService:
                 )
                 public_decks.append(public_deck)
 
-            return public_decks
+            return public_decks, next_cursor
 
         except SQLAlchemyError as e:
             logger.error(f"Failed to get public decks: {str(e)}")
@@ -580,8 +871,9 @@ class DeckService:
             logger.error(f"Error getting public decks: {str(e)}")
             raise e
 
-    def get_public_deck_cards(self, deck_id: int) -> List[CardORM]:
-        """Get cards from a public deck (no authentication required)"""
+    def get_public_deck_cards(self, deck_id: int, limit: Optional[int] = None,
+                              cursor: Optional[str] = None, full: bool = False) -> Tuple[List[Row], Optional[str]]:
+        """Get a page of cards from a public deck, newest first (no authentication required)"""
         try:
             # Verify deck exists and is public
             deck = self.db.query(DeckORM).filter(
@@ -592,12 +884,9 @@ class DeckService:
             if not deck:
                 raise Exception("Public deck not found")
 
-            # Get all cards for this deck
-            cards = self.db.query(CardORM).filter(
-                CardORM.deck_id == deck_id
-            ).order_by(CardORM.created_at.desc()).all()
-
-            return cards
+            # Get cards for this deck, newest first with id breaking ties
+            query = self.db.query(*CARD_LIST_COLUMNS).filter(CardORM.deck_id == deck_id)
+            return keyset_page(query, [CardORM.created_at, CardORM.id], limit, cursor, descending=True, full=full)
 
         except SQLAlchemyError as e:
             logger.error(f"Failed to get public deck cards: {str(e)}")
@@ -622,13 +911,8 @@ class DeckService:
 
             source_deck, original_author = source_deck_with_author
 
-            # Get all cards from the source deck
-            source_cards = self.db.query(CardORM).filter(
-                CardORM.deck_id == public_deck_id
-            ).all()
-
-            # Start transaction
-            # Create new deck for the user (always private)
+            # Create new deck for the user (always private); the card count is computed in SQL
+            copied_at = datetime.now()
             new_deck = DeckORM(
                 name=source_deck.name,
                 is_public=False,  # Always create as private
@@ -636,49 +920,44 @@ class DeckService:
                 language=source_deck.language,
                 created_at=datetime.now(),
                 progress=0.0,
-                card_count=len(source_cards),
+                card_count=select(func.count(CardORM.id)).where(
+                    CardORM.deck_id == public_deck_id
+                ).scalar_subquery(),
                 original_author_name=original_author.name or original_author.email.split('@')[0],  # Use name or email prefix
-                copied_from_deck_id=public_deck_id
+                copied_from_deck_id=public_deck_id,
+                last_synced_at=copied_at
             )
             self.db.add(new_deck)
-            self.db.commit()
-            self.db.refresh(new_deck)
-
-            # Copy all cards with fresh statistics
-            new_cards = []
-            for source_card in source_cards:
-                new_card = CardORM(
-                    deck_id=new_deck.id,
-                    front=source_card.front,
-                    back=source_card.back,
-                    accuracy=0.0,  # Reset statistics
-                    total_attempts=0,
-                    correct_answers=0,
-                    last_reviewed_at=None,
-                    created_at=datetime.now(),
-                    audio_path=source_card.audio_path,  # Keep audio path reference
-                    custom_data=source_card.custom_data  # Keep custom data
-                )
-                self.db.add(new_card)
-                new_cards.append(new_card)
-
-            # Generate audio for copied cards if needed
-            for card in new_cards:
-                try:
-                    if not card.audio_path and card.front:
-                        audio_path = voice_generator.generate_audio(card.front, source_deck.language)
-                        if audio_path:
-                            card.audio_path = audio_path
-                except Exception as audio_error:
-                    logger.warning(f"Failed to generate audio for copied card {card.id}: {str(audio_error)}")
-                    # Continue without audio - don't fail the entire operation
+            self.db.flush()
+
+            # Copy all cards server-side in one statement, resetting statistics and linking
+            # each copy to its source for later syncs
+            source_cards = select(
+                literal(new_deck.id),
+                CardORM.id,
+                content_hash(CardORM),
+                CardORM.front,
+                CardORM.back,
+                literal(0.0),
+                literal(0),
+                literal(0),
+                null(),
+                literal(copied_at),
+                CardORM.audio_path,  # Keep audio path reference
+                CardORM.custom_data  # Keep custom data
+            ).where(CardORM.deck_id == public_deck_id).order_by(CardORM.id)
+
+            copy_cards = insert(CardORM).from_select(
+                [CardORM.deck_id, CardORM.source_card_id, CardORM.source_hash, CardORM.front, CardORM.back,
+                 CardORM.accuracy, CardORM.total_attempts,
+                 CardORM.correct_answers, CardORM.last_reviewed_at, CardORM.created_at,
+                 CardORM.audio_path, CardORM.custom_data],
+                source_cards
+            ).returning(*CARD_LIST_COLUMNS)
+            new_cards = sorted(self.db.execute(copy_cards).all(), key=lambda row: row.id)
 
             self.db.commit()
-
-            # Refresh all objects
             self.db.refresh(new_deck)
-            for card in new_cards:
-                self.db.refresh(card)
 
             # Convert to response schema
             card_schemas = [CardSchema.model_validate(card) for card in new_cards]
@@ -0,0 +1,169 @@
+from datetime import datetime
+import logging
+
+from sqlalchemy import Text, and_, cast, delete, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models import Deck as DeckORM, Card as CardORM, User as UserORM
+from app.schemas import DeckSyncResult
+from app.deck_rollups import apply_deck_delta
+from app.deck_versions import bump_deck_versions
+from app.sync_log import record_card_deletions
+
+logger = logging.getLogger(__name__)
+
+# Separates hashed fields so ("ab", "c") and ("a", "bc") hash differently
+_HASH_SEPARATOR = "\x1f"
+
+
+def content_hash(card) -> ColumnElement:
+    """SQL expression hashing a card's content (front, back, custom data) for change detection"""
+    return func.md5(
+        card.front + _HASH_SEPARATOR + card.back + _HASH_SEPARATOR
+        + func.coalesce(cast(card.custom_data, Text), "")
+    )
+
+
+class DeckSyncService:
+    """
+    Pulls an author's updates into decks copied from a public deck.
+
+    Copied cards keep a link to their source card (``Card.source_card_id``) and
+    the content hash of the source at the last copy or sync (``Card.source_hash``).
+    Comparing hashes server-side yields the delta, and each part of it is applied
+    as one set-based statement, so a sync costs O(changes) and never touches
+    review statistics:
+
+    - new: source cards created since the last sync that no copied card links to
+    - changed: linked cards whose source hash differs from the recorded one; cards
+      the user edited since (own hash differs too) are left alone and reported as
+      conflicts
+    - removed: cards whose source card was deleted (the link is cleared by the
+      foreign key); unedited ones are deleted, edited ones are kept as the user's own
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def pull_updates(self, deck_id: int, user_id: str) -> DeckSyncResult:
+        """Apply the source deck's changes since the last sync to a copied deck"""
+        try:
+            # Get user's selected language
+            user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
+            user_language = user.selected_language if user and user.selected_language else 'en'
+
+            # Verify deck belongs to user and matches their language
+            deck = self.db.query(DeckORM).filter(
+                DeckORM.id == deck_id,
+                DeckORM.user_id == user_id,
+                DeckORM.language == user_language
+            ).first()
+
+            if not deck:
+                raise Exception("Deck not found or access denied")
+            if deck.subscribed_deck_id:
+                raise ValueError("Subscribed decks always show the source deck's current cards")
+            if not deck.copied_from_deck_id:
+                raise ValueError("Deck was not copied from a public deck")
+
+            source_deck = self.db.query(DeckORM).filter(
+                DeckORM.id == deck.copied_from_deck_id,
+                DeckORM.is_public == True
+            ).first()
+            if not source_deck:
+                raise Exception("Public deck not found")
+
+            # Card timestamps use local time (see DeckService)
+            synced_at = datetime.now()
+            since = deck.last_synced_at or deck.created_at
+            source = aliased(CardORM, name="source_card")
+            unedited = content_hash(CardORM) == CardORM.source_hash
+
+            # Changed: take the source's content where the user hasn't edited their copy
+            updated = self.db.execute(
+                update(CardORM).where(
+                    CardORM.deck_id == deck.id,
+                    CardORM.source_card_id == source.id,
+                    CardORM.source_hash.isnot(None),
+                    content_hash(source) != CardORM.source_hash,
+                    unedited
+                ).values(
+                    front=source.front,
+                    back=source.back,
+                    custom_data=source.custom_data,
+                    audio_path=source.audio_path,
+                    source_hash=content_hash(source)
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+
+            conflicts = self.db.execute(
+                select(func.count()).select_from(CardORM).join(source, CardORM.source_card_id == source.id).where(
+                    CardORM.deck_id == deck.id,
+                    CardORM.source_hash.isnot(None),
+                    content_hash(source) != CardORM.source_hash
+                )
+            ).scalar()
+
+            # Removed: the source card is gone, so the foreign key cleared the link
+            orphaned = and_(
+                CardORM.deck_id == deck.id,
+                CardORM.source_card_id.is_(None),
+                CardORM.source_hash.isnot(None)
+            )
+            removed_cards = self.db.execute(
+                delete(CardORM).where(orphaned, unedited).returning(CardORM.id, CardORM.accuracy)
+                .execution_options(synchronize_session=False)
+            ).all()
+            removed = len(removed_cards)
+            record_card_deletions(self.db, deck.user_id, deck.id, [card_id for card_id, _ in removed_cards])
+            self.db.execute(
+                update(CardORM).where(orphaned).values(source_hash=None)
+                .execution_options(synchronize_session=False)
+            )
+
+            # New: source cards added since the last sync
+            added = self.db.execute(
+                insert(CardORM).from_select(
+                    [CardORM.deck_id, CardORM.source_card_id, CardORM.source_hash, CardORM.front, CardORM.back,
+                     CardORM.accuracy, CardORM.total_attempts, CardORM.correct_answers, CardORM.created_at,
+                     CardORM.audio_path, CardORM.custom_data],
+                    select(
+                        literal(deck.id), source.id, content_hash(source), source.front, source.back,
+                        literal(0.0), literal(0), literal(0), literal(synced_at), source.audio_path, source.custom_data
+                    ).where(
+                        source.deck_id == source_deck.id,
+                        source.created_at > since,
+                        ~exists().where(CardORM.deck_id == deck.id, CardORM.source_card_id == source.id)
+                    ).order_by(source.id)
+                )
+            ).rowcount
+
+            # New cards start at zero accuracy
+            apply_deck_delta(self.db, deck.id, added - removed, -sum(accuracy or 0.0 for _, accuracy in removed_cards))
+            deck.last_synced_at = synced_at
+            if added or updated or removed:
+                bump_deck_versions(self.db, [deck.id])
+            self.db.commit()
+
+            logger.info(f"Synced deck {deck_id} from {source_deck.id}: +{added} ~{updated} -{removed} ({conflicts} conflicts)")
+            return DeckSyncResult(
+                deck_id=deck.id,
+                source_deck_id=source_deck.id,
+                added=added,
+                updated=updated,
+                removed=removed,
+                conflicts=conflicts,
+                card_count=deck.card_count,
+                synced_at=synced_at
+            )
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Failed to sync deck {deck_id}: {str(e)}")
+            raise Exception(f"Failed to sync deck: {str(e)}")
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error syncing deck {deck_id}: {str(e)}")
+            raise e
@@ -0,0 +1,141 @@
+"""
+Soft deletion of decks.
+
+Deleting a deck only sets ``Deck.deleted_at`` (and unpublishes it), one row
+update however many cards the deck has. From then on the deck is invisible:
+every ORM SELECT run through SessionLocal gets a ``deleted_at IS NULL``
+criterion for Deck, aliases included, unless it is executed with the
+``include_deleted_decks`` execution option. The criterion is installed by
+``register()``, which the deck service and the command-line entry points call.
+
+The reaper removes tombstoned decks afterwards, off the request path. It
+materializes the cards of decks still subscribed to the deck, deletes the
+cards in batches and then the deck row; review states, snapshots and study
+sessions go with it through ON DELETE CASCADE.
+
+Usage:
+    python -m app.deck_tombstones       # reap every tombstoned deck
+"""
+
+import argparse
+from typing import List
+import logging
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from app.database import SessionLocal
+from app.models import Deck as DeckORM, Card as CardORM
+from app.subscription_service import SubscriptionService
+
+logger = logging.getLogger(__name__)
+
+# Execution option that lets a SELECT see tombstoned decks
+INCLUDE_DELETED_DECKS = "include_deleted_decks"
+REAP_BATCH_SIZE = 5000
+# Subscribing decks materialized per transaction
+DETACH_BATCH_SIZE = 20
+
+
+def _hide_deleted_decks(execute_state):
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get(INCLUDE_DELETED_DECKS, False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(DeckORM, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+        )
+
+
+def register():
+    """Hide tombstoned decks from SessionLocal queries (safe to call more than once)"""
+    if not event.contains(SessionLocal, "do_orm_execute", _hide_deleted_decks):
+        event.listen(SessionLocal, "do_orm_execute", _hide_deleted_decks)
+
+
+def tombstoned_deck_ids(db: Session) -> List[int]:
+    return list(db.scalars(
+        select(DeckORM.id).where(DeckORM.deleted_at.isnot(None)).order_by(DeckORM.id)
+        .execution_options(**{INCLUDE_DELETED_DECKS: True})
+    ))
+
+
+def detach_subscribers_in_batches(db: Session, deck_id: int):
+    """Turn the decks subscribed to a deck about to be deleted into private copies, a few per transaction"""
+    subscriptions = SubscriptionService(db)
+    while True:
+        # Tombstoned subscribers aren't listed; the FK drops their subscription
+        subscriber_ids = list(db.scalars(
+            select(DeckORM.id).where(DeckORM.subscribed_deck_id == deck_id).limit(DETACH_BATCH_SIZE)
+        ))
+        if not subscriber_ids:
+            return
+        subscriptions.detach(subscriber_ids)
+        db.commit()
+
+
+def reap_deck(db: Session, deck_id: int, batch_size: int = REAP_BATCH_SIZE) -> int:
+    """Physically delete a tombstoned deck, a batch of cards per transaction. Returns the cards deleted."""
+    tombstoned = db.scalar(
+        select(DeckORM.id).where(DeckORM.id == deck_id, DeckORM.deleted_at.isnot(None))
+        .execution_options(**{INCLUDE_DELETED_DECKS: True})
+    )
+    if tombstoned is None:
+        return 0
+
+    detach_subscribers_in_batches(db, deck_id)
+
+    deleted_cards = 0
+    while True:
+        batch = select(CardORM.id).where(CardORM.deck_id == deck_id).limit(batch_size).scalar_subquery()
+        count = db.execute(delete(CardORM).where(CardORM.id.in_(batch))).rowcount
+        db.commit()
+        if not count:
+            break
+        deleted_cards += count
+
+    db.execute(delete(DeckORM).where(DeckORM.id == deck_id, DeckORM.deleted_at.isnot(None)))
+    db.commit()
+    logger.info(f"Reaped deck {deck_id} with {deleted_cards} cards")
+    return deleted_cards
+
+
+def reap_deleted_deck(deck_id: int):
+    """Background task entry point: reap one tombstoned deck in a session of its own"""
+    db = SessionLocal()
+    try:
+        reap_deck(db, deck_id)
+    except Exception as e:
+        db.rollback()
+        # The tombstone stays, so the next reaper run picks the deck up again
+        logger.error(f"Failed to reap deck {deck_id}: {str(e)}")
+    finally:
+        db.close()
+
+
+def reap_deleted_decks(db: Session, batch_size: int = REAP_BATCH_SIZE) -> int:
+    """Reap every tombstoned deck, returning how many were removed"""
+    deck_ids = tombstoned_deck_ids(db)
+    for deck_id in deck_ids:
+        reap_deck(db, deck_id, batch_size)
+    return len(deck_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Physically delete decks that were deleted (tombstoned)")
+    parser.add_argument("--batch-size", type=int, default=REAP_BATCH_SIZE)
+    args = parser.parse_args()
+
+    register()
+    db = SessionLocal()
+    try:
+        reaped = reap_deleted_decks(db, batch_size=args.batch_size)
+        print(f"Reaped {reaped} decks")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Deck versions and ETags for a user's deck endpoints.
+
+``Deck.version`` advances in the same transaction as any change to a deck or
+its cards (including review statistics and rollups). ETags of
+``GET /decks``, ``GET /decks/{id}`` and ``GET /decks/{id}/cards`` are built
+from versions alone, so a revalidation costs one indexed lookup and a
+matching If-None-Match is answered with 304 before any card is loaded.
+
+A subscribed deck's content also depends on its source deck, so the source's
+version is part of the ETag instead of every author change being fanned out
+to the subscribers' rows.
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.catalog_cache import SKIP_CATALOG_INVALIDATION
+from app.models import Deck as DeckORM, User as UserORM
+from app.etag import make_etag
+from app.user_deck_cache import note_deck_changes
+
+# Browsers may keep the responses but must revalidate them (a cheap 304) on every use
+USER_DECK_CACHE_CONTROL = "private, no-cache"
+
+_SourceDeck = aliased(DeckORM, name="source_deck")
+
+
+def bump_deck_versions(db: Session, deck_ids: Iterable[int]):
+    """Advance the version of the given decks with a single UPDATE (and invalidate their cached lists)
+
+    Versions aren't part of catalog responses, so this leaves the catalog cache alone.
+    """
+    deck_ids = sorted(set(deck_ids))
+    if not deck_ids:
+        return
+    note_deck_changes(db, deck_ids)
+    db.execute(
+        update(DeckORM).where(DeckORM.id.in_(deck_ids)).values(version=DeckORM.version + 1)
+        .execution_options(synchronize_session=False, **{SKIP_CATALOG_INVALIDATION: True})
+    )
+
+
+def _user_language():
+    return func.coalesce(UserORM.selected_language, "en")
+
+
+def deck_etag(db: Session, deck_id: int, user_id: str) -> Optional[str]:
+    """ETag of one of the user's decks in their selected language (None if there is no such deck)"""
+    row = db.execute(
+        select(DeckORM.version, _SourceDeck.version)
+        .join(UserORM, UserORM.uid == DeckORM.user_id)
+        .outerjoin(_SourceDeck, _SourceDeck.id == DeckORM.subscribed_deck_id)
+        .where(DeckORM.id == deck_id, DeckORM.user_id == user_id, DeckORM.language == _user_language())
+    ).first()
+    if row is None:
+        return None
+    version, source_version = row
+    return make_etag("deck", deck_id, version, source_version or 0)
+
+
+def deck_list_etag(db: Session, user_id: str) -> str:
+    """ETag of the user's deck list in their selected language, from one aggregate over their decks"""
+    row = db.execute(
+        select(
+            _user_language(),
+            func.count(DeckORM.id),
+            func.coalesce(func.max(DeckORM.id), 0),
+            func.coalesce(func.sum(DeckORM.version), 0),
+            func.coalesce(func.sum(_SourceDeck.version), 0)
+        )
+        .select_from(UserORM)
+        .outerjoin(DeckORM, (DeckORM.user_id == UserORM.uid) & (DeckORM.language == _user_language()))
+        .outerjoin(_SourceDeck, _SourceDeck.id == DeckORM.subscribed_deck_id)
+        .where(UserORM.uid == user_id)
+        .group_by(UserORM.selected_language)
+    ).first()
+    return make_etag("decks", *(row or ("en", 0, 0, 0, 0)))
@@ -0,0 +1,176 @@
+"""
+Delta sync for offline-capable clients.
+
+``GET /sync`` returns what changed in a user's collection since the cursor
+of their previous sync:
+
+- decks modified or created since then (``Deck.last_modified``)
+- own cards changed since then (``Card.updated_at``, via ix_cards_deck_id_updated_at)
+- inherited cards of subscriptions whose source card changed or that the user reviewed
+- every card of a deck the client hasn't seen yet (created or subscribed since)
+- deletions from the ``sync_tombstones`` log (see app.sync_log), including
+  cards removed from the source decks of subscriptions
+
+Cursors are database timestamps, commit-ordered: a cursor is the start of
+the oldest transaction still running when the sync read its snapshot, so
+every change not in the response is stamped at or after it, as long as its
+transaction runs for less than MAX_WATERMARK_LAG (bulk imports, ingest). Each sync also reaches back
+SYNC_CURSOR_OVERLAP before the cursor for the skew between the database
+clock and application-stamped rows; clients apply responses as idempotent
+upserts.
+A sync without a cursor, or with one older than the tombstone retention,
+gets the whole collection (``full``).
+
+Usage:
+    python -m app.delta_sync --prune    # delete tombstones past the retention
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import logging
+
+from sqlalchemy import Row, delete, select, text, union_all
+from sqlalchemy.orm import Session
+
+from app.models import Deck as DeckORM, SyncTombstone as SyncTombstoneORM
+from app.schemas import DeltaSyncDeck, DeltaSyncDeletedCard, DeltaSyncResponse
+from app.pagination import decode_cursor, encode_cursor
+from app.subscription_service import user_cards_subquery
+
+logger = logging.getLogger(__name__)
+
+SYNC_CURSOR_OVERLAP = timedelta(seconds=30)
+# How far a long-running transaction may hold cursors back; changes it makes
+# after running longer than this can be missed by an incremental sync
+MAX_WATERMARK_LAG = timedelta(hours=1)
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+
+class DeltaSyncService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _watermark(self) -> datetime:
+        """
+        Cursor for the changes visible now: the start of the oldest transaction still running
+
+        Rows are stamped when their transaction writes them, so one that is
+        still uncommitted can't carry a stamp before its transaction started.
+        Needs to run inside the transaction that reads the changes (it starts
+        it), so the watermark never comes after the snapshot.
+
+        Only client sessions inside a transaction count (not autovacuum or
+        other background workers), and the watermark trails the current time
+        by at most MAX_WATERMARK_LAG, so a forgotten idle-in-transaction
+        session can't pin every cursor to its start.
+        """
+        if self.db.get_bind().dialect.name != "postgresql":
+            return datetime.utcnow()
+        return self.db.scalar(text(
+            "SELECT greatest(min(xact_start), now() - :max_lag) AT TIME ZONE 'UTC' FROM pg_stat_activity "
+            "WHERE datname = current_database() AND backend_type = 'client backend' "
+            "AND state <> 'idle' AND xact_start IS NOT NULL"
+        ), {"max_lag": MAX_WATERMARK_LAG})
+
+    def _since(self, cursor: Optional[str], now: datetime) -> Optional[datetime]:
+        """Lower bound of the changes to send, or None for a full sync"""
+        if not cursor:
+            return None
+        (since,) = decode_cursor(cursor, 1)
+        if not isinstance(since, datetime):
+            raise ValueError("Invalid cursor")
+        if since < now - TOMBSTONE_RETENTION:
+            return None
+        return since - SYNC_CURSOR_OVERLAP
+
+    def _deletions(self, user_id: str, since: datetime) -> Tuple[List[int], List[DeltaSyncDeletedCard]]:
+        own = select(SyncTombstoneORM.deck_id, SyncTombstoneORM.card_id).where(
+            SyncTombstoneORM.user_id == user_id,
+            SyncTombstoneORM.deleted_at > since
+        )
+        # Cards the author removed from decks the user subscribes to
+        inherited = select(DeckORM.id, SyncTombstoneORM.card_id).join(
+            SyncTombstoneORM, SyncTombstoneORM.deck_id == DeckORM.subscribed_deck_id
+        ).where(
+            DeckORM.user_id == user_id,
+            SyncTombstoneORM.card_id.isnot(None),
+            SyncTombstoneORM.deleted_at > since
+        )
+
+        deleted_decks = set()
+        deleted_cards = set()
+        for deck_id, card_id in self.db.execute(union_all(own, inherited)):
+            if card_id is None:
+                deleted_decks.add(deck_id)
+            else:
+                deleted_cards.add((deck_id, card_id))
+        return sorted(deleted_decks), [
+            DeltaSyncDeletedCard(deck_id=deck_id, card_id=card_id)
+            for deck_id, card_id in sorted(deleted_cards)
+            if deck_id not in deleted_decks
+        ]
+
+    def changes(self, user_id: str, cursor: Optional[str] = None) -> Tuple[DeltaSyncResponse, List[Row]]:
+        """
+        Changes since cursor, as the response (without cards) and the changed card rows
+
+        Card rows have CARD_LIST_COLUMNS; the caller renders them. Raises
+        ValueError for a malformed cursor.
+        """
+        watermark = self._watermark()
+        since = self._since(cursor, watermark)
+
+        deck_query = self.db.query(DeckORM).filter(DeckORM.user_id == user_id)
+        if since is not None:
+            deck_query = deck_query.filter((DeckORM.last_modified > since) | (DeckORM.created_at > since))
+        decks = deck_query.order_by(DeckORM.id).all()
+
+        # Decks the client doesn't have yet are sent whole
+        new_deck_ids = [deck.id for deck in decks if since is None or (deck.created_at and deck.created_at > since)]
+        cards = user_cards_subquery(user_id, changed_since=since, all_cards_of=new_deck_ids)
+        card_rows = self.db.execute(select(cards).order_by(cards.c.deck_id, cards.c.id)).all()
+
+        response = DeltaSyncResponse(
+            cursor=encode_cursor([watermark]),
+            full=since is None,
+            decks=[DeltaSyncDeck.model_validate(deck, from_attributes=True) for deck in decks]
+        )
+        if since is not None:
+            response.deleted_decks, response.deleted_cards = self._deletions(user_id, since)
+
+        logger.info(
+            f"Delta sync for user {user_id}: {len(decks)} decks, {len(card_rows)} cards, "
+            f"{len(response.deleted_decks) + len(response.deleted_cards)} deletions ({'full' if response.full else 'delta'})"
+        )
+        return response, card_rows
+
+
+def prune_tombstones(db: Session, retention: timedelta = TOMBSTONE_RETENTION) -> int:
+    """Delete tombstones no valid cursor can ask for any more (older cursors get a full sync)"""
+    cutoff = datetime.utcnow() - retention - SYNC_CURSOR_OVERLAP
+    deleted = db.execute(delete(SyncTombstoneORM).where(SyncTombstoneORM.deleted_at < cutoff)).rowcount
+    db.commit()
+    logger.info(f"Pruned {deleted} sync tombstones older than {cutoff}")
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta sync maintenance")
+    parser.add_argument("--prune", action="store_true", help="Delete tombstones past the retention period")
+    args = parser.parse_args()
+    if not args.prune:
+        parser.print_help()
+        return
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"Pruned {prune_tombstones(db)} tombstones")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
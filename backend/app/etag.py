@@ -0,0 +1,22 @@
+"""Helpers for ETag / If-None-Match conditional GET handling"""
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag built from version components"""
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header lists etag (or *)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def not_modified(etag: str, headers: dict = None) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
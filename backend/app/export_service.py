@@ -0,0 +1,237 @@
+"""
+Streaming account export.
+
+The NDJSON export writes one JSON object per line, each tagged with a ``type``:
+
+    {"type": "metadata", ...}      always first, with the account totals
+    {"type": "deck", ...}          followed by that deck's cards
+    {"type": "card", ...}
+    {"type": "analytics", ...}     last, if the user has analytics
+
+Decks and cards are read with a single deck-to-card outer join through a
+server-side cursor (``yield_per``) and encoded as they arrive, so memory stays
+constant however large the account is and the first bytes go out immediately.
+
+The archive export is a zip holding the NDJSON export as ``export.ndjson``
+plus every voice file the cards reference, stored under their storage keys
+(``voices/<lang>/<sha1>.mp3``). It is written to the response as it is built,
+one voice file at a time, and importing it restores the audio without any TTS
+requests (see app.import_service).
+"""
+
+import io
+import zipfile
+
+from datetime import datetime
+from typing import Iterator, List, Optional
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Deck as DeckORM, TestAnalytics as TestAnalyticsORM, StudySession as StudySessionORM
+from app.card_serialization import dumps
+from app.subscription_service import user_cards_subquery
+from app.voice_storage import VoiceStorage, is_voice_key, voice_storage
+
+logger = logging.getLogger(__name__)
+
+EXPORT_APP_NAME = "Flash Wise Buddy"
+EXPORT_VERSION = "1.0"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARCHIVE_MEDIA_TYPE = "application/zip"
+ARCHIVE_EXPORT_NAME = "export.ndjson"
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+# Encoded lines are sent in chunks of about this many bytes
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only, unseekable sink that collects what zipfile writes until it is drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportService:
+    def __init__(self, db: Session, storage: VoiceStorage = None):
+        self.db = db
+        self.storage = storage or voice_storage
+
+    def _export_rows(self, user_id: str):
+        """Every deck of the user joined to its cards (own and inherited), ordered by deck then card"""
+        cards = user_cards_subquery(user_id)
+        stmt = select(
+            DeckORM.id,
+            DeckORM.name,
+            DeckORM.language,
+            DeckORM.created_at,
+            DeckORM.progress,
+            DeckORM.card_count,
+            DeckORM.custom_fields,
+            cards.c.id,
+            cards.c.front,
+            cards.c.back,
+            cards.c.accuracy,
+            cards.c.total_attempts,
+            cards.c.correct_answers,
+            cards.c.last_reviewed_at,
+            cards.c.created_at,
+            cards.c.audio_path,
+            cards.c.custom_data
+        ).select_from(DeckORM).outerjoin(
+            cards, cards.c.deck_id == DeckORM.id
+        ).where(
+            DeckORM.user_id == user_id
+        ).order_by(DeckORM.id, cards.c.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        return self.db.execute(stmt)
+
+    def _metadata(self, user_id: str) -> dict:
+        cards = user_cards_subquery(user_id)
+        total_decks = self.db.scalar(select(func.count()).where(DeckORM.user_id == user_id))
+        total_cards = self.db.scalar(select(func.count()).select_from(cards))
+        total_study_sessions = self.db.scalar(
+            select(func.count()).where(StudySessionORM.user_id == user_id)
+        )
+        return {
+            "type": "metadata",
+            "app_name": EXPORT_APP_NAME,
+            "export_date": datetime.utcnow(),
+            "version": EXPORT_VERSION,
+            "user_id": user_id,
+            "total_decks": total_decks,
+            "total_cards": total_cards,
+            "total_study_sessions": total_study_sessions
+        }
+
+    def _analytics(self, user_id: str, total_study_sessions: int) -> Optional[dict]:
+        analytics = self.db.query(TestAnalyticsORM).filter(TestAnalyticsORM.user_id == user_id).first()
+        if not analytics:
+            return None
+        return {
+            "type": "analytics",
+            "total_cards_studied": analytics.total_cards_studied or 0,
+            "total_correct_answers": analytics.total_correct_answers or 0,
+            "cards_mastered": analytics.cards_mastered or 0,
+            "overall_average_progress": analytics.overall_average_progress or 0.0,
+            "total_study_sessions": total_study_sessions,
+            "updated_at": analytics.updated_at
+        }
+
+    def iter_records(self, user_id: str) -> Iterator[dict]:
+        """Yield the export as metadata, deck, card and analytics records, in file order"""
+        metadata = self._metadata(user_id)
+        yield metadata
+
+        current_deck_id = None
+        for (deck_id, name, language, deck_created_at, progress, card_count, custom_fields,
+             card_id, front, back, accuracy, total_attempts, correct_answers,
+             last_reviewed_at, card_created_at, audio_path, custom_data) in self._export_rows(user_id):
+            if deck_id != current_deck_id:
+                current_deck_id = deck_id
+                yield {
+                    "type": "deck",
+                    "id": deck_id,
+                    "name": name,
+                    "language": language,
+                    "created_at": deck_created_at,
+                    "progress": progress or 0.0,
+                    "card_count": card_count or 0,
+                    "custom_fields": custom_fields
+                }
+            # Decks without cards come back once with NULL card columns
+            if card_id is None:
+                continue
+            yield {
+                "type": "card",
+                "id": card_id,
+                "deck_id": deck_id,
+                "front": front,
+                "back": back,
+                "accuracy": accuracy if accuracy is not None else 0.0,
+                "total_attempts": total_attempts or 0,
+                "correct_answers": correct_answers or 0,
+                "last_reviewed_at": last_reviewed_at,
+                "created_at": card_created_at,
+                "audio_path": audio_path,
+                "custom_data": custom_data
+            }
+
+        analytics = self._analytics(user_id, metadata["total_study_sessions"])
+        if analytics:
+            yield analytics
+
+    def iter_ndjson(self, user_id: str) -> Iterator[bytes]:
+        """Encode the export as NDJSON, sending the metadata line at once and the rest in chunks"""
+        chunk = []
+        chunk_size = 0
+        records = 0
+        for record in self.iter_records(user_id):
+            line = dumps(record) + b"\n"
+            records += 1
+            if record["type"] == "metadata":
+                yield line
+                continue
+            chunk.append(line)
+            chunk_size += len(line)
+            if chunk_size >= EXPORT_CHUNK_BYTES:
+                yield b"".join(chunk)
+                chunk = []
+                chunk_size = 0
+        if chunk:
+            yield b"".join(chunk)
+        logger.info(f"Streamed NDJSON export of {records} records for user {user_id}")
+
+    def _audio_paths(self, user_id: str) -> Iterator[str]:
+        """Distinct voice files referenced by the user's cards"""
+        cards = user_cards_subquery(user_id)
+        stmt = (
+            select(cards.c.audio_path)
+            .where(cards.c.audio_path.isnot(None))
+            .group_by(cards.c.audio_path)
+            .order_by(cards.c.audio_path)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        for (audio_path,) in self.db.execute(stmt):
+            # Only voice files go into the archive, whatever a card's path says
+            if is_voice_key(audio_path):
+                yield audio_path
+
+    def iter_archive(self, user_id: str) -> Iterator[bytes]:
+        """Build the zip archive incrementally, yielding its bytes as each part is written"""
+        sink = _ZipStream()
+        audio_files = 0
+        missing_files = 0
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            # The export's size isn't known up front, so allow it to exceed 2 GiB
+            with archive.open(ARCHIVE_EXPORT_NAME, "w", force_zip64=True) as entry:
+                for chunk in self.iter_ndjson(user_id):
+                    entry.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+
+            for audio_path in self._audio_paths(user_id):
+                data = self.storage.get(audio_path)
+                if data is None:
+                    missing_files += 1
+                    continue
+                # mp3 data is already compressed
+                archive.writestr(audio_path, data, compress_type=zipfile.ZIP_STORED)
+                audio_files += 1
+                yield sink.drain()
+        yield sink.drain()
+        logger.info(f"Streamed export archive for user {user_id} with {audio_files} voice files ({missing_files} missing)")
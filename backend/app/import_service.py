@@ -0,0 +1,744 @@
+"""
+Account import from export files.
+
+An import replaces the user's decks, cards, analytics and study sessions with
+the records of an export (the record format of app.export_service). Uploads
+are parsed incrementally, so memory stays bounded by one batch of cards:
+
+- NDJSON exports line by line
+- JSON exports (``FullExportResponse``) one value at a time, descending into the
+  ``decks`` and ``cards`` arrays instead of loading the document
+- archives (zip) by restoring their voice files, then reading ``export.ndjson``
+
+Card records are validated and written in batches: through ``COPY`` on
+PostgreSQL and multi-row INSERTs elsewhere. Decks are inserted one statement
+each, since their cards need the new ids. Deck card counts and progress are
+recomputed from the imported cards in one statement at the end, and progress
+is published per batch for ``GET /export/import/{import_id}``.
+
+Archive imports restore the voice files packed with the export, so the
+imported cards keep their audio without any TTS requests. Shared voice keys
+are derived from the spoken text, not the file content, so an uploaded file
+is never written to them: a card whose voice file already exists keeps the
+shared key, and otherwise the packed file is stored under the importing
+user's own prefix (``voices/imported/<user hash>/...``). Only files referenced
+by imported cards are restored.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+import codecs
+import hashlib
+import io
+import json
+import uuid
+import zipfile
+import logging
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, null, or_, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models import (
+    Deck as DeckORM, Card as CardORM, TestAnalytics as TestAnalyticsORM, StudySession as StudySessionORM
+)
+from app.schemas import ImportCardRecord, ImportDeckRecord, ImportProgress, ImportResult
+from app.cache import blob_cache
+from app.catalog_cache import SKIP_CATALOG_INVALIDATION
+from app.deck_rollups import repair_rollups
+from app.deck_versions import bump_deck_versions
+from app.user_deck_cache import note_user_changes
+from app.export_service import ARCHIVE_EXPORT_NAME
+from app.subscription_service import SubscriptionService
+from app.deck_tombstones import INCLUDE_DELETED_DECKS
+from app.sync_log import record_deck_deletions
+from app.voice_storage import VOICES_PREFIX, VoiceStorage, is_voice_key, voice_storage
+
+logger = logging.getLogger(__name__)
+
+# Cards validated and written per batch
+IMPORT_BATCH_SIZE = 5000
+# Larger archive members are not voice files we generated
+MAX_AUDIO_FILE_BYTES = 5 * 1024 * 1024
+# Larger single values (a card, the metadata) mean a malformed file
+MAX_JSON_VALUE_CHARS = 1024 * 1024
+JSON_READ_CHUNK_CHARS = 64 * 1024
+_NUMBER_CHARS = "0123456789+-.eE"
+IMPORT_PROGRESS_TTL_SECONDS = 3600
+
+# Custom fields given to decks whose cards still use the pre-custom-fields sentence columns
+# (as in the migration that retired those columns)
+LEGACY_CUSTOM_FIELDS = [
+    {"name": "example_sentence", "label": "Example Sentence"},
+    {"name": "sentence_translation", "label": "Sentence Translation"}
+]
+
+# Column order of the rows bulk_load_cards takes
+CARD_LOAD_COLUMNS = ("deck_id", "front", "back", "accuracy", "total_attempts", "correct_answers",
+                 "last_reviewed_at", "created_at", "audio_path", "custom_data")
+_card_records = TypeAdapter(List[ImportCardRecord])
+
+
+def _is_voice_file(info: zipfile.ZipInfo) -> bool:
+    return is_voice_key(info.filename) and not info.is_dir() and info.file_size <= MAX_AUDIO_FILE_BYTES
+
+
+def imported_audio_prefix(user_id: str) -> str:
+    """Storage prefix of the voice files restored from a user's export archives"""
+    return f"{VOICES_PREFIX}imported/{hashlib.sha1(user_id.encode('utf-8')).hexdigest()[:16]}/"
+
+
+def _legacy_custom_data(card: ImportCardRecord) -> Optional[Dict[str, str]]:
+    """Card custom data with the legacy example sentence fields folded in (one sentence pair, first preferred)"""
+    ex1, trans1 = card.example_sentence_1, card.sentence_translation_1
+    ex2, trans2 = card.example_sentence_2, card.sentence_translation_2
+    if not (ex1 or trans1 or ex2 or trans2):
+        return card.custom_data
+
+    custom_data = dict(card.custom_data or {})
+    if ex1 and trans1:
+        custom_data["example_sentence"], custom_data["sentence_translation"] = ex1, trans1
+    elif ex2 and trans2:
+        custom_data["example_sentence"], custom_data["sentence_translation"] = ex2, trans2
+    elif ex1 or ex2:
+        custom_data["example_sentence"] = ex1 or ex2
+    else:
+        custom_data["sentence_translation"] = trans1 or trans2
+    return custom_data
+
+
+def _validation_message(error: ValidationError, kind: str) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"Invalid {kind} record ({location}): {first['msg']}"
+
+
+def _csv_field(value) -> str:
+    """COPY csv field: NULL is an unquoted empty field, every value is quoted"""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        value = json.dumps(value, ensure_ascii=False)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def bulk_load_cards(db: Session, rows: List[tuple]):
+    """Bulk-load card rows (in CARD_LOAD_COLUMNS order): COPY on PostgreSQL, a multi-row INSERT elsewhere"""
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        data = io.StringIO()
+        for row in rows:
+            data.write(",".join(_csv_field(value) for value in row))
+            data.write("\n")
+        data.seek(0)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {CardORM.__tablename__} ({', '.join(CARD_LOAD_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", data
+            )
+        finally:
+            cursor.close()
+    else:
+        db.execute(insert(CardORM.__table__), [dict(zip(CARD_LOAD_COLUMNS, row)) for row in rows])
+
+
+# ---------------------------------------------------------------------------
+# Incremental parsing
+# ---------------------------------------------------------------------------
+
+class _IncrementalJson:
+    """
+    Reads a JSON document piece by piece
+
+    ``members`` and ``items`` walk an object or array without decoding it; the
+    caller consumes each member's value (with ``value`` or by descending further)
+    before asking for the next one. Only the value being decoded is buffered.
+    """
+
+    def __init__(self, fileobj):
+        self._reader = codecs.getreader("utf-8")(fileobj)
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        data = self._reader.read(JSON_READ_CHUNK_CHARS)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"Invalid JSON file: expected '{char}'")
+        self._pos += 1
+
+    def value(self):
+        """Decode the next complete value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number cut off by the end of the buffer ("0." of "0.5") may continue in the next chunk
+                if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                        and not self._buffer[end:].strip(_NUMBER_CHARS) and self._fill()):
+                    continue
+                self._pos = end
+                return value
+            except json.JSONDecodeError:
+                if len(self._buffer) - self._pos > MAX_JSON_VALUE_CHARS or not self._fill():
+                    raise ValueError("Invalid JSON file")
+
+    def members(self) -> Iterator[str]:
+        """Yield the keys of the next object"""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Invalid JSON file: expected an object key")
+            self._expect(":")
+            yield key
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError("Invalid JSON file: expected ',' or '}'")
+
+    def items(self) -> Iterator[None]:
+        """Yield once per element of the next array"""
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield
+            separator = self._peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError("Invalid JSON file: expected ',' or ']'")
+
+
+def iter_json_records(fileobj) -> Iterator[dict]:
+    """Yield export records from a JSON export (FullExportResponse) without loading it"""
+    reader = _IncrementalJson(fileobj)
+    for key in reader.members():
+        if key == "export_metadata":
+            yield {**reader.value(), "type": "metadata"}
+        elif key == "analytics":
+            analytics = reader.value()
+            if analytics:
+                yield {**analytics, "type": "analytics"}
+        elif key == "decks":
+            for index, _ in enumerate(reader.items()):
+                deck = {"type": "deck"}
+                emitted = False
+                for field in reader.members():
+                    if field != "cards":
+                        deck[field] = reader.value()
+                        continue
+                    # Cards follow their deck's fields in our exports; the deck record goes out first
+                    deck.setdefault("id", -(index + 1))
+                    yield deck
+                    emitted = True
+                    for _ in reader.items():
+                        yield {**reader.value(), "type": "card", "deck_id": deck["id"]}
+                if not emitted:
+                    deck.setdefault("id", -(index + 1))
+                    yield deck
+        else:
+            reader.value()
+
+
+def iter_ndjson_records(lines: Iterable) -> Iterator[dict]:
+    """Yield export records from NDJSON lines (str or bytes)"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            raise ValueError(f"Invalid JSON on line {line_number} of the export")
+
+
+# ---------------------------------------------------------------------------
+# Progress
+# ---------------------------------------------------------------------------
+
+def _progress_key(user_id: str, import_id: str) -> str:
+    return f"import_progress:{user_id}:{import_id}"
+
+
+class ImportProgressTracker:
+    """Publishes an import's progress to the shared cache, where any replica can read it"""
+
+    def __init__(self, user_id: str, import_id: Optional[str] = None):
+        self.user_id = user_id
+        self.progress = ImportProgress(import_id=import_id or uuid.uuid4().hex, status="running",
+                                       updated_at=datetime.utcnow())
+
+    @property
+    def import_id(self) -> str:
+        return self.progress.import_id
+
+    def update(self, **changes):
+        for name, value in changes.items():
+            setattr(self.progress, name, value)
+        self.progress.updated_at = datetime.utcnow()
+        blob_cache.set(
+            _progress_key(self.user_id, self.import_id),
+            {"progress": self.progress.model_dump_json().encode("utf-8")},
+            ttl=IMPORT_PROGRESS_TTL_SECONDS
+        )
+
+
+def get_import_progress(user_id: str, import_id: str) -> Optional[ImportProgress]:
+    fields = blob_cache.get(_progress_key(user_id, import_id))
+    return ImportProgress.model_validate_json(fields["progress"]) if fields else None
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+class _MergeState:
+    """Bookkeeping of a merge import across card batches"""
+
+    def __init__(self, decks: List[DeckORM]):
+        self.decks = {deck.id: deck for deck in decks}
+        self.decks_by_name: Dict[tuple, List[DeckORM]] = {}
+        for deck in decks:
+            self.decks_by_name.setdefault((deck.name, deck.language), []).append(deck)
+        self.subscribed_decks = {deck.id for deck in decks if deck.subscribed_deck_id}
+        self.claimed_decks: Set[int] = set()
+        self.new_decks: Set[int] = set()
+        self.touched_decks: Set[int] = set()
+        self.legacy_decks: Set[int] = set()
+        self.matched_cards: Set[int] = set()
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    @property
+    def processed(self) -> int:
+        return self.inserted + self.updated + self.unchanged
+
+
+class ImportService:
+    def __init__(self, db: Session, storage: VoiceStorage = None):
+        self.db = db
+        self.storage = storage or voice_storage
+        # Stored key each card audio reference resolves to (None: no audio)
+        self._audio_keys: Dict[str, Optional[str]] = {}
+        # Voice files of the archive being imported, and where they are restored to
+        self._archive: Optional[zipfile.ZipFile] = None
+        self._archive_voices: Dict[str, zipfile.ZipInfo] = {}
+        self._restore_prefix: Optional[str] = None
+        self._restored: Set[str] = set()
+
+    def delete_account_data(self, user_id: str):
+        """DESTRUCTIVE: delete the user's study sessions, analytics, cards and decks"""
+        # Delete study sessions first (foreign key constraint)
+        self.db.query(StudySessionORM).filter(StudySessionORM.user_id == user_id).delete()
+
+        # Delete analytics
+        self.db.query(TestAnalyticsORM).filter(TestAnalyticsORM.user_id == user_id).delete()
+
+        deck_ids = [deck_id for (deck_id,) in self.db.query(DeckORM.id).filter(DeckORM.user_id == user_id)
+                    .execution_options(**{INCLUDE_DELETED_DECKS: True})]
+        if deck_ids:
+            # Other users' subscriptions to these decks become private copies
+            SubscriptionService(self.db).detach_subscribers(deck_ids)
+            record_deck_deletions(self.db, user_id, deck_ids)
+
+        # Delete decks (including tombstoned ones); their cards go with them (ON DELETE CASCADE)
+        note_user_changes(self.db, [user_id])
+        self.db.query(DeckORM).filter(DeckORM.user_id == user_id).delete(synchronize_session=False)
+
+    def _audio_path(self, audio_path: Optional[str]) -> Optional[str]:
+        """
+        Storage key for a card's audio reference, or None if there is no such voice file
+
+        A reference to an existing file is kept as is. Otherwise the file packed
+        in the archive being imported (if any) is restored under the user's own
+        prefix, never under the shared key. Anything but a voice file key is
+        dropped, so a card can't point at other files in storage.
+        """
+        if not audio_path or not is_voice_key(audio_path):
+            return None
+        if audio_path not in self._audio_keys:
+            self._audio_keys[audio_path] = self._resolve_audio(audio_path)
+        return self._audio_keys[audio_path]
+
+    def _resolve_audio(self, audio_path: str) -> Optional[str]:
+        if self.storage.exists(audio_path):
+            return audio_path
+        info = self._archive_voices.get(audio_path)
+        if info is None:
+            return None
+        key = self._restore_prefix + audio_path[len(VOICES_PREFIX):]
+        if not self.storage.exists(key):
+            self.storage.put(key, self._archive.read(info))
+        self._restored.add(key)
+        return key
+
+    def _validate_deck(self, record: dict) -> ImportDeckRecord:
+        try:
+            return ImportDeckRecord.model_validate(record)
+        except ValidationError as e:
+            raise ValueError(_validation_message(e, "deck"))
+
+    def _validate_cards(self, pending: List[dict]) -> List[ImportCardRecord]:
+        try:
+            return _card_records.validate_python(pending)
+        except ValidationError as e:
+            raise ValueError(_validation_message(e, "card"))
+
+    def _insert_deck(self, user_id: str, deck: ImportDeckRecord) -> int:
+        note_user_changes(self.db, [user_id])
+        # Stamped at import time, not with the exported dates, so delta sync reports it as a new deck
+        imported_at = datetime.utcnow()
+        return self.db.execute(
+            insert(DeckORM).values(
+                user_id=user_id,
+                name=deck.name,
+                language=deck.language or "en",
+                created_at=imported_at,
+                last_modified=imported_at,
+                progress=0.0,
+                card_count=0,
+                # SQL NULL rather than JSON null, so legacy imports can fill it in
+                custom_fields=[field.model_dump() for field in deck.custom_fields] if deck.custom_fields else null()
+            ).returning(DeckORM.id)
+        ).scalar_one()
+
+    def _flush_cards(self, pending: List[dict], deck_ids: Dict[int, int], legacy_decks: Set[int]) -> int:
+        """Validate a batch of card records and write it, returning the number of cards written"""
+        if not pending:
+            return 0
+        cards = self._validate_cards(pending)
+
+        rows = []
+        for card in cards:
+            deck_id = deck_ids.get(card.deck_id)
+            if deck_id is None:
+                raise ValueError(f"Card '{card.front}' belongs to a deck that is not in the export")
+            custom_data = _legacy_custom_data(card)
+            if custom_data is not card.custom_data:
+                legacy_decks.add(deck_id)
+            rows.append((
+                deck_id, card.front, card.back, card.accuracy, card.total_attempts, card.correct_answers,
+                card.last_reviewed_at, card.created_at or datetime.now(), self._audio_path(card.audio_path),
+                custom_data
+            ))
+        bulk_load_cards(self.db, rows)
+        pending.clear()
+        return len(rows)
+
+    def _set_legacy_custom_fields(self, legacy_decks: Set[int]):
+        if legacy_decks:
+            self.db.execute(
+                update(DeckORM).where(DeckORM.id.in_(legacy_decks), DeckORM.custom_fields.is_(None))
+                .values(custom_fields=LEGACY_CUSTOM_FIELDS)
+                # Custom fields aren't part of catalog responses
+                .execution_options(synchronize_session=False, **{SKIP_CATALOG_INVALIDATION: True})
+            )
+
+    def import_records(self, user_id: str, records: Iterable[dict],
+                       tracker: Optional[ImportProgressTracker] = None) -> ImportResult:
+        """Replace the user's data with export records (metadata, deck, card, analytics) and commit"""
+        tracker = tracker or ImportProgressTracker(user_id)
+        try:
+            tracker.update()
+            self.delete_account_data(user_id)
+
+            metadata = None
+            analytics = None
+            deck_ids: Dict[int, int] = {}  # exported deck id -> new deck id
+            legacy_decks: Set[int] = set()
+            pending_cards: List[dict] = []
+            imported_cards = 0
+
+            for record in records:
+                record_type = record.get("type")
+                if record_type == "card":
+                    pending_cards.append(record)
+                    if len(pending_cards) >= IMPORT_BATCH_SIZE:
+                        imported_cards += self._flush_cards(pending_cards, deck_ids, legacy_decks)
+                        tracker.update(imported_decks=len(deck_ids), imported_cards=imported_cards)
+                elif record_type == "deck":
+                    deck_ids[record.get("id")] = self._insert_deck(user_id, self._validate_deck(record))
+                elif record_type == "metadata":
+                    metadata = record
+                    tracker.update(total_cards=record.get("total_cards"))
+                elif record_type == "analytics":
+                    analytics = record
+            imported_cards += self._flush_cards(pending_cards, deck_ids, legacy_decks)
+
+            if metadata is None:
+                raise ValueError("Invalid export file format")
+
+            self._set_legacy_custom_fields(legacy_decks)
+
+            # Import analytics if present
+            if analytics:
+                self.db.add(TestAnalyticsORM(
+                    user_id=user_id,
+                    total_cards_studied=analytics["total_cards_studied"],
+                    total_correct_answers=analytics["total_correct_answers"],
+                    cards_mastered=analytics["cards_mastered"],
+                    overall_average_progress=analytics["overall_average_progress"]
+                ))
+
+            # Card counts and progress follow from the imported cards
+            repair_rollups(self.db, list(deck_ids.values()))
+            self.db.commit()
+
+            message = f"Successfully imported {len(deck_ids)} decks with {imported_cards} cards"
+            tracker.update(status="completed", imported_decks=len(deck_ids), imported_cards=imported_cards,
+                           message=message)
+            logger.info(f"Imported {len(deck_ids)} decks with {imported_cards} cards for user {user_id}")
+            return ImportResult(
+                success=True,
+                message=message,
+                imported_decks=len(deck_ids),
+                imported_cards=imported_cards,
+                import_id=tracker.import_id
+            )
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            tracker.update(status="failed", message="Import failed")
+            logger.error(f"Failed to import data for user {user_id}: {str(e)}")
+            raise Exception(f"Failed to import data: {str(e)}")
+        except Exception as e:
+            self.db.rollback()
+            tracker.update(status="failed", message=str(e))
+            raise e
+
+    def _merge_deck(self, user_id: str, deck: ImportDeckRecord, state: "_MergeState") -> int:
+        """Target deck for an exported deck: the user's deck with its id, else with its name and language, else a new one"""
+        match = state.decks.get(deck.id)
+        if match is None or match.id in state.claimed_decks:
+            candidates = state.decks_by_name.get((deck.name, deck.language or "en"), [])
+            match = next((candidate for candidate in candidates if candidate.id not in state.claimed_decks), None)
+        if match is None:
+            deck_id = self._insert_deck(user_id, deck)
+            state.new_decks.add(deck_id)
+            return deck_id
+
+        state.claimed_decks.add(match.id)
+        if match.name != deck.name:
+            match.name = deck.name
+            state.touched_decks.add(match.id)
+        if deck.custom_fields is not None:
+            custom_fields = [field.model_dump() for field in deck.custom_fields]
+            if match.custom_fields != custom_fields:
+                match.custom_fields = custom_fields
+                state.touched_decks.add(match.id)
+        return match.id
+
+    def _merge_cards(self, pending: List[dict], deck_ids: Dict[int, int], state: "_MergeState"):
+        """Match a batch of card records against the target decks' cards and write only the differences"""
+        if not pending:
+            return
+        cards = self._validate_cards(pending)
+        pending.clear()
+
+        targets = []
+        for card in cards:
+            deck_id = deck_ids.get(card.deck_id)
+            if deck_id is None:
+                raise ValueError(f"Card '{card.front}' belongs to a deck that is not in the export")
+            targets.append(deck_id)
+
+        # Candidates for the whole batch in one query: same id or same front, in a deck that existed before
+        by_id, by_content = {}, {}
+        existing_decks = {deck_id for deck_id in targets if deck_id not in state.new_decks}
+        if existing_decks:
+            candidates = self.db.execute(
+                select(CardORM.id, CardORM.deck_id, CardORM.front, CardORM.back, CardORM.custom_data,
+                       CardORM.total_attempts).where(
+                    CardORM.deck_id.in_(existing_decks),
+                    or_(CardORM.id.in_({card.id for card in cards if card.id is not None}),
+                        CardORM.front.in_({card.front for card in cards}))
+                )
+            ).all()
+            for row in candidates:
+                by_id[row.id] = row
+                by_content.setdefault((row.deck_id, row.front, row.back), []).append(row)
+
+        inserts, updates = [], []
+        for card, deck_id in zip(cards, targets):
+            custom_data = _legacy_custom_data(card)
+            if custom_data is not card.custom_data:
+                state.legacy_decks.add(deck_id)
+
+            match = by_id.get(card.id)
+            if match is None or match.deck_id != deck_id or match.id in state.matched_cards:
+                match = next((row for row in by_content.get((deck_id, card.front, card.back), [])
+                              if row.id not in state.matched_cards), None)
+
+            if match is None:
+                if deck_id in state.subscribed_decks:
+                    # Inherited from the subscribed deck's source, which already supplies it
+                    state.unchanged += 1
+                    continue
+                inserts.append((
+                    deck_id, card.front, card.back, card.accuracy, card.total_attempts, card.correct_answers,
+                    card.last_reviewed_at, card.created_at or datetime.now(), self._audio_path(card.audio_path),
+                    custom_data
+                ))
+                state.touched_decks.add(deck_id)
+                continue
+
+            state.matched_cards.add(match.id)
+            changes = {}
+            if (match.front, match.back) != (card.front, card.back):
+                changes.update(front=card.front, back=card.back, audio_path=self._audio_path(card.audio_path))
+            if (match.custom_data or None) != (custom_data or None):
+                changes["custom_data"] = custom_data
+            # Keep whichever side has seen more reviews
+            if card.total_attempts > (match.total_attempts or 0):
+                changes.update(accuracy=card.accuracy, total_attempts=card.total_attempts,
+                               correct_answers=card.correct_answers, last_reviewed_at=card.last_reviewed_at)
+            if changes:
+                updates.append({"id": match.id, **changes})
+                state.touched_decks.add(deck_id)
+            else:
+                state.unchanged += 1
+
+        if inserts:
+            bulk_load_cards(self.db, inserts)
+        if updates:
+            # Bulk UPDATE by primary key, grouped by the set of changed columns
+            self.db.execute(update(CardORM), updates)
+        state.inserted += len(inserts)
+        state.updated += len(updates)
+
+    def merge_records(self, user_id: str, records: Iterable[dict],
+                      tracker: Optional[ImportProgressTracker] = None) -> ImportResult:
+        """
+        Merge export records into the user's data, writing only what differs, and commit
+
+        Decks match by id, then by name and language; cards of a matched deck by
+        id, then by front and back. Unchanged cards are skipped, changed ones are
+        updated in bulk (review statistics come from whichever side has more
+        attempts) and the rest inserted in batches. Nothing is deleted, and the
+        user's analytics and study sessions are kept. Cards of a subscribed deck
+        that match none of its own cards are inherited content and are skipped.
+        """
+        tracker = tracker or ImportProgressTracker(user_id)
+        try:
+            tracker.update()
+            state = _MergeState(self.db.query(DeckORM).filter(DeckORM.user_id == user_id).all())
+
+            metadata = None
+            deck_ids: Dict[int, int] = {}  # exported deck id -> target deck id
+            pending_cards: List[dict] = []
+
+            for record in records:
+                record_type = record.get("type")
+                if record_type == "card":
+                    pending_cards.append(record)
+                    if len(pending_cards) >= IMPORT_BATCH_SIZE:
+                        self._merge_cards(pending_cards, deck_ids, state)
+                        tracker.update(imported_decks=len(deck_ids), imported_cards=state.processed)
+                elif record_type == "deck":
+                    deck_ids[record.get("id")] = self._merge_deck(user_id, self._validate_deck(record), state)
+                elif record_type == "metadata":
+                    metadata = record
+                    tracker.update(total_cards=record.get("total_cards"))
+            self._merge_cards(pending_cards, deck_ids, state)
+
+            if metadata is None:
+                raise ValueError("Invalid export file format")
+
+            self._set_legacy_custom_fields(state.legacy_decks)
+            # Card counts and progress of the decks that changed follow from their cards
+            repair_rollups(self.db, sorted(state.touched_decks | state.new_decks))
+            bump_deck_versions(self.db, state.touched_decks)
+            self.db.commit()
+
+            message = (f"Merged {len(deck_ids)} decks: {len(state.new_decks)} new decks, {state.inserted} new cards, "
+                       f"{state.updated} updated, {state.unchanged} unchanged")
+            tracker.update(status="completed", imported_decks=len(deck_ids), imported_cards=state.processed,
+                           message=message)
+            logger.info(f"{message} (user {user_id})")
+            return ImportResult(
+                success=True,
+                message=message,
+                imported_decks=len(state.new_decks),
+                imported_cards=state.inserted,
+                updated_cards=state.updated,
+                unchanged_cards=state.unchanged,
+                import_id=tracker.import_id
+            )
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            tracker.update(status="failed", message="Import failed")
+            logger.error(f"Failed to merge data for user {user_id}: {str(e)}")
+            raise Exception(f"Failed to import data: {str(e)}")
+        except Exception as e:
+            self.db.rollback()
+            tracker.update(status="failed", message=str(e))
+            raise e
+
+    def _import(self, user_id: str, records: Iterable[dict], tracker: Optional[ImportProgressTracker],
+                mode: str) -> ImportResult:
+        if mode == "merge":
+            return self.merge_records(user_id, records, tracker)
+        return self.import_records(user_id, records, tracker)
+
+    def import_file(self, user_id: str, fileobj, filename: str,
+                    tracker: Optional[ImportProgressTracker] = None, mode: str = "replace") -> ImportResult:
+        """Import a JSON or NDJSON export file (mode is "replace" or "merge")"""
+        if filename.endswith(".ndjson"):
+            return self._import(user_id, iter_ndjson_records(fileobj), tracker, mode)
+        if filename.endswith(".json"):
+            return self._import(user_id, iter_json_records(fileobj), tracker, mode)
+        raise ValueError("File must be a JSON or NDJSON export")
+
+    def import_archive(self, user_id: str, fileobj, tracker: Optional[ImportProgressTracker] = None,
+                       mode: str = "replace") -> ImportResult:
+        """Import an export archive: replace the user's data with its records, restoring the voice files they use"""
+        with zipfile.ZipFile(fileobj) as archive:
+            if ARCHIVE_EXPORT_NAME not in archive.namelist():
+                raise ValueError("Invalid export archive: export.ndjson is missing")
+
+            # Files are restored as cards reference them; if the import fails the audio GC reclaims them
+            self._archive = archive
+            self._archive_voices = {info.filename: info for info in archive.infolist() if _is_voice_file(info)}
+            self._restore_prefix = imported_audio_prefix(user_id)
+            try:
+                with archive.open(ARCHIVE_EXPORT_NAME) as entry:
+                    result = self._import(user_id, iter_ndjson_records(entry), tracker, mode)
+            finally:
+                self._archive = None
+                self._archive_voices = {}
+
+        result.restored_audio_files = len(self._restored)
+        logger.info(f"Restored {len(self._restored)} voice files from export archive for user {user_id}")
+        return result
@@ -1,12 +1,16 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from pathlib import Path
 # Database schema is now managed by Alembic migrations
 
-from app.routers import decks, sessions, analytics, users, export
+from app.routers import decks, sessions, analytics, users, export, sync
 import app.firebase_config  # Initialize Firebase
 from app.auth_middleware import get_current_user
+from app.pagination import NEXT_CURSOR_HEADER
+from app.user_service import AccountDeletedError
+from app.study_session_store import StudySessionsUnavailableError
+from app.voice_storage import LocalVoiceStorage, VOICES_PREFIX, voice_storage
 
 VOICES_DIR = "voices"
 
@@ -18,9 +22,20 @@ def on_startup():
     # Database tables are created via Alembic migrations
     # Run 'alembic upgrade head' before starting the app
     
-    # Create voices directory if it doesn't exist
-    voices_dir = Path(VOICES_DIR)
-    voices_dir.mkdir(exist_ok=True)
+    # Create voices directory if it doesn't exist (local storage only)
+    if isinstance(voice_storage, LocalVoiceStorage):
+        voices_dir = voice_storage.root / VOICES_DIR
+        voices_dir.mkdir(parents=True, exist_ok=True)
+
+
+@app.exception_handler(AccountDeletedError)
+def account_deleted_handler(request, exc: AccountDeletedError):
+    return JSONResponse(status_code=410, content={"detail": str(exc)})
+
+
+@app.exception_handler(StudySessionsUnavailableError)
+def study_sessions_unavailable_handler(request, exc: StudySessionsUnavailableError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
 
 
 app.add_middleware(
@@ -38,6 +53,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
 
@@ -46,13 +62,28 @@ def read_root():
     return {"message": "Flashcard API"}
 
 
-# Mount static files for audio
-# Check if voices directory exists, create if not
-voices_path = Path(VOICES_DIR)
-if not voices_path.exists():
-    voices_path.mkdir(parents=True, exist_ok=True)
+# Serve audio: local storage is mounted as static files, shared object
+# storage is proxied (or redirected to its public URL) under the same path
+if isinstance(voice_storage, LocalVoiceStorage):
+    voices_path = voice_storage.root / VOICES_DIR
+    if not voices_path.exists():
+        voices_path.mkdir(parents=True, exist_ok=True)
+
+    app.mount("/audio", StaticFiles(directory=voices_path), name="audio")
+else:
+    @app.get("/audio/{file_path:path}", include_in_schema=False)
+    def get_audio(file_path: str):
+        key = f"{VOICES_PREFIX}{file_path}"
+        public_url = voice_storage.public_url(key)
+        if public_url:
+            return RedirectResponse(public_url, status_code=301)
 
-app.mount("/audio", StaticFiles(directory=VOICES_DIR), name="audio")
+        data = voice_storage.get(key)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Audio not found")
+        # Keys are content hashes, so responses never change
+        return Response(content=data, media_type="audio/mpeg",
+                        headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
 # Include routers
 app.include_router(decks.router)
@@ -60,4 +91,5 @@ app.include_router(sessions.router)
 app.include_router(analytics.router)
 app.include_router(users.router)
 app.include_router(export.router)
+app.include_router(sync.router)
 
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, ARRAY, Boolean, func, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Float, ForeignKey, DateTime, ARRAY, Boolean, func, JSON, Index, text, Computed, LargeBinary
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from .database import Base
 
@@ -13,12 +14,19 @@ class User(Base):
     selected_language = Column(String, nullable=True, default=None)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Set when the user deletes their account; the purge job then removes the row (see app.account_purge)
+    deleted_at = Column(DateTime, nullable=True)
 
     # Relationships
     decks = relationship("Deck", back_populates="user")
     study_sessions = relationship("StudySession", back_populates="user")
     analytics = relationship("TestAnalytics", back_populates="user")
 
+    __table_args__ = (
+        # Author name search in the public catalog
+        Index("ix_users_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
 
 class Deck(Base):
     __tablename__ = "decks"
@@ -28,40 +36,125 @@ class Deck(Base):
     language = Column(String, nullable=False, default='en', index=True)
     name = Column(String, nullable=False)
     is_public = Column(Boolean, nullable=False, default=False, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    last_modified = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, server_default=func.now())
+    # NOT NULL: it is a keyset pagination sort key (see app.pagination)
+    last_modified = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=func.now())
     progress = Column(Float, default=0.0)
     card_count = Column(Integer, default=0)
     original_author_name = Column(String, nullable=True)  # For copied decks
     copied_from_deck_id = Column(Integer, nullable=True)  # Reference to original deck
+    # Public deck whose cards this deck reads instead of owning copies (see app.subscription_service)
+    subscribed_deck_id = Column(Integer, ForeignKey("decks.id", ondelete="SET NULL"), nullable=True, index=True)
+    last_synced_at = Column(DateTime, nullable=True)  # Last pull of the original deck's updates into this copy
     custom_fields = Column(JSON, nullable=True)  # Array of {name: string, label: string}
+    # Tombstone: set when the deck is deleted, hidden from queries until reaped (see app.deck_tombstones)
+    deleted_at = Column(DateTime, nullable=True)
+    # Advanced by every change to the deck or its cards; ETags are built from it (see app.deck_versions)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Generated for catalog search; deferred so regular deck loads don't fetch it
+    search_vector = deferred(Column(TSVECTOR, Computed("to_tsvector('simple', coalesce(name, ''))", persisted=True)))
 
     user = relationship("User", back_populates="decks")
-    cards = relationship("Card", back_populates="deck")
+    cards = relationship("Card", back_populates="deck", passive_deletes=True)
+
+    __table_args__ = (
+        # Keyset pagination of the public catalog (most recently updated first)
+        Index("ix_decks_public_last_modified_id", "last_modified", "id", postgresql_where=text("is_public")),
+        # Public catalog search (see app.catalog_search)
+        Index("ix_decks_public_search_vector", "search_vector", postgresql_using="gin",
+              postgresql_where=text("is_public")),
+        Index("ix_decks_public_name_trgm", "name", postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}, postgresql_where=text("is_public")),
+        Index("ix_decks_public_language_trgm", "language", postgresql_using="gin",
+              postgresql_ops={"language": "gin_trgm_ops"}, postgresql_where=text("is_public")),
+        # Reaper scan of tombstoned decks
+        Index("ix_decks_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+        # One subscription per user and source deck
+        Index("uq_decks_user_id_subscribed_deck_id", "user_id", "subscribed_deck_id", unique=True,
+              postgresql_where=text("subscribed_deck_id IS NOT NULL AND deleted_at IS NULL")),
+    )
 
 class Card(Base):
     __tablename__ = "cards"
 
     id = Column(Integer, primary_key=True, index=True)
-    deck_id = Column(Integer, ForeignKey("decks.id"))
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"))
     front = Column(String, nullable=False)
     back = Column(String, nullable=False)
     accuracy = Column(Float, default=0.0)
     total_attempts = Column(Integer, default=0)
     correct_answers = Column(Integer, default=0)
     last_reviewed_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, server_default=func.now())
     audio_path = Column(String, nullable=True)  # Path to TTS audio file
     custom_data = Column(JSON, nullable=True)  # {field_name: value} for custom fields
+    # Subscribed source card this card was materialized from when the user edited it
+    source_card_id = Column(Integer, ForeignKey("cards.id", ondelete="SET NULL"), nullable=True)
+    # Content hash of the source card at the last copy or sync (see app.deck_sync_service)
+    source_hash = Column(String(32), nullable=True)
+    # Any change to the card, statistics included (delta sync, see app.delta_sync)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                        server_default=func.now())
 
     deck = relationship("Deck", back_populates="cards")
 
+    __table_args__ = (
+        # Keyset pagination of deck card lists (by id, and newest first for public decks)
+        Index("ix_cards_deck_id_id", "deck_id", "id"),
+        Index("ix_cards_deck_id_created_at_id", "deck_id", "created_at", "id"),
+        Index("ix_cards_deck_id_source_card_id", "deck_id", "source_card_id"),
+        # Cards of a deck changed since a sync cursor
+        Index("ix_cards_deck_id_updated_at", "deck_id", "updated_at"),
+    )
+
+class CardReviewState(Base):
+    """Per-user review statistics for a card of a subscribed deck that the user has not materialized"""
+    __tablename__ = "card_review_states"
+
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), primary_key=True)  # Subscribing deck
+    card_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), primary_key=True)  # Source card
+    accuracy = Column(Float, nullable=False, default=0.0)
+    total_attempts = Column(Integer, nullable=False, default=0)
+    correct_answers = Column(Integer, nullable=False, default=0)
+    last_reviewed_at = Column(DateTime, nullable=True)
+    hidden = Column(Boolean, nullable=False, default=False)  # Removed from the subscribing deck
+
+class SyncTombstone(Base):
+    """Deletion log for delta sync: a card removed from a deck, or a whole deck when card_id is NULL"""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    user_id = Column(String, ForeignKey("users.uid", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    deck_id = Column(Integer, nullable=False)  # No foreign key: the deck may be gone
+    card_id = Column(Integer, nullable=True)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_id_deleted_at", "user_id", "deleted_at"),
+        # Source card removals seen by subscribers of the deck
+        Index("ix_sync_tombstones_deck_id_deleted_at", "deck_id", "deleted_at"),
+    )
+
+class DeckSnapshot(Base):
+    __tablename__ = "deck_snapshots"
+
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    source_modified = Column(DateTime, nullable=False)  # Deck.last_modified the snapshot was built from
+    card_count = Column(Integer, nullable=False, default=0)
+    # Gzip-compressed JSON card list (see app.snapshot_service); deferred so staleness checks don't fetch it
+    payload = deferred(Column(LargeBinary, nullable=False))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    deck = relationship("Deck")
+
 class StudySession(Base):
     __tablename__ = "study_sessions"
 
     id = Column(Integer, primary_key=True)
     user_id = Column(String, ForeignKey("users.uid"), nullable=False, index=True)
-    deck_id = Column(Integer, ForeignKey("decks.id"), nullable=False)
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), nullable=False)
     passed_words = Column(ARRAY(Integer), nullable=False)  
     missed_words = Column(ARRAY(Integer), nullable=False)
     total_cards = Column(Integer, nullable=False)
@@ -85,3 +178,12 @@ class TestAnalytics(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="analytics")
+
+
+class StreamOffset(Base):
+    """Last entry of a Redis stream folded into the database, committed together with what it changed"""
+    __tablename__ = "stream_offsets"
+
+    name = Column(String, primary_key=True)
+    last_id = Column(String, nullable=False, default="0-0")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,99 @@
+"""
+Keyset (cursor) pagination helpers.
+
+List endpoints keep returning a plain JSON array; when more rows exist the
+opaque cursor for the next page is sent in the ``X-Next-Cursor`` header. The
+cursor encodes the sort-key values of the last row returned, so each page is a
+bounded index range scan regardless of how deep the client has paged.
+
+Lists are paged by default (DEFAULT_PAGE_SIZE rows); the whole list is only
+returned when the client asks for it with ``full=true``.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import ColumnElement
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_length: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(values, list) or len(values) != expected_length:
+        raise ValueError("Invalid cursor")
+    return [_decode_value(v) for v in values]
+
+
+def page_size(limit: Optional[int], cursor: Optional[str], full: bool = False) -> Optional[int]:
+    """Resolve the effective page size; None means "no pagination", only when full is asked for without paging"""
+    if full and limit is None and cursor is None:
+        return None
+    return min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+
+
+def keyset_page(query: Query, order_by: Sequence[ColumnElement], limit: Optional[int] = None,
+                cursor: Optional[str] = None, descending: bool = False,
+                full: bool = False) -> Tuple[list, Optional[str]]:
+    """
+    Apply a stable ORDER BY and keyset filter to query and fetch one page
+
+    Args:
+        query: Query selecting rows that expose every order_by column by key
+        order_by: Sort key columns, all NOT NULL (a NULL key would end paging early); the last one
+            must be unique (e.g. the primary key)
+        limit: Page size, or None for DEFAULT_PAGE_SIZE
+        cursor: Cursor returned with the previous page
+        descending: Sort all key columns descending instead of ascending
+        full: Return the whole (still ordered) result when neither limit nor cursor is given
+
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(order_by))
+        key = tuple_(*order_by)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in order_by])
+
+    size = page_size(limit, cursor, full)
+    if size is None:
+        return query.all(), None
+
+    # Fetch one extra row to find out whether another page exists
+    rows = query.limit(size + 1).all()
+    if len(rows) <= size:
+        return rows, None
+
+    rows = rows[:size]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in order_by])
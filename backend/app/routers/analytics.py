@@ -3,21 +3,15 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime
 
-from app.database import SessionLocal
+from app.database import get_db
 from app.schemas import TestAnalytics
-from app.models import TestAnalytics as TestAnalyticsORM, Card as CardORM, Deck as DeckORM, User as UserORM
+from app.models import TestAnalytics as TestAnalyticsORM, User as UserORM
+from app.subscription_service import user_cards_subquery
 from app.auth_middleware import get_current_user
 from app.user_service import UserService
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("", response_model=TestAnalytics)
 def get_analytics(
     db: Session = Depends(get_db),
@@ -33,19 +27,17 @@ def get_analytics(
     user = db.query(UserORM).filter(UserORM.uid == user_id).first()
     user_language = user.selected_language if user and user.selected_language else 'en'
     
-    # Calculate real-time language-specific analytics
-    user_cards_query = db.query(CardORM).join(DeckORM).filter(
-        DeckORM.user_id == user_id,
-        DeckORM.language == user_language
-    )
+    # Calculate real-time language-specific analytics (subscribed decks included)
+    user_cards = user_cards_subquery(user_id, user_language)
+    user_cards_query = db.query(user_cards)
     
-    total_cards_studied = user_cards_query.filter(CardORM.total_attempts > 0).count()
+    total_cards_studied = user_cards_query.filter(user_cards.c.total_attempts > 0).count()
     total_correct_answers = user_cards_query.with_entities(
-        func.sum(CardORM.accuracy * CardORM.total_attempts)
+        func.sum(user_cards.c.accuracy * user_cards.c.total_attempts)
     ).scalar() or 0
-    cards_mastered = user_cards_query.filter(CardORM.accuracy >= 0.9).count()
+    cards_mastered = user_cards_query.filter(user_cards.c.accuracy >= 0.9).count()
     overall_average_progress = (
-        user_cards_query.with_entities(func.avg(CardORM.accuracy)).scalar() or 0.0
+        user_cards_query.with_entities(func.avg(user_cards.c.accuracy)).scalar() or 0.0
     )
     
     return TestAnalytics(
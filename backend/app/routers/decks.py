@@ -1,48 +1,77 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Response, UploadFile, File, BackgroundTasks
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.database import SessionLocal
+from app.database import get_db
 from app import models, schemas
-from app.schemas import Card, DeckCreate, DeckWithCardsCreate, DeckWithCardsResponse, CardCreate, PublicDeckOut, CopyPublicDeckRequest
-from app.models import Card as CardORM
+from app.schemas import Card, DeckCreate, DeckWithCardsCreate, DeckWithCardsResponse, CardCreate, PublicDeckOut, CopyPublicDeckRequest, PublicDeckSearchResponse, DeckSyncResult, DeckCardsDelta, DeckCardsDeltaResult
 from app.deck_service import DeckService
+from app.card_ingest_service import CardIngestService, fill_missing_audio
+from app.deck_rollups import refresh_deck_subscribers
+from app.deck_tombstones import reap_deleted_deck
+from app.subscription_service import SubscriptionService
+from app.deck_sync_service import DeckSyncService
+from app.catalog_search import CatalogSearchService, MAX_SEARCH_LIMIT
+from app.catalog_cache import CATALOG_CACHE_CONTROL, cached_catalog_response
+from app.snapshot_service import DeckSnapshotService
+from app.deck_versions import USER_DECK_CACHE_CONTROL, deck_etag, deck_list_etag
+from app.etag import etag_matches, make_etag, not_modified
+from app.card_serialization import build_audio_url, card_list_response, card_row_to_dict, dumps, get_base_url
+from app.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 from app.auth_middleware import get_current_user, get_user_id
 from app.user_service import UserService
 
 router = APIRouter(prefix="/decks", tags=["decks"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def populate_audio_urls(cards: List[CardORM], request: Request) -> List[Card]:
-    """Convert CardORM to Card schema with audio URLs"""
-    result = []
-    base_url = str(request.base_url).rstrip('/')
-    
-    for card in cards:
-        # Convert to Card schema using from_attributes
-        card_schema = Card.model_validate(card)
-        # Add the audio_url field
-        card_schema.audio_url = f"{base_url}/audio/{card.audio_path.replace('voices/', '')}" if card.audio_path else None
-        result.append(card_schema)
-    
-    return result
+public_deck_list_adapter = TypeAdapter(List[PublicDeckOut])
+
+def next_cursor_headers(next_cursor: Optional[str]) -> dict:
+    """Response headers advertising the cursor for the next page, if any"""
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
 
 @router.get("/public", response_model=List[PublicDeckOut])
 def get_public_decks(
+    request: Request,
     language: str = None,
     search: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    full: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Get all public decks (no authentication required)"""
+    """Get a page of public decks (no authentication required); full=true returns them all"""
     try:
-        deck_service = DeckService(db)
-        return deck_service.get_public_decks(language=language, search=search)
+        def build():
+            deck_service = DeckService(db)
+            decks, next_cursor = deck_service.get_public_decks(
+                language=language, search=search, limit=limit, cursor=cursor, full=full
+            )
+            return public_deck_list_adapter.dump_json(decks), next_cursor
+
+        params = {"language": language, "search": search, "limit": limit, "cursor": cursor, "full": full}
+        return cached_catalog_response(request, "public_decks", params, build)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/public/search", response_model=PublicDeckSearchResponse)
+def search_public_decks(
+    q: str,
+    request: Request,
+    language: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_SEARCH_LIMIT),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Relevance-ranked search of public decks with language facets (no authentication required)"""
+    try:
+        def build():
+            search_service = CatalogSearchService(db)
+            results = search_service.search(q, language=language, limit=limit, cursor=cursor)
+            return results.model_dump_json().encode("utf-8"), None
+
+        params = {"q": q, "language": language, "limit": limit, "cursor": cursor}
+        return cached_catalog_response(request, "public_search", params, build)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -50,17 +79,33 @@ def get_public_decks(
 def get_public_deck_cards(
     deck_id: int,
     request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    full: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Get cards from a public deck (no authentication required)"""
+    """Get a page of cards from a public deck (no authentication required); full=true returns them all"""
     try:
+        if full and limit is None and cursor is None:
+            # Whole deck: serve the published snapshot instead of querying every card
+            _, snapshot = DeckSnapshotService(db).get_public_snapshot(deck_id)
+            if not snapshot.card_count:
+                raise HTTPException(status_code=404, detail="Public deck not found or has no cards")
+
+            etag = make_etag("snapshot", deck_id, snapshot.version)
+            headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+            if etag_matches(request, etag):
+                return not_modified(etag, {"Cache-Control": CATALOG_CACHE_CONTROL})
+            return Response(content=DeckSnapshotService.render(snapshot, get_base_url(request)),
+                            media_type="application/json", headers=headers)
+
         deck_service = DeckService(db)
-        cards = deck_service.get_public_deck_cards(deck_id)
+        cards, next_cursor = deck_service.get_public_deck_cards(deck_id, limit=limit, cursor=cursor)
 
-        if not cards:
+        if not cards and not cursor:
             raise HTTPException(status_code=404, detail="Public deck not found or has no cards")
 
-        return populate_audio_urls(cards, request)
+        return card_list_response(cards, request, headers=next_cursor_headers(next_cursor))
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail="Public deck not found")
@@ -72,7 +117,7 @@ def copy_public_deck(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Copy a public deck to user's collection"""
+    """Copy a public deck to user's collection, or subscribe to it (mode="subscribe")"""
     try:
         user_id = current_user["uid"]
 
@@ -80,15 +125,25 @@ def copy_public_deck(
         user_service = UserService(db)
         user_service.get_or_create_user(current_user["firebase_token"])
 
+        if request_data.mode == "subscribe":
+            subscription_service = SubscriptionService(db)
+            return subscription_service.subscribe(request_data.public_deck_id, user_id)
+
         deck_service = DeckService(db)
         return deck_service.copy_public_deck(request_data.public_deck_id, user_id)
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail="Public deck not found")
+        if "already subscribed" in str(e).lower():
+            raise HTTPException(status_code=409, detail=str(e))
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("", response_model=list[schemas.DeckOut])
 def read_decks(
+    request: Request,
+    response: Response,
+    include_stats: bool = False,
+    threshold: float = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -98,13 +153,28 @@ def read_decks(
     user_service = UserService(db)
     user_service.get_or_create_user(current_user["firebase_token"])
     
+    # Revalidation: the ETag follows from deck versions, so nothing is loaded on a match
+    etag = deck_list_etag(db, user_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, {"Cache-Control": USER_DECK_CACHE_CONTROL})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = USER_DECK_CACHE_CONTROL
+    
     # Get user's decks
     deck_service = DeckService(db)
+    if include_stats:
+        # Convert percentage threshold to decimal if provided
+        decimal_threshold = None
+        if threshold is not None:
+            decimal_threshold = threshold / 100.0 if threshold > 1 else threshold
+        return deck_service.get_user_decks_with_stats(user_id, decimal_threshold)
     return deck_service.get_user_decks(user_id)
 
 @router.get("/{deck_id}", response_model=schemas.DeckOut)
 def get_deck_by_id(
     deck_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -115,6 +185,13 @@ def get_deck_by_id(
         user_service = UserService(db)
         user_service.get_or_create_user(current_user["firebase_token"])
         
+        etag = deck_etag(db, deck_id, user_id)
+        if etag:
+            if etag_matches(request, etag):
+                return not_modified(etag, {"Cache-Control": USER_DECK_CACHE_CONTROL})
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = USER_DECK_CACHE_CONTROL
+        
         deck_service = DeckService(db)
         return deck_service.get_deck_by_id(deck_id, user_id)
     except Exception as e:
@@ -158,6 +235,55 @@ def create_deck_with_cards(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/import-table", response_model=schemas.CardIngestResult)
+def import_cards_from_table(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    deck_id: Optional[int] = None,
+    name: Optional[str] = None,
+    is_public: bool = False,
+    front_column: Optional[str] = None,
+    back_column: Optional[str] = None,
+    custom_columns: Optional[List[str]] = Query(None),
+    has_header: Optional[bool] = None,
+    delimiter: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Bulk-create cards from a CSV/TSV file (or an Anki text export), into deck_id or a new deck called name
+
+    Columns are picked by header name or 1-based number: front_column, back_column
+    and custom_columns (repeatable, each becomes a deck custom field). Audio is
+    generated in the background after the cards are saved.
+    """
+    try:
+        user_id = current_user["uid"]
+        
+        # Ensure user exists in database
+        user_service = UserService(db)
+        user_service.get_or_create_user(current_user["firebase_token"])
+        
+        if not file.filename.endswith(('.csv', '.tsv', '.txt')):
+            raise HTTPException(status_code=400, detail="File must be a CSV, TSV or text file")
+        
+        result = CardIngestService(db).ingest(
+            user_id, file.file, file.filename,
+            deck_id=deck_id, name=name, is_public=is_public,
+            front_column=front_column, back_column=back_column, custom_columns=custom_columns,
+            has_header=has_header, delimiter=delimiter
+        )
+        if result.imported_cards:
+            background_tasks.add_task(refresh_deck_subscribers, result.deck_id)
+        if result.audio_pending:
+            background_tasks.add_task(fill_missing_audio, result.deck_id)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        if "not found or access denied" in str(e):
+            raise HTTPException(status_code=404, detail="Deck not found or access denied")
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.patch("/{deck_id}/with-cards", response_model=DeckWithCardsResponse)
 def patch_deck_with_cards(
     deck_id: int,
@@ -179,13 +305,37 @@ def patch_deck_with_cards(
             raise HTTPException(status_code=404, detail="Deck not found or access denied")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/{deck_id}/sync", response_model=DeckSyncResult)
+def sync_copied_deck(
+    deck_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Pull the original public deck's new, changed and removed cards into a copied deck, keeping statistics"""
+    try:
+        user_id = current_user["uid"]
+        
+        # Ensure user exists in database
+        user_service = UserService(db)
+        user_service.get_or_create_user(current_user["firebase_token"])
+        
+        sync_service = DeckSyncService(db)
+        return sync_service.pull_updates(deck_id, user_id)
+    except Exception as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/all/cards", response_model=List[Card])
 def get_all_user_cards(
     request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    full: bool = False,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Get all cards from all user's decks in their selected language"""
+    """Get a page of the cards from all user's decks in their selected language; full=true returns them all"""
     try:
         user_id = current_user["uid"]
         
@@ -194,9 +344,9 @@ def get_all_user_cards(
         user_service.get_or_create_user(current_user["firebase_token"])
         
         deck_service = DeckService(db)
-        cards = deck_service.get_all_user_cards(user_id)
+        cards, next_cursor = deck_service.get_all_user_cards(user_id, limit=limit, cursor=cursor, full=full)
         
-        return populate_audio_urls(cards, request)
+        return card_list_response(cards, request, headers=next_cursor_headers(next_cursor))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -204,9 +354,13 @@ def get_all_user_cards(
 def get_deck_cards(
     deck_id: int,
     request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    full: bool = False,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
+    """Get a page of a deck's cards; full=true returns them all"""
     try:
         user_id = current_user["uid"]
         
@@ -214,13 +368,21 @@ def get_deck_cards(
         user_service = UserService(db)
         user_service.get_or_create_user(current_user["firebase_token"])
         
+        # Checked before any card is loaded; each page has its own URL, so one ETag serves them all
+        etag = deck_etag(db, deck_id, user_id)
+        if etag and etag_matches(request, etag):
+            return not_modified(etag, {"Cache-Control": USER_DECK_CACHE_CONTROL})
+        
         deck_service = DeckService(db)
-        cards = deck_service.get_user_deck_cards(deck_id, user_id)
+        cards, next_cursor = deck_service.get_user_deck_cards(deck_id, user_id, limit=limit, cursor=cursor, full=full)
         
-        if not cards:
+        if not cards and not cursor:
             raise HTTPException(status_code=404, detail="Deck not found or has no cards")
         
-        return populate_audio_urls(cards, request)
+        headers = next_cursor_headers(next_cursor)
+        if etag:
+            headers.update({"ETag": etag, "Cache-Control": USER_DECK_CACHE_CONTROL})
+        return card_list_response(cards, request, headers=headers)
     except Exception as e:
         if "not found or access denied" in str(e):
             raise HTTPException(status_code=404, detail="Deck not found or access denied")
@@ -231,6 +393,7 @@ def add_card_to_deck(
     deck_id: int,
     card_data: CardCreate,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -243,11 +406,11 @@ def add_card_to_deck(
         
         deck_service = DeckService(db)
         db_card = deck_service.add_card_to_deck(deck_id, card_data, user_id)
+        background_tasks.add_task(refresh_deck_subscribers, deck_id)
         
         # Convert to Card schema with audio URL
         card_schema = Card.model_validate(db_card)
-        base_url = str(request.base_url).rstrip('/')
-        card_schema.audio_url = f"{base_url}/audio/{db_card.audio_path.replace('voices/', '')}" if db_card.audio_path else None
+        card_schema.audio_url = build_audio_url(get_base_url(request), db_card.audio_path)
         
         return card_schema
     except Exception as e:
@@ -255,6 +418,44 @@ def add_card_to_deck(
             raise HTTPException(status_code=404, detail="Deck not found or access denied")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.patch("/{deck_id}/cards", response_model=DeckCardsDeltaResult)
+def apply_card_delta(
+    deck_id: int,
+    delta: DeckCardsDelta,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Add, change and remove cards in one request; only the cards listed are touched"""
+    try:
+        user_id = current_user["uid"]
+        
+        # Ensure user exists in database
+        user_service = UserService(db)
+        user_service.get_or_create_user(current_user["firebase_token"])
+        
+        deck_service = DeckService(db)
+        added, changed, removed, replaced, card_count = deck_service.apply_card_delta(deck_id, delta, user_id)
+        if added or removed:
+            background_tasks.add_task(refresh_deck_subscribers, deck_id)
+        
+        base_url = get_base_url(request)
+        return Response(content=dumps({
+            "deck_id": deck_id,
+            "card_count": card_count,
+            "added": [card_row_to_dict(row, base_url) for row in added],
+            "changed": [card_row_to_dict(row, base_url) for row in changed],
+            "removed": removed,
+            "replaced": [{"old_id": old_id, "new_id": new_id} for old_id, new_id in replaced.items()]
+        }), media_type="application/json")
+    except Exception as e:
+        if "Deck not found or access denied" in str(e):
+            raise HTTPException(status_code=404, detail="Deck not found or access denied")
+        if "not found or access denied" in str(e):
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.put("/{deck_id}/cards/{card_id}", response_model=Card)
 def update_card(
     deck_id: int,
@@ -276,8 +477,7 @@ def update_card(
         
         # Convert to Card schema with audio URL
         card_schema = Card.model_validate(db_card)
-        base_url = str(request.base_url).rstrip('/')
-        card_schema.audio_url = f"{base_url}/audio/{db_card.audio_path.replace('voices/', '')}" if db_card.audio_path else None
+        card_schema.audio_url = build_audio_url(get_base_url(request), db_card.audio_path)
         
         return card_schema
     except Exception as e:
@@ -289,6 +489,7 @@ def update_card(
 def delete_card(
     deck_id: int,
     card_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -304,6 +505,7 @@ def delete_card(
         
         if not success:
             raise HTTPException(status_code=404, detail="Card not found")
+        background_tasks.add_task(refresh_deck_subscribers, deck_id)
         
         return {"message": "Card deleted successfully"}
     except Exception as e:
@@ -314,6 +516,7 @@ def delete_card(
 @router.delete("/{deck_id}")
 def delete_deck(
     deck_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -330,6 +533,8 @@ def delete_deck(
         if not success:
             raise HTTPException(status_code=404, detail="Deck not found")
         
+        # The deck is tombstoned; its rows are removed after the response
+        background_tasks.add_task(reap_deleted_deck, deck_id)
         return {"message": "Deck deleted successfully"}
     except Exception as e:
         if "not found or access denied" in str(e):
@@ -1,21 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterator, List, Literal, Optional
 from pydantic import BaseModel
-import json
+import zipfile
 
-from app.database import SessionLocal
+from app.database import SessionLocal, get_db
 from app import models, schemas
 from app.auth_middleware import get_current_user
 from app.user_service import UserService
+from app.subscription_service import user_cards_subquery
+from app.export_service import ExportService, ARCHIVE_MEDIA_TYPE, NDJSON_MEDIA_TYPE
+from app.import_service import ImportProgressTracker, ImportService, get_import_progress
 
 router = APIRouter(prefix="/export", tags=["export"])
 
-def get_db():
+def stream_ndjson_export(user_id: str) -> Iterator[bytes]:
+    """Stream the export with a session of its own, since the response outlives the request's session"""
     db = SessionLocal()
     try:
-        yield db
+        yield from ExportService(db).iter_ndjson(user_id)
+    finally:
+        db.close()
+
+def stream_archive_export(user_id: str) -> Iterator[bytes]:
+    """Stream the export archive with a session of its own (see stream_ndjson_export)"""
+    db = SessionLocal()
+    try:
+        yield from ExportService(db).iter_archive(user_id)
     finally:
         db.close()
 
@@ -25,24 +38,23 @@ class ExportCard(BaseModel):
     deck_id: int
     front: str
     back: str
-    example_sentence_1: Optional[str] = None
-    sentence_translation_1: Optional[str] = None
-    example_sentence_2: Optional[str] = None
-    sentence_translation_2: Optional[str] = None
     accuracy: float = 0.0
     total_attempts: int = 0
     correct_answers: int = 0
     last_reviewed_at: Optional[datetime] = None
     created_at: datetime
+    custom_data: Optional[Dict[str, str]] = None
     
     model_config = {"from_attributes": True}
 
 class ExportDeck(BaseModel):
     id: int
     name: str
+    language: str
     created_at: datetime
     progress: float
     card_count: int
+    custom_fields: Optional[List[schemas.CustomField]] = None
     cards: List[ExportCard]
     
     model_config = {"from_attributes": True}
@@ -69,18 +81,13 @@ class FullExportResponse(BaseModel):
     decks: List[ExportDeck]
     analytics: Optional[ExportAnalytics] = None
 
-class ImportResult(BaseModel):
-    success: bool
-    message: str
-    imported_decks: int
-    imported_cards: int
-
 @router.get("/all", response_model=FullExportResponse)
 def export_all_data(
+    format: Literal["json", "ndjson"] = "json",
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Export all user data including decks, cards, and analytics"""
+    """Export all user data including decks, cards, and analytics (format=ndjson streams it)"""
     try:
         user_id = current_user["uid"]
         
@@ -88,6 +95,13 @@ def export_all_data(
         user_service = UserService(db)
         user_service.get_or_create_user(current_user["firebase_token"])
         
+        if format == "ndjson":
+            return StreamingResponse(
+                stream_ndjson_export(user_id),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers={"Content-Disposition": f'attachment; filename="flashy-export-{datetime.utcnow():%Y%m%d}.ndjson"'}
+            )
+        
         # Get all user's decks with cards
         decks_query = db.query(models.Deck).filter(
             models.Deck.user_id == user_id
@@ -96,10 +110,13 @@ def export_all_data(
         export_decks = []
         total_cards = 0
         
+        # Own and subscribed cards alike
+        user_cards = user_cards_subquery(user_id)
+        
         for deck in decks_query:
             # Get all cards for this deck
-            cards = db.query(models.Card).filter(
-                models.Card.deck_id == deck.id
+            cards = db.query(user_cards).filter(
+                user_cards.c.deck_id == deck.id
             ).all()
             
             # Convert cards to export format (excluding audio_url)
@@ -108,9 +125,11 @@ def export_all_data(
             export_deck = ExportDeck(
                 id=deck.id,
                 name=deck.name,
+                language=deck.language,
                 created_at=deck.created_at,
                 progress=deck.progress,
                 card_count=deck.card_count,
+                custom_fields=deck.custom_fields,
                 cards=export_cards
             )
             
@@ -156,13 +175,33 @@ def export_all_data(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
 
-@router.post("/import", response_model=ImportResult)
-def import_all_data(
+@router.get("/archive")
+def export_archive(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Export all user data with the referenced audio files as a streamed zip archive"""
+    user_id = current_user["uid"]
+    
+    # Ensure user exists in database
+    user_service = UserService(db)
+    user_service.get_or_create_user(current_user["firebase_token"])
+    
+    return StreamingResponse(
+        stream_archive_export(user_id),
+        media_type=ARCHIVE_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="flashy-export-{datetime.utcnow():%Y%m%d}.zip"'}
+    )
+
+@router.post("/import-archive", response_model=schemas.ImportResult)
+def import_archive(
     file: UploadFile = File(...),
+    import_id: Optional[str] = None,
+    mode: Literal["replace", "merge"] = "replace",
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Import all user data - DESTRUCTIVE: replaces all existing data"""
+    """Import an export archive, restoring its audio files - DESTRUCTIVE unless mode=merge: replaces all existing data"""
     try:
         user_id = current_user["uid"]
         
@@ -170,113 +209,65 @@ def import_all_data(
         user_service = UserService(db)
         user_service.get_or_create_user(current_user["firebase_token"])
         
-        # Read and parse the uploaded file
-        if not file.filename.endswith('.json'):
-            raise HTTPException(status_code=400, detail="File must be a JSON file")
+        if not file.filename.endswith('.zip'):
+            raise HTTPException(status_code=400, detail="File must be a zip archive")
         
-        content = file.file.read()
+        # The upload is spooled to disk, so members are read from it one at a time
         try:
-            import_data = json.loads(content)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=400, detail="Invalid JSON file")
+            return ImportService(db).import_archive(user_id, file.file, ImportProgressTracker(user_id, import_id), mode)
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="Invalid zip archive")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Validate the import data structure
-        if not all(key in import_data for key in ['export_metadata', 'decks']):
-            raise HTTPException(status_code=400, detail="Invalid export file format")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+
+@router.post("/import", response_model=schemas.ImportResult)
+def import_all_data(
+    file: UploadFile = File(...),
+    import_id: Optional[str] = None,
+    mode: Literal["replace", "merge"] = "replace",
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Import all user data from a JSON or NDJSON export - DESTRUCTIVE unless mode=merge: replaces all existing data
+
+    mode=merge applies only the differences and keeps everything else (see ImportService.merge_records).
+    Pass an import_id to follow the import's progress at GET /export/import/{import_id}.
+    """
+    try:
+        user_id = current_user["uid"]
+        
+        # Ensure user exists in database
+        user_service = UserService(db)
+        user_service.get_or_create_user(current_user["firebase_token"])
         
-        # Start transaction for atomic operation
-        db.begin()
+        if not file.filename.endswith(('.json', '.ndjson')):
+            raise HTTPException(status_code=400, detail="File must be a JSON or NDJSON file")
         
+        # The upload is parsed incrementally and imported in batches, in one transaction
         try:
-            # DESTRUCTIVE: Delete all existing user data
-            # Delete study sessions first (foreign key constraint)
-            db.query(models.StudySession).filter(
-                models.StudySession.user_id == user_id
-            ).delete()
-            
-            # Delete analytics
-            db.query(models.TestAnalytics).filter(
-                models.TestAnalytics.user_id == user_id
-            ).delete()
-            
-            # Delete cards (will cascade from decks, but explicit for clarity)
-            deck_ids = db.query(models.Deck.id).filter(
-                models.Deck.user_id == user_id
-            ).subquery()
-            
-            db.query(models.Card).filter(
-                models.Card.deck_id.in_(deck_ids)
-            ).delete(synchronize_session=False)
-            
-            # Delete decks
-            db.query(models.Deck).filter(
-                models.Deck.user_id == user_id
-            ).delete()
-            
-            # Import new data
-            imported_decks = 0
-            imported_cards = 0
-            
-            for deck_data in import_data['decks']:
-                # Create new deck
-                new_deck = models.Deck(
-                    user_id=user_id,
-                    name=deck_data['name'],
-                    created_at=datetime.fromisoformat(deck_data['created_at'].replace('Z', '+00:00')),
-                    progress=deck_data['progress'],
-                    card_count=deck_data['card_count']
-                )
-                db.add(new_deck)
-                db.flush()  # Get the new deck ID
-                
-                imported_decks += 1
-                
-                # Import cards for this deck
-                for card_data in deck_data['cards']:
-                    new_card = models.Card(
-                        deck_id=new_deck.id,
-                        front=card_data['front'],
-                        back=card_data['back'],
-                        example_sentence_1=card_data.get('example_sentence_1'),
-                        sentence_translation_1=card_data.get('sentence_translation_1'),
-                        example_sentence_2=card_data.get('example_sentence_2'),
-                        sentence_translation_2=card_data.get('sentence_translation_2'),
-                        accuracy=card_data['accuracy'],
-                        total_attempts=card_data['total_attempts'],
-                        correct_answers=card_data['correct_answers'],
-                        last_reviewed_at=datetime.fromisoformat(card_data['last_reviewed_at'].replace('Z', '+00:00')) if card_data.get('last_reviewed_at') else None,
-                        created_at=datetime.fromisoformat(card_data['created_at'].replace('Z', '+00:00'))
-                    )
-                    db.add(new_card)
-                    imported_cards += 1
-            
-            # Import analytics if present
-            if import_data.get('analytics'):
-                analytics_data = import_data['analytics']
-                new_analytics = models.TestAnalytics(
-                    user_id=user_id,
-                    total_cards_studied=analytics_data['total_cards_studied'],
-                    total_correct_answers=analytics_data['total_correct_answers'],
-                    cards_mastered=analytics_data['cards_mastered'],
-                    overall_average_progress=analytics_data['overall_average_progress']
-                )
-                db.add(new_analytics)
-            
-            # Commit the transaction
-            db.commit()
-            
-            return ImportResult(
-                success=True,
-                message=f"Successfully imported {imported_decks} decks with {imported_cards} cards",
-                imported_decks=imported_decks,
-                imported_cards=imported_cards
+            return ImportService(db).import_file(
+                user_id, file.file, file.filename, ImportProgressTracker(user_id, import_id), mode
             )
-            
-        except Exception as e:
-            db.rollback()
-            raise e
-            
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+
+@router.get("/import/{import_id}", response_model=schemas.ImportProgress)
+def get_import_status(
+    import_id: str,
+    current_user = Depends(get_current_user)
+):
+    """Progress of an import started with this import_id"""
+    progress = get_import_progress(current_user["uid"], import_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return progress
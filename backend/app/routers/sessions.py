@@ -1,22 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.database import SessionLocal
-from app.schemas import StudySession, CreateSessionRequest, TestResult, TestStats
+from app.database import get_db
+from app.schemas import StudySession, CreateSessionRequest, TestResult, TestStats, StudyAnswerResult
 from app.session_service import SessionService
+from app.answer_buffer import flush_buffered_answers
 from app.auth_middleware import get_current_user, get_user_id
 from app.user_service import UserService
 
 router = APIRouter(prefix="/study", tags=["study sessions"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/sessions", response_model=StudySession)
 def create_study_session(
     request: CreateSessionRequest,
@@ -48,13 +42,65 @@ def create_study_session(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/sessions/latest", response_model=StudySession)
+def resume_latest_study_session(
+    http_request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Resume the user's most recent unfinished session (for a client that lost its session id)"""
+    user_id = current_user["uid"]
+
+    # Ensure user exists in database
+    user_service = UserService(db)
+    user_service.get_or_create_user(current_user["firebase_token"])
+
+    session_service = SessionService(db)
+    return session_service.resume_study_session(user_id, http_request)
+
+@router.get("/sessions/{session_id}", response_model=StudySession)
+def resume_study_session(
+    session_id: str,
+    http_request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Resume an unfinished session with the cards it was created with"""
+    user_id = current_user["uid"]
+
+    # Ensure user exists in database
+    user_service = UserService(db)
+    user_service.get_or_create_user(current_user["firebase_token"])
+
+    session_service = SessionService(db)
+    return session_service.resume_study_session(user_id, http_request, session_id)
+
+@router.post("/sessions/{session_id}/answers", response_model=StudyAnswerResult)
+def record_study_answer(
+    session_id: str,
+    result: TestResult,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Record one answer as it is given, so an interrupted session loses nothing"""
+    user_id = current_user["uid"]
+
+    # Ensure user exists in database
+    user_service = UserService(db)
+    user_service.get_or_create_user(current_user["firebase_token"])
+
+    session_service = SessionService(db)
+    return session_service.record_answer(user_id, session_id, result)
+
 @router.post("/sessions/complete")
 def complete_study_session(
         results: List[TestResult],
         background_tasks: BackgroundTasks,  
+        session_id: Optional[str] = None,
         db: Session = Depends(get_db),
         current_user = Depends(get_current_user)
 ):
+    """Record a session's results; with session_id only the session's cards count and the session is closed"""
     user_id = current_user["uid"]
     
     # Ensure user exists in database
@@ -62,9 +108,11 @@ def complete_study_session(
     user_service.get_or_create_user(current_user["firebase_token"])
     
     session_service = SessionService(db)
-    session_service.complete_session(results)
+    completion = session_service.complete_session(results, user_id, session_id)
+    # Fold answers given one at a time into the statistics before the analytics read them
+    background_tasks.add_task(flush_buffered_answers)
     background_tasks.add_task(session_service.update_analytics, user_id)
-    return {"message": "Session completed successfully"}
+    return completion
 
 @router.get("/test/{test_type}/stats", response_model=TestStats)
 def get_test_stats(
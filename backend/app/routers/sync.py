@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+from app.schemas import DeltaSyncResponse
+from app.delta_sync import DeltaSyncService
+from app.card_serialization import card_row_to_dict, dumps, get_base_url
+from app.auth_middleware import get_current_user
+from app.user_service import UserService
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+@router.get("", response_model=DeltaSyncResponse)
+def delta_sync(
+    request: Request,
+    since: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Decks, cards and deletions changed since the cursor of the previous sync (everything without one)
+
+    Store the returned cursor and pass it as since next time. Apply decks and
+    cards as upserts keyed by (deck_id, id); when full is true, replace the
+    local collection instead.
+    """
+    try:
+        user_id = current_user["uid"]
+        
+        # Ensure user exists in database
+        user_service = UserService(db)
+        user_service.get_or_create_user(current_user["firebase_token"])
+        
+        try:
+            response, card_rows = DeltaSyncService(db).changes(user_id, since)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Cards are encoded directly, like the card list endpoints
+        base_url = get_base_url(request)
+        payload = response.model_dump(mode="json", exclude={"cards"})
+        payload["cards"] = [card_row_to_dict(row, base_url) for row in card_rows]
+        return Response(content=dumps(payload), media_type="application/json")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,20 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
-from app.schemas import User, UserUpdate
+from app.database import get_db
+from app.schemas import User, UserUpdate, AccountDeletionProgress
 from app.user_service import UserService
-from app.auth_middleware import get_current_user
+from app.account_purge import AccountPurgeProgressTracker, get_purge_progress, purge_account
+from app.auth_middleware import get_current_user, get_deleting_user
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/me", response_model=User)
 def get_current_user_profile(
     db: Session = Depends(get_db),
@@ -45,21 +39,41 @@ def update_current_user_profile(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.delete("/me")
+@router.delete("/me", response_model=AccountDeletionProgress, status_code=202)
 def delete_current_user_account(
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_deleting_user)
 ):
-    """Delete current user's account and all associated data"""
+    """Delete current user's account and all associated data
+
+    The account is closed at once and its data purged in the background;
+    follow the purge at GET /users/me/deletion.
+    """
     user_id = current_user["uid"]
     
     try:
         user_service = UserService(db)
-        success = user_service.delete_user(user_id)
+        deleted_user = user_service.delete_user(user_id)
         
-        if not success:
+        if not deleted_user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        return {"message": "User account deleted successfully"}
+        tracker = AccountPurgeProgressTracker(user_id, deleted_user.deleted_at)
+        tracker.update()
+        background_tasks.add_task(purge_account, user_id)
+        return tracker.progress
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/me/deletion", response_model=AccountDeletionProgress)
+def get_account_deletion_status(
+    current_user = Depends(get_deleting_user)
+):
+    """Progress of the purge of the current user's deleted account"""
+    progress = get_purge_progress(current_user["uid"])
+    if not progress:
+        raise HTTPException(status_code=404, detail="No account deletion in progress")
+    return progress
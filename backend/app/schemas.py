@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Literal
 from typing import List
 
 class User(BaseModel):
@@ -51,6 +51,14 @@ class DeckCreate(DeckBase):
     custom_fields: Optional[List[CustomField]] = None
 
 
+class DeckStats(BaseModel):
+    """Study statistics of a deck's cards (same definitions as the test stats endpoints)"""
+    new_count: int = 0  # never reviewed
+    unfamiliar_count: int = 0  # accuracy below the threshold
+    mastered_count: int = 0  # accuracy of at least 90%
+    last_reviewed_at: Optional[datetime] = None
+
+
 class DeckOut(BaseModel):
     id: int
     name: str
@@ -60,7 +68,9 @@ class DeckOut(BaseModel):
     progress: float
     card_count: int
     original_author_name: Optional[str] = None
+    subscribed_deck_id: Optional[int] = None
     custom_fields: Optional[List[CustomField]] = None
+    stats: Optional[DeckStats] = None  # Only when requested with include_stats
 
     class Config:
         orm_mode = True
@@ -80,6 +90,21 @@ class PublicDeckOut(BaseModel):
         orm_mode = True
 
 
+class PublicDeckSearchResult(PublicDeckOut):
+    score: float = 0.0
+
+
+class LanguageFacet(BaseModel):
+    language: str
+    count: int
+
+
+class PublicDeckSearchResponse(BaseModel):
+    results: List[PublicDeckSearchResult]
+    facets: List[LanguageFacet]
+    next_cursor: Optional[str] = None
+
+
 class CardCreate(BaseModel):
     id: Optional[int] = None
     front: str
@@ -87,6 +112,20 @@ class CardCreate(BaseModel):
     custom_data: Optional[Dict[str, str]] = None
 
 
+class CardChange(BaseModel):
+    """Partial card update; only the fields present in the request are changed"""
+    id: int
+    front: Optional[str] = None
+    back: Optional[str] = None
+    custom_data: Optional[Dict[str, str]] = None
+
+
+class DeckCardsDelta(BaseModel):
+    added: List[CardCreate] = []
+    changed: List[CardChange] = []
+    removed: List[int] = []
+
+
 class DeckWithCardsCreate(BaseModel):
     name: str
     is_public: bool = False
@@ -108,9 +147,27 @@ class DeckWithCardsResponse(BaseModel):
     class Config:
         orm_mode = True 
 
+class CardIdChange(BaseModel):
+    old_id: int
+    new_id: int
+
+
+class DeckCardsDeltaResult(BaseModel):
+    deck_id: int
+    card_count: int
+    added: List[Card]
+    changed: List[Card]  # Listed under their new id when replaced
+    removed: List[int]
+    # Inherited cards of a subscription that were changed become the user's own
+    # cards under a new id; clients replace old_id with new_id
+    replaced: List[CardIdChange] = []
+
+
 class StudySession(BaseModel):
+    session_id: Optional[str] = None  # Server-side session (see app.study_session_store)
     deck_id: int
     started_at: datetime
+    expires_at: Optional[datetime] = None
     cards: List[Card]
 
 class CreateSessionRequest(BaseModel):
@@ -123,6 +180,11 @@ class TestResult(BaseModel):
     card_id: int
     remembered: bool
 
+class StudyAnswerResult(BaseModel):
+    card_id: int
+    buffered: bool  # False when the answer was written to the database directly
+    remaining: int  # Cards of the session not answered yet
+
 class TestAnalytics(BaseModel):
     total_cards_studied: int
     total_correct_answers: int
@@ -155,4 +217,123 @@ class TestStats(BaseModel):
     total_cards: Optional[int] = None
 
 class CopyPublicDeckRequest(BaseModel):
-    public_deck_id: int
\ No newline at end of file
+    public_deck_id: int
+    # "copy" duplicates the cards; "subscribe" reads them from the public deck (copy-on-write)
+    mode: Literal["copy", "subscribe"] = "copy"
+
+class DeckSyncResult(BaseModel):
+    deck_id: int
+    source_deck_id: int
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    conflicts: int = 0  # Cards changed by both the author and the user; the user's version is kept
+    card_count: int
+    synced_at: datetime
+
+class DeltaSyncDeck(DeckOut):
+    language: str
+
+
+class DeltaSyncDeletedCard(BaseModel):
+    deck_id: int
+    card_id: int
+
+
+class DeltaSyncResponse(BaseModel):
+    cursor: str  # Pass as since on the next sync
+    # True when the response holds everything (no or expired since): replace local data instead of merging
+    full: bool
+    decks: List[DeltaSyncDeck] = []
+    cards: List[Card] = []
+    deleted_decks: List[int] = []
+    deleted_cards: List[DeltaSyncDeletedCard] = []
+
+class ImportResult(BaseModel):
+    success: bool
+    message: str
+    imported_decks: int
+    imported_cards: int
+    restored_audio_files: int = 0
+    import_id: Optional[str] = None
+    # Merge imports only
+    updated_cards: int = 0
+    unchanged_cards: int = 0
+
+class CardIngestResult(BaseModel):
+    deck_id: int
+    imported_cards: int
+    skipped_rows: int
+    # Line numbers of the first skipped rows
+    skipped_row_numbers: List[int] = []
+    custom_fields: Optional[List[CustomField]] = None
+    # Audio is generated in the background after the import
+    audio_pending: bool = False
+
+class ImportProgress(BaseModel):
+    import_id: str
+    status: Literal["running", "completed", "failed"]
+    imported_decks: int = 0
+    imported_cards: int = 0
+    total_cards: Optional[int] = None  # From the export metadata, when present
+    message: Optional[str] = None
+    updated_at: datetime
+
+class AccountDeletionProgress(BaseModel):
+    status: Literal["pending", "running", "completed", "failed"]
+    deleted_study_sessions: int = 0
+    deleted_decks: int = 0
+    deleted_cards: int = 0
+    total_cards: Optional[int] = None
+    deleted_audio_files: int = 0
+    message: Optional[str] = None
+    requested_at: datetime
+    updated_at: datetime
+
+class ImportDeckRecord(BaseModel):
+    """Deck record of an export file (see app.export_service)"""
+    id: int
+    name: str
+    language: Optional[str] = None
+    created_at: Optional[datetime] = None
+    custom_fields: Optional[List[CustomField]] = None
+
+class ImportCardRecord(BaseModel):
+    """Card record of an export file; the example sentence fields come from exports made before custom fields"""
+    id: Optional[int] = None
+    deck_id: int
+    front: str
+    back: str
+    accuracy: float = 0.0
+    total_attempts: int = 0
+    correct_answers: int = 0
+    last_reviewed_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    audio_path: Optional[str] = None
+    custom_data: Optional[Dict[str, str]] = None
+    example_sentence_1: Optional[str] = None
+    sentence_translation_1: Optional[str] = None
+    example_sentence_2: Optional[str] = None
+    sentence_translation_2: Optional[str] = None
+
+class DeckRollupReport(BaseModel):
+    dry_run: bool
+    checked_decks: int = 0
+    drifted_decks: int = 0
+    repaired_decks: int = 0
+    duration_seconds: float = 0.0
+    sample_deck_ids: List[int] = []
+
+class AudioGCReport(BaseModel):
+    dry_run: bool
+    scanned_files: int = 0
+    scanned_bytes: int = 0
+    referenced_files: int = 0
+    skipped_recent_files: int = 0
+    orphaned_files: int = 0
+    orphaned_bytes: int = 0
+    deleted_files: int = 0
+    reclaimed_bytes: int = 0
+    cache_entries_removed: int = 0
+    duration_seconds: float = 0.0
+    sample_orphans: List[str] = []
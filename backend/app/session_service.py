@@ -1,17 +1,24 @@
+from collections import defaultdict
 from datetime import datetime
-from typing import List
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select, update
 from fastapi import Request, HTTPException
 
-from app.models import Card as CardORM, TestAnalytics as TestAnalyticsORM
-from app.schemas import StudySession, Card as CardSchema, TestResult, SessionComplete, TestStats
+from app.models import Card as CardORM, Deck as DeckORM, TestAnalytics as TestAnalyticsORM
+from app.schemas import StudySession, Card as CardSchema, TestResult, SessionComplete, TestStats, StudyAnswerResult
 from app.strategies.test_strategy_interface import TestStrategyInterface
 from app.strategies.test_all_strategy import TestAllStrategy
 from app.strategies.test_by_decks_strategy import TestByDecksStrategy
 from app.strategies.test_unfamiliar_strategy import TestUnfamiliarStrategy
 from app.strategies.test_newly_added_strategy import TestNewlyAddedStrategy
+from app.card_serialization import CARD_LIST_COLUMNS, card_row_to_dict, get_base_url
+from app.subscription_service import SubscriptionService, user_cards_subquery
+from app.deck_rollups import apply_deck_delta
+from app.deck_versions import bump_deck_versions
+from app.study_session_store import StoredStudySession, StudySessionsUnavailableError, study_sessions
+from app.answer_buffer import buffer_answer
 import random
 
 class SessionService:
@@ -31,20 +38,36 @@ class SessionService:
         
         return strategies[test_type](self.db)
     
-    def _populate_audio_urls(self, cards: List[CardORM], request: Request) -> List[CardSchema]:
-        """Convert CardORM to Card schema with audio URLs"""
-        result = []
-        base_url = str(request.base_url).rstrip('/')
-        
-        for card in cards:
-            # Convert to Card schema using from_attributes
-            card_schema = CardSchema.model_validate(card)
-            # Add the audio_url field
-            card_schema.audio_url = f"{base_url}/audio/{card.audio_path.replace('voices/', '')}" if card.audio_path else None
-            result.append(card_schema)
-        
-        return result
-    
+    def _inherited_card_ids(self, rows: List[Sequence]) -> List[int]:
+        """Ids of the sampled cards (CARD_LIST_COLUMNS rows) that subscribed decks inherit rather than own"""
+        # An own card's row lives in the deck it is listed under; an inherited one in the source deck
+        card_decks = dict(self.db.execute(
+            select(CardORM.id, CardORM.deck_id).where(CardORM.id.in_([row[0] for row in rows]))
+        ).all())
+        return [row[0] for row in rows if card_decks.get(row[0]) != row[1]]
+
+    def _session_response(self, session: StoredStudySession, request: Request,
+                          answered: Set[int] = frozenset()) -> StudySession:
+        base_url = get_base_url(request)
+        # Values come straight from the database, so skip validation here and let
+        # FastAPI validate the response once
+        return StudySession(
+            session_id=session.session_id,
+            deck_id=session.deck_id,
+            started_at=session.started_at,
+            expires_at=session.expires_at,
+            cards=[
+                CardSchema.model_construct(**card_row_to_dict(row, base_url))
+                for row in session.cards if row[0] not in answered
+            ]
+        )
+
+    def _get_session(self, user_id: str, session_id: str) -> StoredStudySession:
+        session = study_sessions.get(user_id, session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Study session not found or expired")
+        return session
+
     def create_study_session(self, test_type: str, user_id: str, request: Request, deck_ids: List[int] = None, limit: int = 20, threshold: float = None) -> StudySession:
         strategy = self._get_strategy(test_type)
         cards = strategy.get_cards(user_id, deck_ids, limit, threshold)
@@ -52,17 +75,61 @@ class SessionService:
         if not cards:
             raise HTTPException(status_code=404, detail="No cards found for the specified criteria")
         
-        # Convert ORM models to Pydantic models with audio URLs
-        card_models = self._populate_audio_urls(cards, request)
+        rows = [tuple(getattr(card, column.key) for column in CARD_LIST_COLUMNS) for card in cards]
 
         # Use the first deck_id if available, otherwise use 0 as placeholder
         deck_id = deck_ids[0] if deck_ids and len(deck_ids) > 0 else 0
         
-        return StudySession(
-            deck_id=deck_id,
-            started_at=datetime.now(),
-            cards=card_models  
-        )
+        # Kept server-side so completion can check the results and the session can be resumed
+        try:
+            session = study_sessions.create(user_id, test_type, deck_id, rows, self._inherited_card_ids(rows))
+        except StudySessionsUnavailableError:
+            # Without Redis the cards go out without a session_id; completing
+            # without one records the results as before server-side sessions
+            base_url = get_base_url(request)
+            return StudySession(
+                deck_id=deck_id,
+                started_at=datetime.now(),
+                cards=[CardSchema.model_construct(**card_row_to_dict(row, base_url)) for row in rows]
+            )
+        return self._session_response(session, request)
+
+    def resume_study_session(self, user_id: str, request: Request, session_id: Optional[str] = None) -> StudySession:
+        """The cards of an open session (the user's latest one without session_id) not answered yet, as sampled"""
+        session = self._get_session(user_id, session_id) if session_id else study_sessions.latest(user_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Study session not found or expired")
+        return self._session_response(session, request, study_sessions.answered(user_id, session.session_id))
+
+    def record_answer(self, user_id: str, session_id: str, result: TestResult) -> StudyAnswerResult:
+        """
+        Record one answer of an open session
+
+        The answer is buffered in Redis and folded into the card's statistics
+        by the flusher (see app.answer_buffer); without Redis it is written
+        right away.
+        """
+        session = self._get_session(user_id, session_id)
+        ownership = session.ownership()
+        if result.card_id not in ownership:
+            raise HTTPException(status_code=400, detail="Card is not part of this study session")
+
+        # Marked first so concurrent retries of the same answer record it once
+        answered = study_sessions.mark_answered(user_id, session_id, result.card_id)
+        if answered is None:
+            raise HTTPException(status_code=409, detail="Card was already answered in this study session")
+
+        inherited = ownership[result.card_id][1]
+        try:
+            buffered = buffer_answer(user_id, result.card_id, inherited, result.remembered)
+            if not buffered:
+                self.record_reviews([(user_id, result.card_id, inherited, result.remembered)])
+                self.db.commit()
+        except Exception:
+            self.db.rollback()
+            study_sessions.unmark_answered(user_id, session_id, result.card_id)
+            raise
+        return StudyAnswerResult(card_id=result.card_id, buffered=buffered, remaining=len(ownership) - answered)
     
     def get_test_stats(self, test_type: str, user_id: str, deck_ids: List[int] = None, threshold: float = None) -> TestStats:
         strategy = self._get_strategy(test_type)
@@ -75,15 +142,113 @@ class SessionService:
             total_cards=stats.get("total_cards")
         )
 
-    def complete_session(self, results: List[TestResult]) :
-        passed = []
-        missed = []
+    def _card_ownership(self, user_id: str, card_ids: List[int]) -> Dict[int, Tuple[Optional[int], bool]]:
+        """Ownership of results sent without a session: the user's own cards, anything else possibly inherited"""
+        own = dict(self.db.execute(
+            select(CardORM.id, CardORM.deck_id).join(DeckORM, CardORM.deck_id == DeckORM.id)
+            .where(CardORM.id.in_(card_ids), DeckORM.user_id == user_id)
+        ).all())
+        return {card_id: (own[card_id], False) if card_id in own else (None, True) for card_id in card_ids}
+
+    def _review_own_cards(self, answers: Dict[Tuple[str, int], List[bool]], accuracy_deltas: Dict[int, float]) -> int:
+        """Record reviews on users' own cards with one SELECT of their statistics and one bulk UPDATE"""
+        if not answers:
+            return 0
+        rows = self.db.execute(
+            select(CardORM.id, CardORM.deck_id, CardORM.accuracy, CardORM.total_attempts, DeckORM.user_id)
+            .join(DeckORM, CardORM.deck_id == DeckORM.id)
+            .where(CardORM.id.in_({card_id for _, card_id in answers}))
+        ).all()
+        recorded = 0
+        updates = []
+        for card_id, deck_id, accuracy, total_attempts, owner in rows:
+            # Only the owner's reviews count
+            remembered_answers = answers.get((owner, card_id))
+            if not remembered_answers:
+                continue
+            stats = {"accuracy": accuracy or 0.0, "total_attempts": total_attempts or 0}
+            for remembered in remembered_answers:
+                stats = self._reviewed(stats["accuracy"], stats["total_attempts"], remembered)
+            accuracy_deltas[deck_id] += stats["accuracy"] - (accuracy or 0.0)
+            updates.append({"id": card_id, **stats})
+            recorded += len(remembered_answers)
+        if updates:
+            self.db.execute(update(CardORM), updates)
+        return recorded
+
+    def record_reviews(self, reviews: Iterable[Tuple[str, int, bool, bool]]) -> int:
+        """
+        Record reviews given as (user id, card id, inherited, remembered), in order, without committing
+
+        Own cards are updated in bulk; inherited ones through the users' review
+        states. Reviews of cards the user doesn't own (or no longer inherits)
+        are dropped. Deck rollups and versions follow. Returns the reviews recorded.
+        """
+        own: Dict[Tuple[str, int], List[bool]] = defaultdict(list)
+        inherited: Dict[str, Dict[int, List[bool]]] = defaultdict(lambda: defaultdict(list))
+        for user_id, card_id, is_inherited, remembered in reviews:
+            if is_inherited:
+                inherited[user_id][card_id].append(remembered)
+            else:
+                own[(user_id, card_id)].append(remembered)
+
+        # Change in the sum of card accuracies per deck, applied to deck progress
+        accuracy_deltas = defaultdict(float)
+        recorded = self._review_own_cards(own, accuracy_deltas)
+
+        # Cards inherited by subscribed decks keep their statistics in review state rows
+        subscriptions = SubscriptionService(self.db)
+        for user_id, answers in inherited.items():
+            states = subscriptions.review_states(user_id, list(answers))
+            # One state per card: a user subscribes to a source deck only once
+            for (deck_id, card_id), state in states.items():
+                for remembered in answers[card_id]:
+                    accuracy_deltas[deck_id] += self._update_card(state, remembered)
+                recorded += len(answers[card_id])
 
+        self.db.flush()
+        for deck_id, accuracy_delta in accuracy_deltas.items():
+            apply_deck_delta(self.db, deck_id, accuracy_delta=accuracy_delta)
+        # Review statistics changed even where accuracy didn't
+        bump_deck_versions(self.db, accuracy_deltas)
+        return recorded
+
+    def complete_session(self, results: List[TestResult], user_id: str, session_id: Optional[str] = None) -> dict:
+        """
+        Record the results of a study session
+
+        With session_id, only cards of that session count (each once, cards
+        already answered one at a time are skipped) and the session is closed;
+        without it (older clients), ownership is resolved for all results with
+        one query.
+        """
+        if session_id:
+            ownership = self._get_session(user_id, session_id).ownership()
+            # Claimed before recording, so concurrent completions of the session record it once
+            if not study_sessions.claim_completion(user_id, session_id):
+                raise HTTPException(status_code=409, detail="Study session is already being completed")
+            answered = study_sessions.answered(user_id, session_id)
+        else:
+            ownership = self._card_ownership(user_id, list({result.card_id for result in results}))
+            answered = set()
+
+        # First answer per card of the session
+        answers: Dict[int, bool] = {}
         for result in results:
-            card = self.db.query(CardORM).filter(CardORM.id == result.card_id).first()
-            if not card:
-                continue  
-            self._update_card(card, result.remembered)
+            if result.card_id in ownership and result.card_id not in answered:
+                answers.setdefault(result.card_id, result.remembered)
+
+        try:
+            recorded = self.record_reviews(
+                (user_id, card_id, ownership[card_id][1], remembered) for card_id, remembered in answers.items()
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            if session_id:
+                # Nothing was recorded: let the client retry
+                study_sessions.release_completion(user_id, session_id)
+            raise
             
             # if result.remembered:
             #     passed.append(card.id)
@@ -107,18 +272,29 @@ class SessionService:
         # )
 
         # self._record_session_history(session_data)
-        self.db.commit()
-        return {"message": "Session completed successfully"}    
+        if session_id:
+            study_sessions.delete(user_id, session_id)
+        return {"message": "Session completed successfully", "recorded": recorded}
 
-    def _update_card(self, card: CardSchema, remembered: bool):
-        prev_correct = int(card.accuracy * card.total_attempts)
-        new_total = card.total_attempts + 1
+    @staticmethod
+    def _reviewed(accuracy: float, total_attempts: int, remembered: bool) -> dict:
+        """Statistics of a card (or review state) after one more review"""
+        prev_correct = int(accuracy * total_attempts)
+        new_total = total_attempts + 1
         new_correct = prev_correct + (1 if remembered else 0)
+        return {
+            "total_attempts": new_total,
+            "correct_answers": new_correct,
+            "accuracy": new_correct / new_total,
+            "last_reviewed_at": datetime.now()
+        }
 
-        card.total_attempts = new_total
-        card.correct_answers = new_correct
-        card.accuracy = new_correct / new_total
-        card.last_reviewed_at = datetime.now()
+    def _update_card(self, card: CardSchema, remembered: bool) -> float:
+        """Record a review on a card (or review state), returning the change in its accuracy"""
+        prev_accuracy = card.accuracy or 0.0
+        for name, value in self._reviewed(prev_accuracy, card.total_attempts, remembered).items():
+            setattr(card, name, value)
+        return card.accuracy - prev_accuracy
 
     def _record_session_history(self, session: SessionComplete):
         new_session = StudySession(
@@ -130,25 +306,23 @@ class SessionService:
         self.db.add(new_session)
     
     def update_analytics(self, user_id: str):
-        from app.models import Deck as DeckORM, User as UserORM
+        from app.models import User as UserORM
         
         # Get user's selected language
         user = self.db.query(UserORM).filter(UserORM.uid == user_id).first()
         user_language = user.selected_language if user and user.selected_language else 'en'
         
-        # Filter cards by user and language through deck relationship
-        user_cards_query = self.db.query(CardORM).join(DeckORM).filter(
-            DeckORM.user_id == user_id,
-            DeckORM.language == user_language
-        )
+        # Filter cards by user and language through deck relationship (subscribed decks included)
+        user_cards = user_cards_subquery(user_id, user_language)
+        user_cards_query = self.db.query(user_cards)
         
-        total_cards_studied = user_cards_query.filter(CardORM.total_attempts > 0).count()
+        total_cards_studied = user_cards_query.filter(user_cards.c.total_attempts > 0).count()
         total_correct_answers = user_cards_query.with_entities(
-            func.sum(CardORM.accuracy * CardORM.total_attempts)
+            func.sum(user_cards.c.accuracy * user_cards.c.total_attempts)
         ).scalar() or 0
-        cards_mastered = user_cards_query.filter(CardORM.accuracy >= 0.9).count()
+        cards_mastered = user_cards_query.filter(user_cards.c.accuracy >= 0.9).count()
         overall_average_progress = (
-            user_cards_query.with_entities(func.avg(CardORM.accuracy)).scalar() or 0.0
+            user_cards_query.with_entities(func.avg(user_cards.c.accuracy)).scalar() or 0.0
         )
 
         analytics_entry = TestAnalyticsORM(
@@ -0,0 +1,96 @@
+import gzip
+from datetime import datetime
+from typing import Tuple
+import logging
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models import Deck as DeckORM, Card as CardORM, DeckSnapshot as DeckSnapshotORM
+from app.card_serialization import CARD_LIST_COLUMNS, card_row_to_dict, dumps
+
+logger = logging.getLogger(__name__)
+
+# Stands in for the request's base URL inside stored audio URLs
+AUDIO_BASE_PLACEHOLDER = "{{flashy:audio_base}}"
+
+
+class DeckSnapshotService:
+    """
+    Immutable, pre-serialized card lists for public decks.
+
+    A snapshot is the gzip-compressed JSON response body for a public deck's
+    cards (newest first). It records the deck's ``last_modified`` it was built
+    from and is rebuilt only after the deck changes, so public views read one
+    blob instead of querying and serializing every card.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def build(self, deck: DeckORM) -> DeckSnapshotORM:
+        """Serialize the deck's cards and store them as its current snapshot"""
+        rows = self.db.query(*CARD_LIST_COLUMNS).filter(
+            CardORM.deck_id == deck.id
+        ).order_by(CardORM.created_at.desc(), CardORM.id.desc()).all()
+
+        payload = gzip.compress(dumps([card_row_to_dict(row, AUDIO_BASE_PLACEHOLDER) for row in rows]))
+        source_modified = deck.last_modified or deck.created_at
+
+        stmt = insert(DeckSnapshotORM).values(
+            deck_id=deck.id,
+            version=1,
+            source_modified=source_modified,
+            card_count=len(rows),
+            payload=payload,
+            created_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DeckSnapshotORM.deck_id],
+            set_={
+                "version": DeckSnapshotORM.version + 1,
+                "source_modified": stmt.excluded.source_modified,
+                "card_count": stmt.excluded.card_count,
+                "payload": stmt.excluded.payload,
+                "created_at": stmt.excluded.created_at,
+            }
+        ).returning(DeckSnapshotORM)
+
+        snapshot = self.db.scalars(
+            stmt, execution_options={"populate_existing": True}
+        ).one()
+        logger.info(f"Built snapshot v{snapshot.version} of deck {deck.id} ({len(rows)} cards, {len(payload)} bytes)")
+        return snapshot
+
+    def get_public_snapshot(self, deck_id: int) -> Tuple[DeckORM, DeckSnapshotORM]:
+        """Current snapshot of a public deck, rebuilding it first if the deck changed since"""
+        try:
+            deck = self.db.query(DeckORM).filter(
+                DeckORM.id == deck_id,
+                DeckORM.is_public == True
+            ).first()
+
+            if not deck:
+                raise Exception("Public deck not found")
+
+            # The payload itself is deferred and only fetched when rendered
+            snapshot = self.db.query(DeckSnapshotORM).filter(DeckSnapshotORM.deck_id == deck_id).first()
+
+            if not snapshot or snapshot.source_modified != (deck.last_modified or deck.created_at):
+                snapshot = self.build(deck)
+                self.db.commit()
+
+            return deck, snapshot
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Failed to get snapshot of public deck {deck_id}: {str(e)}")
+            raise Exception(f"Failed to get public deck cards: {str(e)}")
+
+    @staticmethod
+    def render(snapshot: DeckSnapshotORM, base_url: str) -> bytes:
+        """Response body for the snapshot with audio URLs pointing at base_url"""
+        return gzip.decompress(snapshot.payload).replace(
+            AUDIO_BASE_PLACEHOLDER.encode("utf-8"), base_url.encode("utf-8")
+        )
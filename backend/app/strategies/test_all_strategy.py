@@ -1,6 +1,7 @@
 from typing import List
 from app.strategies.test_strategy_interface import TestStrategyInterface
 from app.models import Card, Deck, User
+from app.subscription_service import user_cards_subquery
 import random
 
 
@@ -10,10 +11,9 @@ class TestAllStrategy(TestStrategyInterface):
         user = self.db.query(User).filter(User.uid == user_id).first()
         user_language = user.selected_language if user and user.selected_language else 'en'
 
-        query = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language
-        )
+        # Own and subscribed cards alike
+        user_cards = user_cards_subquery(user_id, user_language)
+        query = self.db.query(user_cards)
         cards = query.all()
         random.shuffle(cards)
         return cards[:limit]
@@ -23,10 +23,8 @@ class TestAllStrategy(TestStrategyInterface):
         user = self.db.query(User).filter(User.uid == user_id).first()
         user_language = user.selected_language if user and user.selected_language else 'en'
 
-        base_query = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language
-        )
+        user_cards = user_cards_subquery(user_id, user_language)
+        base_query = self.db.query(user_cards)
 
         available_cards = base_query.count()
         total_decks = self.db.query(Deck).filter(
@@ -37,8 +35,8 @@ class TestAllStrategy(TestStrategyInterface):
         # Calculate additional counts
         # Use provided threshold or default to 0.5 (50%) for unfamiliar count
         accuracy_threshold = threshold if threshold is not None else 0.5
-        newly_added_count = base_query.filter(Card.total_attempts == 0).count()
-        unfamiliar_count = base_query.filter(Card.accuracy < accuracy_threshold).count()
+        newly_added_count = base_query.filter(user_cards.c.total_attempts == 0).count()
+        unfamiliar_count = base_query.filter(user_cards.c.accuracy < accuracy_threshold).count()
 
         return {
             "available_cards": available_cards,
@@ -1,6 +1,7 @@
 from typing import List
 from app.strategies.test_strategy_interface import TestStrategyInterface
 from app.models import Card, User
+from app.subscription_service import user_cards_subquery
 import random
 
 
@@ -13,12 +14,8 @@ class TestByDecksStrategy(TestStrategyInterface):
         user = self.db.query(User).filter(User.uid == user_id).first()
         user_language = user.selected_language if user and user.selected_language else 'en'
 
-        from app.models import Deck
-        cards = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language,
-            Card.deck_id.in_(deck_ids)
-        ).all()
+        user_cards = user_cards_subquery(user_id, user_language, deck_ids)
+        cards = self.db.query(user_cards).all()
         random.shuffle(cards)
         return cards[:limit]
     
@@ -30,19 +27,15 @@ class TestByDecksStrategy(TestStrategyInterface):
         user = self.db.query(User).filter(User.uid == user_id).first()
         user_language = user.selected_language if user and user.selected_language else 'en'
 
-        from app.models import Deck
-        base_query = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language,
-            Card.deck_id.in_(deck_ids)
-        )
+        user_cards = user_cards_subquery(user_id, user_language, deck_ids)
+        base_query = self.db.query(user_cards)
 
         available_cards = base_query.count()
-        newly_added_count = base_query.filter(Card.total_attempts == 0).count()
+        newly_added_count = base_query.filter(user_cards.c.total_attempts == 0).count()
 
         # Use provided threshold or default to 0.5 (50%) for unfamiliar count
         accuracy_threshold = threshold if threshold is not None else 0.5
-        unfamiliar_count = base_query.filter(Card.accuracy < accuracy_threshold).count()
+        unfamiliar_count = base_query.filter(user_cards.c.accuracy < accuracy_threshold).count()
 
         return {
             "available_cards": available_cards,
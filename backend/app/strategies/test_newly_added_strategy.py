@@ -1,6 +1,7 @@
 from typing import List
 from app.strategies.test_strategy_interface import TestStrategyInterface
 from app.models import Card, User
+from app.subscription_service import user_cards_subquery
 import random
 
 
@@ -10,16 +11,11 @@ class TestNewlyAddedStrategy(TestStrategyInterface):
         user = self.db.query(User).filter(User.uid == user_id).first()
         user_language = user.selected_language if user and user.selected_language else 'en'
 
-        from app.models import Deck
-        query = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language,
-            Card.total_attempts == 0
+        user_cards = user_cards_subquery(user_id, user_language, deck_ids or None)
+        query = self.db.query(user_cards).filter(
+            user_cards.c.total_attempts == 0
         )
 
-        if deck_ids:
-            query = query.filter(Card.deck_id.in_(deck_ids))
-
         cards = query.all()
         random.shuffle(cards)
         return cards[:limit]
@@ -29,28 +25,19 @@ class TestNewlyAddedStrategy(TestStrategyInterface):
         user = self.db.query(User).filter(User.uid == user_id).first()
         user_language = user.selected_language if user and user.selected_language else 'en'
 
-        from app.models import Deck
-        newly_added_query = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language,
-            Card.total_attempts == 0
-        )
-
-        base_query = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language
+        user_cards = user_cards_subquery(user_id, user_language, deck_ids or None)
+        newly_added_query = self.db.query(user_cards).filter(
+            user_cards.c.total_attempts == 0
         )
 
-        if deck_ids:
-            newly_added_query = newly_added_query.filter(Card.deck_id.in_(deck_ids))
-            base_query = base_query.filter(Card.deck_id.in_(deck_ids))
+        base_query = self.db.query(user_cards)
 
         available_cards = newly_added_query.count()
         total_cards = base_query.count()
 
         # Use provided threshold or default to 0.5 (50%) for unfamiliar count
         accuracy_threshold = threshold if threshold is not None else 0.5
-        unfamiliar_count = base_query.filter(Card.accuracy < accuracy_threshold).count()
+        unfamiliar_count = base_query.filter(user_cards.c.accuracy < accuracy_threshold).count()
 
         return {
             "available_cards": available_cards,
@@ -1,6 +1,7 @@
 from typing import List
 from app.strategies.test_strategy_interface import TestStrategyInterface
 from app.models import Card, User
+from app.subscription_service import user_cards_subquery
 import random
 
 
@@ -13,16 +14,11 @@ class TestUnfamiliarStrategy(TestStrategyInterface):
         # Use provided threshold or default to 0.5 (50%)
         accuracy_threshold = threshold if threshold is not None else 0.5
 
-        from app.models import Deck
-        query = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language,
-            Card.accuracy < accuracy_threshold
+        user_cards = user_cards_subquery(user_id, user_language, deck_ids or None)
+        query = self.db.query(user_cards).filter(
+            user_cards.c.accuracy < accuracy_threshold
         )
 
-        if deck_ids:
-            query = query.filter(Card.deck_id.in_(deck_ids))
-
         cards = query.all()
         random.shuffle(cards)
         return cards[:limit]
@@ -35,25 +31,16 @@ class TestUnfamiliarStrategy(TestStrategyInterface):
         # Use provided threshold or default to 0.5 (50%)
         accuracy_threshold = threshold if threshold is not None else 0.5
 
-        from app.models import Deck
-        unfamiliar_query = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language,
-            Card.accuracy < accuracy_threshold
-        )
-
-        base_query = self.db.query(Card).join(Deck).filter(
-            Deck.user_id == user_id,
-            Deck.language == user_language
+        user_cards = user_cards_subquery(user_id, user_language, deck_ids or None)
+        unfamiliar_query = self.db.query(user_cards).filter(
+            user_cards.c.accuracy < accuracy_threshold
         )
 
-        if deck_ids:
-            unfamiliar_query = unfamiliar_query.filter(Card.deck_id.in_(deck_ids))
-            base_query = base_query.filter(Card.deck_id.in_(deck_ids))
+        base_query = self.db.query(user_cards)
 
         available_cards = unfamiliar_query.count()
         total_cards = base_query.count()
-        newly_added_count = base_query.filter(Card.total_attempts == 0).count()
+        newly_added_count = base_query.filter(user_cards.c.total_attempts == 0).count()
 
         return {
             "available_cards": available_cards,
@@ -0,0 +1,184 @@
+"""
+Server-side state of study sessions in progress.
+
+Creating a session stores the sampled cards in the shared cache (Redis) with a
+TTL: each card's response columns plus whether it is one of the user's own
+cards or inherited from a subscribed deck. Completion checks the submitted
+results against this list and updates statistics in bulk without looking
+cards up one by one, and an interrupted session is resumed from it without
+sampling again. The user's most recent session is remembered, so a client
+that lost the session id can still resume.
+
+Cards answered one at a time (see app.answer_buffer) are tracked in a set
+next to the session, so each is recorded once and resuming skips them.
+Completing a session first claims it (SET NX), so concurrent completions of
+the same session record its results once.
+
+Sessions need Redis: every worker must see them, so there is no per-process
+fallback and the store raises StudySessionsUnavailableError (503) instead.
+"""
+
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import logging
+
+import redis
+from pydantic import BaseModel
+
+from app.cache import pack, redis_client, unpack
+
+logger = logging.getLogger(__name__)
+
+STUDY_SESSION_TTL_SECONDS = 6 * 3600
+
+
+def _session_key(user_id: str, session_id: str) -> str:
+    return f"study_session:{user_id}:{session_id}"
+
+
+def _latest_key(user_id: str) -> str:
+    return f"study_session:{user_id}:latest"
+
+
+def _answered_key(user_id: str, session_id: str) -> str:
+    return f"study_session:{user_id}:{session_id}:answered"
+
+
+def _completion_key(user_id: str, session_id: str) -> str:
+    return f"study_session:{user_id}:{session_id}:completing"
+
+
+class StudySessionsUnavailableError(Exception):
+    """The shared store study sessions live in (Redis) is not available"""
+
+
+class StoredStudySession(BaseModel):
+    session_id: str
+    user_id: str
+    test_type: str
+    deck_id: int
+    started_at: datetime
+    expires_at: datetime
+    # CARD_LIST_COLUMNS values of the sampled cards, in the order they are studied
+    cards: List[List[Any]] = []
+    # Card ids inherited from subscribed decks (the rest are the user's own)
+    inherited: List[int] = []
+
+    def ownership(self) -> Dict[int, Tuple[int, bool]]:
+        """Card id -> (deck id, inherited) for every card of the session"""
+        inherited = set(self.inherited)
+        return {row[0]: (row[1], row[0] in inherited) for row in self.cards}
+
+
+class StudySessionStore:
+    """Study sessions kept in Redis, one hash per session"""
+
+    def __init__(self, client: Optional[redis.Redis], ttl: int = STUDY_SESSION_TTL_SECONDS):
+        self.client = client
+        self.ttl = ttl
+
+    @contextmanager
+    def _redis(self, action: str):
+        """The Redis client, with connection errors raised as StudySessionsUnavailableError"""
+        if not self.client:
+            raise StudySessionsUnavailableError("Study sessions are unavailable: Redis is not configured")
+        try:
+            yield self.client
+        except redis.RedisError as e:
+            logger.error(f"Failed to {action}: {e}")
+            raise StudySessionsUnavailableError("Study sessions are temporarily unavailable") from e
+
+    def create(self, user_id: str, test_type: str, deck_id: int, cards: List[Sequence],
+               inherited: List[int]) -> StoredStudySession:
+        started_at = datetime.now()
+        session = StoredStudySession(
+            session_id=uuid.uuid4().hex,
+            user_id=user_id,
+            test_type=test_type,
+            deck_id=deck_id,
+            started_at=started_at,
+            expires_at=started_at + timedelta(seconds=self.ttl),
+            cards=[list(row) for row in cards],
+            inherited=list(inherited)
+        )
+        key = _session_key(user_id, session.session_id)
+        with self._redis(f"store study session {session.session_id}") as client:
+            pipe = client.pipeline()
+            pipe.hset(key, mapping={
+                "meta": pack([test_type, deck_id, started_at, session.expires_at]),
+                "cards": pack(session.cards),
+                "inherited": pack(session.inherited)
+            })
+            pipe.expire(key, self.ttl)
+            pipe.delete(_latest_key(user_id))
+            pipe.hset(_latest_key(user_id), mapping={"session_id": session.session_id})
+            pipe.expire(_latest_key(user_id), self.ttl)
+            pipe.execute()
+        return session
+
+    def get(self, user_id: str, session_id: str) -> Optional[StoredStudySession]:
+        """The user's session, or None if it doesn't exist (or expired, or belongs to someone else)"""
+        with self._redis(f"read study session {session_id}") as client:
+            fields = client.hgetall(_session_key(user_id, session_id))
+        if not fields:
+            return None
+        test_type, deck_id, started_at, expires_at = unpack(fields[b"meta"])
+        return StoredStudySession(
+            session_id=session_id,
+            user_id=user_id,
+            test_type=test_type,
+            deck_id=deck_id,
+            started_at=started_at,
+            expires_at=expires_at,
+            cards=unpack(fields[b"cards"]),
+            inherited=unpack(fields[b"inherited"])
+        )
+
+    def latest(self, user_id: str) -> Optional[StoredStudySession]:
+        """The user's most recently created session, if it is still open"""
+        with self._redis("read the latest study session") as client:
+            session_id = client.hget(_latest_key(user_id), "session_id")
+        return self.get(user_id, session_id.decode()) if session_id else None
+
+    def mark_answered(self, user_id: str, session_id: str, card_id: int) -> Optional[int]:
+        """Record that a card of the session was answered: the number answered so far, or None if it already was"""
+        key = _answered_key(user_id, session_id)
+        with self._redis(f"record answer of session {session_id}") as client:
+            pipe = client.pipeline()
+            pipe.sadd(key, card_id)
+            pipe.scard(key)
+            pipe.expire(key, self.ttl)
+            added, answered, _ = pipe.execute()
+        return answered if added else None
+
+    def unmark_answered(self, user_id: str, session_id: str, card_id: int):
+        """Undo mark_answered for an answer that couldn't be recorded, so the client can retry it"""
+        with self._redis(f"undo answer of session {session_id}") as client:
+            client.srem(_answered_key(user_id, session_id), card_id)
+
+    def answered(self, user_id: str, session_id: str) -> Set[int]:
+        with self._redis(f"read answers of session {session_id}") as client:
+            return {int(card_id) for card_id in client.smembers(_answered_key(user_id, session_id))}
+
+    def claim_completion(self, user_id: str, session_id: str) -> bool:
+        """Claim the session for completion; False if another request already has"""
+        with self._redis(f"claim study session {session_id}") as client:
+            return bool(client.set(_completion_key(user_id, session_id), 1, nx=True, ex=self.ttl))
+
+    def release_completion(self, user_id: str, session_id: str):
+        """Give up a claim whose completion failed, so the client can retry"""
+        try:
+            with self._redis(f"release study session {session_id}") as client:
+                client.delete(_completion_key(user_id, session_id))
+        except StudySessionsUnavailableError:
+            pass
+
+    def delete(self, user_id: str, session_id: str):
+        """Close the session; its completion claim stays until it expires, so late completions find nothing"""
+        with self._redis(f"delete study session {session_id}") as client:
+            client.delete(_session_key(user_id, session_id), _answered_key(user_id, session_id))
+
+
+study_sessions = StudySessionStore(redis_client)
@@ -0,0 +1,341 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import and_, delete, exists, false, func, insert, or_, select, union_all, update
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import Subquery
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.models import Deck as DeckORM, Card as CardORM, User as UserORM, CardReviewState as CardReviewStateORM
+from app.schemas import DeckWithCardsResponse, Card as CardSchema
+from app.card_serialization import CARD_LIST_COLUMNS
+from app.sync_log import record_card_deletions, record_card_deletions_from_select
+from app.user_deck_cache import note_deck_changes
+
+logger = logging.getLogger(__name__)
+
+_Subscriber = aliased(DeckORM, name="subscriber")
+_Source = aliased(CardORM, name="source_card")
+_SourceDeck = aliased(DeckORM, name="source_deck")
+
+
+def _subscribed_cards_select(*conditions, published_only: bool = True):
+    """
+    Source cards of subscribed decks as seen by the subscriber, in CARD_LIST_COLUMNS order
+
+    Review statistics come from the subscriber's review state (zero when the card
+    was never reviewed). Hidden cards and cards the subscriber has materialized
+    into its own rows are left out. ``conditions`` filter the subscribing decks
+    (via the ``_Subscriber`` alias).
+
+    Only public source decks are read: deleting a deck or its author's account
+    unpublishes it, so its cards stop reaching subscribers until the reaper or
+    purge detaches them. Detaching passes published_only=False to copy the cards.
+    """
+    state = CardReviewStateORM
+    stmt = select(
+        _Source.id.label("id"),
+        _Subscriber.id.label("deck_id"),
+        _Source.front.label("front"),
+        _Source.back.label("back"),
+        func.coalesce(state.accuracy, 0.0).label("accuracy"),
+        func.coalesce(state.total_attempts, 0).label("total_attempts"),
+        func.coalesce(state.correct_answers, 0).label("correct_answers"),
+        state.last_reviewed_at.label("last_reviewed_at"),
+        _Source.created_at.label("created_at"),
+        _Source.audio_path.label("audio_path"),
+        _Source.custom_data.label("custom_data"),
+    ).select_from(_Subscriber).join(
+        _Source, _Source.deck_id == _Subscriber.subscribed_deck_id
+    ).outerjoin(
+        state, and_(state.deck_id == _Subscriber.id, state.card_id == _Source.id)
+    ).where(
+        _Subscriber.subscribed_deck_id.isnot(None),
+        or_(state.hidden.is_(None), state.hidden == false()),
+        ~exists().where(CardORM.deck_id == _Subscriber.id, CardORM.source_card_id == _Source.id),
+        *conditions
+    )
+    if published_only:
+        stmt = stmt.join(_SourceDeck, _SourceDeck.id == _Subscriber.subscribed_deck_id).where(
+            _SourceDeck.is_public == True
+        )
+    return stmt
+
+
+def user_cards_subquery(user_id: str, language: Optional[str] = None,
+                        deck_ids: Optional[Iterable[int]] = None,
+                        changed_since: Optional[datetime] = None,
+                        all_cards_of: Iterable[int] = ()) -> Subquery:
+    """
+    Every card a user studies: cards of their own decks plus the source cards of decks they subscribe to
+
+    Columns match CARD_LIST_COLUMNS (by name and order). Query it in place of
+    ``Card`` joined to ``Deck`` wherever cards are read per user.
+
+    With changed_since, only cards changed after it are included (for
+    inherited cards, a change to the source card or a review), except that
+    every card of the decks in all_cards_of is.
+    """
+    own_conditions = [DeckORM.user_id == user_id]
+    subscriber_conditions = [_Subscriber.user_id == user_id]
+    if language:
+        own_conditions.append(DeckORM.language == language)
+        subscriber_conditions.append(_Subscriber.language == language)
+    if deck_ids is not None:
+        deck_ids = list(deck_ids)
+        own_conditions.append(DeckORM.id.in_(deck_ids))
+        subscriber_conditions.append(_Subscriber.id.in_(deck_ids))
+    if changed_since is not None:
+        all_cards_of = list(all_cards_of)
+        own_conditions.append(or_(CardORM.updated_at > changed_since, DeckORM.id.in_(all_cards_of)))
+        subscriber_conditions.append(or_(
+            _Source.updated_at > changed_since,
+            CardReviewStateORM.last_reviewed_at > changed_since,
+            _Subscriber.id.in_(all_cards_of)
+        ))
+
+    own_cards = select(*CARD_LIST_COLUMNS).join(DeckORM, CardORM.deck_id == DeckORM.id).where(*own_conditions)
+    return union_all(own_cards, _subscribed_cards_select(*subscriber_conditions)).subquery("user_cards")
+
+
+def deck_cards_subquery(deck_ids: List[int]) -> Subquery:
+    """Cards of the given decks, including the inherited cards of subscribed ones (CARD_LIST_COLUMNS)"""
+    own_cards = select(*CARD_LIST_COLUMNS).where(CardORM.deck_id.in_(deck_ids))
+    return union_all(own_cards, _subscribed_cards_select(_Subscriber.id.in_(deck_ids))).subquery("deck_cards")
+
+
+class SubscriptionService:
+    """
+    Copy-on-write subscriptions to public decks.
+
+    A subscribed deck owns no card rows for the content it inherits. It points at
+    the source deck through ``Deck.subscribed_deck_id`` and keeps per-user
+    review statistics in ``card_review_states``, one small row per card the user
+    has actually reviewed or removed. Editing an inherited card materializes it
+    as a regular card of the subscribing deck (``Card.source_card_id`` records
+    where it came from), so storage grows only with what the user changes.
+
+    A user subscribes to a deck at most once (enforced by a unique index) and
+    never to their own decks, so each inherited card belongs to exactly one of
+    the user's decks.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def subscribe(self, public_deck_id: int, user_id: str) -> DeckWithCardsResponse:
+        """Create a deck that reads its cards from a public deck instead of copying them"""
+        try:
+            source_deck_with_author = self.db.query(DeckORM, UserORM).join(
+                UserORM, DeckORM.user_id == UserORM.uid
+            ).filter(
+                DeckORM.id == public_deck_id,
+                DeckORM.is_public == True
+            ).first()
+
+            if not source_deck_with_author:
+                raise Exception("Public deck not found")
+
+            source_deck, original_author = source_deck_with_author
+            if source_deck.user_id == user_id:
+                raise Exception("Cannot subscribe to your own deck")
+            already_subscribed = self.db.query(DeckORM.id).filter(
+                DeckORM.user_id == user_id,
+                DeckORM.subscribed_deck_id == public_deck_id
+            ).first()
+            if already_subscribed:
+                raise Exception("Already subscribed to this deck")
+
+            new_deck = DeckORM(
+                name=source_deck.name,
+                is_public=False,  # Always create as private
+                user_id=user_id,
+                language=source_deck.language,
+                created_at=datetime.now(),
+                progress=0.0,
+                card_count=source_deck.card_count,
+                original_author_name=original_author.name or original_author.email.split('@')[0],  # Use name or email prefix
+                copied_from_deck_id=public_deck_id,
+                subscribed_deck_id=public_deck_id,
+                custom_fields=source_deck.custom_fields
+            )
+            self.db.add(new_deck)
+            self.db.commit()
+            self.db.refresh(new_deck)
+
+            cards = self.db.execute(
+                _subscribed_cards_select(_Subscriber.id == new_deck.id).order_by(_Source.id)
+            ).all()
+
+            return DeckWithCardsResponse(
+                id=new_deck.id,
+                name=new_deck.name,
+                is_public=new_deck.is_public,
+                created_at=new_deck.created_at,
+                last_modified=new_deck.last_modified,
+                progress=new_deck.progress,
+                card_count=new_deck.card_count,
+                custom_fields=new_deck.custom_fields,
+                cards=[CardSchema.model_validate(card) for card in cards]
+            )
+
+        except IntegrityError:
+            # A concurrent subscription to the same deck won
+            self.db.rollback()
+            raise Exception("Already subscribed to this deck")
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error(f"Failed to subscribe to public deck {public_deck_id}: {str(e)}")
+            raise Exception(f"Failed to subscribe to public deck: {str(e)}")
+
+    def _get_inherited_card(self, deck: DeckORM, card_id: int) -> Optional[tuple]:
+        return self.db.execute(
+            _subscribed_cards_select(_Subscriber.id == deck.id, _Source.id == card_id)
+        ).first()
+
+    def inherited_card_changed(self, deck: DeckORM, card_id: int, card_data) -> Optional[bool]:
+        """Whether card_data differs from an inherited card's content (None if the card is not inherited)"""
+        inherited = self._get_inherited_card(deck, card_id)
+        if not inherited:
+            return None
+        return (inherited.front, inherited.back, inherited.custom_data) != (
+            card_data.front, card_data.back, getattr(card_data, 'custom_data', None)
+        )
+
+    def materialize_card(self, deck: DeckORM, card_id: int) -> Optional[CardORM]:
+        """Turn an inherited card into a card owned by the subscribing deck, keeping its statistics"""
+        if not deck.subscribed_deck_id:
+            return None
+
+        inherited = self._get_inherited_card(deck, card_id)
+        if not inherited:
+            return None
+
+        card = CardORM(
+            deck_id=deck.id,
+            source_card_id=inherited.id,
+            front=inherited.front,
+            back=inherited.back,
+            accuracy=inherited.accuracy,
+            total_attempts=inherited.total_attempts,
+            correct_answers=inherited.correct_answers,
+            last_reviewed_at=inherited.last_reviewed_at,
+            created_at=inherited.created_at,
+            audio_path=inherited.audio_path,
+            custom_data=inherited.custom_data
+        )
+        self.db.add(card)
+        self.db.execute(
+            delete(CardReviewStateORM).where(
+                CardReviewStateORM.deck_id == deck.id,
+                CardReviewStateORM.card_id == card_id
+            )
+        )
+        # To sync clients the inherited card is replaced by the new one
+        record_card_deletions(self.db, deck.user_id, deck.id, [card_id])
+        self.db.flush()
+        logger.info(f"Materialized card {card_id} into subscribed deck {deck.id} as card {card.id}")
+        return card
+
+    def hide_card(self, deck: DeckORM, card_id: int) -> Optional[float]:
+        """Remove an inherited card from a subscribing deck, returning its accuracy (None if not inherited)"""
+        inherited = self._get_inherited_card(deck, card_id) if deck.subscribed_deck_id else None
+        if not inherited:
+            return None
+
+        state = self.db.get(CardReviewStateORM, (deck.id, card_id))
+        if state is None:
+            state = CardReviewStateORM(deck_id=deck.id, card_id=card_id, accuracy=0.0,
+                                       total_attempts=0, correct_answers=0)
+            self.db.add(state)
+        state.hidden = True
+        return inherited.accuracy
+
+    def review_states(self, user_id: str, card_ids: List[int]) -> Dict[Tuple[int, int], CardReviewStateORM]:
+        """
+        Review state rows (created on first review) for inherited cards of the user's subscribed decks
+
+        Keyed by (subscribing deck id, source card id).
+        """
+        if not card_ids:
+            return {}
+
+        visible = self.db.execute(
+            select(_Source.id, _Subscriber.id).select_from(_Subscriber).join(
+                _Source, _Source.deck_id == _Subscriber.subscribed_deck_id
+            ).where(
+                _Subscriber.user_id == user_id,
+                _Source.id.in_(card_ids)
+            )
+        ).all()
+        if not visible:
+            return {}
+
+        existing = {
+            (state.deck_id, state.card_id): state
+            for state in self.db.query(CardReviewStateORM).filter(
+                CardReviewStateORM.deck_id.in_({deck_id for _, deck_id in visible}),
+                CardReviewStateORM.card_id.in_({card_id for card_id, _ in visible})
+            )
+        }
+
+        states = {}
+        for card_id, deck_id in visible:
+            state = existing.get((deck_id, card_id))
+            if state is None:
+                state = CardReviewStateORM(deck_id=deck_id, card_id=card_id, accuracy=0.0,
+                                           total_attempts=0, correct_answers=0, hidden=False)
+                self.db.add(state)
+            if not state.hidden:
+                states[(deck_id, card_id)] = state
+        return states
+
+    def detach(self, deck_ids: List[int]) -> int:
+        """
+        Materialize every inherited card of the given subscribing decks and end their subscriptions
+
+        Runs set-based (one INSERT ... SELECT for all decks). Used before a source
+        deck is deleted, when it is taken private and when a subscribed deck is
+        published.
+        """
+        if not deck_ids:
+            return 0
+
+        inherited = _subscribed_cards_select(_Subscriber.id.in_(deck_ids), published_only=False).subquery()
+        result = self.db.execute(
+            insert(CardORM).from_select(
+                [CardORM.deck_id, CardORM.source_card_id, CardORM.front, CardORM.back, CardORM.accuracy,
+                 CardORM.total_attempts, CardORM.correct_answers, CardORM.last_reviewed_at,
+                 CardORM.created_at, CardORM.audio_path, CardORM.custom_data],
+                select(
+                    inherited.c.deck_id, inherited.c.id, inherited.c.front, inherited.c.back,
+                    inherited.c.accuracy, inherited.c.total_attempts, inherited.c.correct_answers,
+                    inherited.c.last_reviewed_at, inherited.c.created_at, inherited.c.audio_path,
+                    inherited.c.custom_data
+                )
+            )
+        )
+        # Materialized cards get new ids, so sync clients drop the inherited ones
+        record_card_deletions_from_select(
+            self.db,
+            select(DeckORM.user_id, inherited.c.deck_id, inherited.c.id).select_from(inherited).join(
+                DeckORM, DeckORM.id == inherited.c.deck_id
+            )
+        )
+        self.db.execute(delete(CardReviewStateORM).where(CardReviewStateORM.deck_id.in_(deck_ids)))
+        self.db.execute(
+            update(DeckORM).where(DeckORM.id.in_(deck_ids)).values(
+                subscribed_deck_id=None, version=DeckORM.version + 1
+            ).execution_options(synchronize_session="fetch")
+        )
+        note_deck_changes(self.db, deck_ids)
+        logger.info(f"Detached {len(deck_ids)} subscribed decks, materializing {result.rowcount} cards")
+        return result.rowcount
+
+    def detach_subscribers(self, source_deck_ids) -> int:
+        """Detach every deck subscribed to the given source decks (before they are deleted or taken private)"""
+        subscriber_ids = self.db.scalars(
+            select(DeckORM.id).where(DeckORM.subscribed_deck_id.in_(source_deck_ids))
+        ).all()
+        return self.detach(list(subscriber_ids))
@@ -0,0 +1,48 @@
+"""
+Deletion log for delta sync (see app.delta_sync).
+
+Rows that are deleted can't be found by a "changed since" query, so every
+code path that removes a card from a deck, or a deck, records a
+``SyncTombstone`` in the same transaction. Removals of a public deck's cards
+are logged once, against that deck; subscribers pick them up from there.
+"""
+
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import insert, literal
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.models import SyncTombstone as SyncTombstoneORM
+
+
+def record_card_deletions(db: Session, user_id: str, deck_id: int, card_ids: Iterable[int]):
+    deleted_at = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "deck_id": deck_id, "card_id": card_id, "deleted_at": deleted_at}
+        for card_id in card_ids
+    ]
+    if rows:
+        db.execute(insert(SyncTombstoneORM), rows)
+
+
+def record_deck_deletions(db: Session, user_id: str, deck_ids: Iterable[int]):
+    """Log whole decks as deleted (card_id NULL); their cards need no entries of their own"""
+    deleted_at = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "deck_id": deck_id, "card_id": None, "deleted_at": deleted_at}
+        for deck_id in deck_ids
+    ]
+    if rows:
+        db.execute(insert(SyncTombstoneORM), rows)
+
+
+def record_card_deletions_from_select(db: Session, rows: Select):
+    """Log removals set-based from a select of (user_id, deck_id, card_id) rows"""
+    db.execute(
+        insert(SyncTombstoneORM).from_select(
+            ["user_id", "deck_id", "card_id", "deleted_at"],
+            rows.add_columns(literal(datetime.utcnow()))
+        )
+    )
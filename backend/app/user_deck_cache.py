@@ -0,0 +1,117 @@
+"""
+Read-through cache of a user's decks and card lists.
+
+``DeckService.get_user_decks``, ``get_user_deck_cards`` and
+``get_all_user_cards`` results are kept in Redis, msgpack-encoded, under keys
+that embed a per-user version. Session events collect the users whose data a
+transaction changed (owners of changed decks, cards and review states, plus
+subscribers of changed decks) and advance their versions when it commits, so
+every cached entry of a user goes stale at once, without tracking keys.
+
+Bulk statements bypass the unit of work; the code issuing them reports the
+decks or users it changed with ``note_deck_changes`` / ``note_user_changes``
+(``app.deck_versions.bump_deck_versions`` does so for every version bump).
+
+Without Redis the cache is bypassed: per-process fallbacks can't see
+invalidations made by other workers.
+"""
+
+import hashlib
+import json
+from typing import Any, Callable, Iterable
+import logging
+
+from sqlalchemy import event, or_, select
+
+from app.cache import blob_cache, pack, redis_client, unpack, version_counters
+from app.database import SessionLocal
+from app.models import Deck as DeckORM, Card as CardORM, CardReviewState as CardReviewStateORM, User as UserORM
+
+logger = logging.getLogger(__name__)
+
+USER_DECKS_PREFIX = "user_decks"
+USER_DECK_CACHE_TTL_SECONDS = 900
+
+_CHANGED_DECKS = "user_decks_changed_decks"
+_CHANGED_USERS = "user_decks_changed_users"
+
+
+def _version_key(user_id: str) -> str:
+    return f"{USER_DECKS_PREFIX}:version:{user_id}"
+
+
+def cached_user_data(user_id: str, name: str, params: tuple, build: Callable[[], Any]) -> Any:
+    """
+    Value of build() for a user, from the cache when the user's data is unchanged since it was stored
+
+    build must return plain data (lists, tuples, dicts, scalars, datetimes);
+    tuples come back from the cache as lists.
+    """
+    if redis_client is None:
+        return build()
+
+    version = version_counters.tag(_version_key(user_id))
+    params_key = hashlib.sha1(json.dumps(params, default=str).encode("utf-8")).hexdigest()[:20]
+    key = f"{USER_DECKS_PREFIX}:{user_id}:{version}:{name}:{params_key}"
+
+    entry = blob_cache.get(key)
+    if entry is not None:
+        return unpack(entry["data"])
+
+    value = build()
+    blob_cache.set(key, {"data": pack(value)}, ttl=USER_DECK_CACHE_TTL_SECONDS)
+    return value
+
+
+def note_deck_changes(session, deck_ids: Iterable[int]):
+    """Invalidate the cached data of the decks' owners and subscribers when session's transaction commits"""
+    session.info.setdefault(_CHANGED_DECKS, set()).update(deck_ids)
+
+
+def note_user_changes(session, user_ids: Iterable[str]):
+    """Invalidate the users' cached data when session's transaction commits"""
+    session.info.setdefault(_CHANGED_USERS, set()).update(user_ids)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _track_user_deck_changes(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, DeckORM):
+            note_user_changes(session, [obj.user_id])
+            if obj.id is not None:
+                note_deck_changes(session, [obj.id])
+        elif isinstance(obj, (CardORM, CardReviewStateORM)) and obj.deck_id is not None:
+            note_deck_changes(session, [obj.deck_id])
+        elif isinstance(obj, UserORM):
+            # e.g. a new selected language picks other decks
+            note_user_changes(session, [obj.uid])
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _resolve_changed_decks(session):
+    # Flush first so the unit of work reports its changes before they are resolved
+    session.flush()
+    deck_ids = session.info.pop(_CHANGED_DECKS, None)
+    if not deck_ids:
+        return
+    # Core select on the table, so tombstoned decks (hidden from ORM queries) count too
+    decks = DeckORM.__table__
+    owners = session.execute(
+        select(decks.c.user_id).distinct().where(
+            or_(decks.c.id.in_(deck_ids), decks.c.subscribed_deck_id.in_(deck_ids))
+        )
+    ).scalars()
+    note_user_changes(session, owners)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_user_versions(session):
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        if user_id:
+            version_counters.bump(_version_key(user_id))
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_user_deck_changes(session):
+    session.info.pop(_CHANGED_DECKS, None)
+    session.info.pop(_CHANGED_USERS, None)
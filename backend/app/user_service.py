@@ -1,12 +1,20 @@
 from datetime import datetime
 from typing import Optional
+import logging
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from firebase_admin import auth
 
-from app.models import User as UserORM
+from app.auth_middleware import record_token_revocation
+from app.models import User as UserORM, Deck
 from app.schemas import UserCreate, UserUpdate
 
+logger = logging.getLogger(__name__)
+
+
+class AccountDeletedError(Exception):
+    """The account was deleted (its data may still be being purged)"""
+
 
 class UserService:
     def __init__(self, db: Session):
@@ -72,6 +80,9 @@ class UserService:
         # Try to get existing user
         existing_user = self.get_user_by_uid(uid)
         if existing_user:
+            if existing_user.deleted_at:
+                raise AccountDeletedError("Account has been deleted")
+
             # Update user info if it has changed
             needs_update = False
             if existing_user.email != email and email:
@@ -97,54 +108,39 @@ class UserService:
         )
         return self.create_user(user_data)
 
-    def delete_user(self, uid: str) -> bool:
-        """Delete user and all related data with proper cascading"""
+    def delete_user(self, uid: str) -> Optional[UserORM]:
+        """
+        Mark a user as deleted; their data is removed afterwards by app.account_purge
+
+        The account stops working at once: its decks leave the public catalog,
+        the Firebase login is disabled and its tokens are revoked. Returns None
+        if the user doesn't exist.
+        """
         try:
             db_user = self.get_user_by_uid(uid)
             if not db_user:
-                return False
-
-            # Start a transaction for atomic deletion
-            # Delete related data in correct order (child tables first)
-
-            # 1. Delete study sessions
-            from app.models import StudySession
-            self.db.query(StudySession).filter(StudySession.user_id == uid).delete()
-
-            # 2. Delete analytics records
-            from app.models import TestAnalytics
-            self.db.query(TestAnalytics).filter(TestAnalytics.user_id == uid).delete()
-
-            # 3. Delete cards from user's decks (cards reference decks)
-            from app.models import Deck, Card
-            user_deck_ids = [deck.id for deck in db_user.decks]
-            if user_deck_ids:
-                self.db.query(Card).filter(Card.deck_id.in_(user_deck_ids)).delete()
-
-            # 4. Delete user's decks
-            self.db.query(Deck).filter(Deck.user_id == uid).delete()
-
-            # 5. Finally delete the user from database
-            self.db.delete(db_user)
+                return None
+            if db_user.deleted_at:
+                return db_user
 
-            # Commit database changes first
+            db_user.deleted_at = datetime.utcnow()
+            for deck in self.db.query(Deck).filter(Deck.user_id == uid, Deck.is_public == True):
+                deck.is_public = False
             self.db.commit()
+            self.db.refresh(db_user)
+            # Keeps the tokens out once the purge has removed the row
+            record_token_revocation(uid)
 
-            # 6. Try to delete Firebase user (after DB commit succeeds)
             try:
-                auth.delete_user(uid)
+                auth.update_user(uid, disabled=True)
+                # Issued ID tokens stay valid until they expire unless revoked
+                auth.revoke_refresh_tokens(uid)
             except Exception as firebase_error:
-                # Log the Firebase error but don't fail the entire operation
-                # since the database deletion already succeeded
-                print(f"Warning: Failed to delete Firebase user {uid}: {firebase_error}")
-                # You might want to use proper logging here instead of print
+                # Requests with the user's tokens are refused by deleted_at until the purge removes the row
+                logger.warning(f"Failed to disable Firebase user {uid}: {firebase_error}")
 
-            return True
+            return db_user
 
         except SQLAlchemyError as e:
             self.db.rollback()
             raise Exception(f"Failed to delete user: {str(e)}")
-        except Exception as e:
-            # If we reach here, database deletion succeeded but Firebase deletion failed
-            # This is logged above, so we still return True as the core deletion succeeded
-            return True
\ No newline at end of file
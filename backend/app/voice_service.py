@@ -4,10 +4,11 @@ import hashlib
 import requests
 import redis
 import time
-from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 import logging
 
+from app.voice_storage import VoiceStorage, VOICES_PREFIX, voice_storage
+
 logger = logging.getLogger(__name__)
 
 # Supported languages for Google TTS
@@ -24,7 +25,8 @@ SUPPORTED_TTS_LANGUAGES = {
 
 
 class VoiceGenerator:
-    def __init__(self, redis_host: str = None, redis_port: int = 6379, redis_db: int = 0, use_redis: bool = True):
+    def __init__(self, redis_host: str = None, redis_port: int = 6379, redis_db: int = 0, use_redis: bool = True,
+                 storage: VoiceStorage = None):
         """
         Initialize VoiceGenerator with optional Redis connection
         
@@ -33,7 +35,9 @@ class VoiceGenerator:
             redis_port: Redis server port  
             redis_db: Redis database number
             use_redis: Whether to use Redis caching
+            storage: Voice file storage backend (defaults to the configured global backend)
         """
+        self.storage = storage or voice_storage
         self.use_redis = use_redis
         self.memory_cache = {}  # Fallback in-memory cache
         
@@ -64,6 +68,10 @@ class VoiceGenerator:
     def _generate_cache_key(self, lang: str, cleaned_word: str) -> str:
         """Generate Redis cache key"""
         return f"voice:{lang}:{cleaned_word}"
+
+    def _path_index_key(self, path: str) -> str:
+        """Redis key mapping an audio path back to the cache key that points at it"""
+        return f"voice_path:{path}"
     
     def is_language_supported(self, lang: str) -> bool:
         """Check if language is supported for TTS"""
@@ -73,17 +81,17 @@ class VoiceGenerator:
         """Get the correct TTS language code for Google API"""
         return SUPPORTED_TTS_LANGUAGES.get(lang, lang)
     
-    def _generate_file_path(self, lang: str, cleaned_word: str) -> Path:
-        """Generate file path using SHA1 hash"""
+    def _generate_storage_key(self, lang: str, cleaned_word: str) -> str:
+        """Generate storage key using SHA1 hash, e.g. voices/en/<sha1>.mp3"""
         sha1_hash = hashlib.sha1(cleaned_word.encode('utf-8')).hexdigest()
-        # Use absolute path to ensure consistency
-        base_dir = Path(__file__).parent.parent  # Go up to backend directory
-        voices_dir = base_dir / "voices" / lang
-        voices_dir.mkdir(parents=True, exist_ok=True)
-        return voices_dir / f"{sha1_hash}.mp3"
+        return f"{VOICES_PREFIX}{lang}/{sha1_hash}.mp3"
     
     def _download_voice(self, lang: str, cleaned_word: str) -> str:
-        """Download voice from Google TTS API"""
+        """Download voice from Google TTS API unless another node already stored it"""
+        storage_key = self._generate_storage_key(lang, cleaned_word)
+        if self.storage.exists(storage_key):
+            return storage_key
+        
         tts_lang_code = self._get_tts_language_code(lang)
         params = {
             'ie': 'UTF-8',
@@ -95,14 +103,11 @@ class VoiceGenerator:
         response = requests.get(self.tts_url, params=params, headers=self.headers, timeout=10)
         response.raise_for_status()
         
-        # Save to file
-        file_path = self._generate_file_path(lang, cleaned_word)
-        with open(file_path, 'wb') as f:
-            f.write(response.content)
-        
-        logger.info(f"Downloaded TTS for '{cleaned_word}' in {lang} to {file_path}")
-        # Return relative path for consistency with database storage
-        return str(file_path.relative_to(Path(__file__).parent.parent))
+        # Write-once: if a concurrent request stored it first, keep that copy
+        if self.storage.put(storage_key, response.content):
+            logger.info(f"Downloaded TTS for '{cleaned_word}' in {lang} to {storage_key}")
+        # Storage key doubles as the relative path stored in the database
+        return storage_key
     
     def get_voice(self, lang: str, word: str) -> Optional[str]:
         """
@@ -132,22 +137,19 @@ class VoiceGenerator:
             else:
                 cached_path = self.memory_cache.get(cache_key)
             
-            # 4. If cached and file exists, return cached path
-            if cached_path:
-                # Handle both absolute and relative paths
-                if os.path.exists(cached_path):
-                    return cached_path
-                # Try with backend prefix for relative paths
-                backend_path = Path(__file__).parent.parent / cached_path
-                if backend_path.exists():
-                    return str(backend_path.relative_to(Path(__file__).parent.parent))
+            # 4. If cached and file exists in storage, return cached path
+            if cached_path and self.storage.exists(cached_path):
+                return cached_path
             
-            # 5. Download new voice file
+            # 5. Download new voice file (skipped if another node already stored it)
             file_path = self._download_voice(lang, cleaned_word)
             
-            # 6. Cache the file path
+            # 6. Cache the file path (indexed by path, so deleting the file can drop the entry)
             if self.use_redis and self.redis_client:
-                self.redis_client.set(cache_key, file_path)
+                pipe = self.redis_client.pipeline()
+                pipe.set(cache_key, file_path)
+                pipe.set(self._path_index_key(file_path), cache_key)
+                pipe.execute()
             else:
                 self.memory_cache[cache_key] = file_path
             
@@ -201,6 +203,73 @@ class VoiceGenerator:
         except Exception as e:
             logger.error(f"Failed to clear cache: {e}")
 
+    def purge_cached_paths(self, paths: set, batch_size: int = 500) -> int:
+        """
+        Remove cache entries that point at any of the given audio paths
+        
+        Args:
+            paths: Audio paths (storage keys) that no longer exist
+            batch_size: Number of keys inspected per Redis round trip
+            
+        Returns:
+            int: Number of cache entries removed
+        """
+        if not paths:
+            return 0
+
+        removed = 0
+        try:
+            if self.use_redis and self.redis_client:
+                batch = []
+                for key in self.redis_client.scan_iter(match="voice:*", count=batch_size):
+                    batch.append(key)
+                    if len(batch) >= batch_size:
+                        removed += self._purge_redis_batch(batch, paths)
+                        batch = []
+                if batch:
+                    removed += self._purge_redis_batch(batch, paths)
+            else:
+                stale_keys = [k for k, v in self.memory_cache.items() if v in paths]
+                for key in stale_keys:
+                    del self.memory_cache[key]
+                removed = len(stale_keys)
+        except Exception as e:
+            logger.error(f"Failed to purge cached paths: {e}")
+        return removed
+
+    def forget_paths(self, paths: Iterable[str]) -> int:
+        """
+        Remove the cache entries of the given (deleted) audio paths through the path index
+
+        Cheap enough to call right after each file is deleted. Entries cached
+        before the index existed are only found by purge_cached_paths; get_voice
+        checks that a cached path still exists either way.
+        """
+        paths = set(paths)
+        if not paths:
+            return 0
+
+        try:
+            if self.use_redis and self.redis_client:
+                index_keys = [self._path_index_key(path) for path in paths]
+                cache_keys = [key for key in self.redis_client.mget(index_keys) if key]
+                self.redis_client.delete(*index_keys, *cache_keys)
+                return len(cache_keys)
+            stale_keys = [k for k, v in self.memory_cache.items() if v in paths]
+            for key in stale_keys:
+                del self.memory_cache[key]
+            return len(stale_keys)
+        except Exception as e:
+            logger.error(f"Failed to drop cached paths: {e}")
+            return 0
+
+    def _purge_redis_batch(self, keys: list, paths: set) -> int:
+        values = self.redis_client.mget(keys)
+        stale_keys = [key for key, value in zip(keys, values) if value in paths]
+        if stale_keys:
+            self.redis_client.delete(*stale_keys)
+        return len(stale_keys)
+
 
 # Global instance
 voice_generator = VoiceGenerator()
\ No newline at end of file
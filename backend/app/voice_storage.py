@@ -0,0 +1,298 @@
+import os
+import posixpath
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Storage keys mirror the relative paths stored in Card.audio_path, e.g. "voices/en/<sha1>.mp3"
+VOICES_PREFIX = "voices/"
+BACKEND_DIR = Path(__file__).parent.parent
+
+
+def is_voice_key(key: str) -> bool:
+    """Whether key names a voice file: a normalized path under VOICES_PREFIX ending in .mp3"""
+    return (
+        isinstance(key, str)
+        and key.startswith(VOICES_PREFIX)
+        and key.endswith(".mp3")
+        and "\\" not in key
+        and posixpath.normpath(key) == key
+    )
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    last_modified: datetime
+
+
+class VoiceStorage(ABC):
+    """
+    Storage backend for generated voice files.
+
+    Objects are content-addressed (the key is derived from the spoken text), so
+    every backend is write-once: ``put`` never overwrites an existing object and
+    reports whether this call created it. That lets several API replicas race on
+    the same word without corrupting each other's output.
+    """
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> bool:
+        """Store data under key unless it already exists. Returns True if written."""
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def iter_objects(self, prefix: str = VOICES_PREFIX) -> Iterator[StoredObject]:
+        """Yield stored objects under prefix in ascending key order"""
+        pass
+
+    def public_url(self, key: str) -> Optional[str]:
+        """Direct URL clients can fetch the object from, if the backend exposes one"""
+        return None
+
+
+class LocalVoiceStorage(VoiceStorage):
+    """Voice files on the local filesystem (or a shared volume) under root"""
+
+    def __init__(self, root: Path = BACKEND_DIR):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        # Only the voices directory is storage; the rest of root is the application
+        path = (self.root / key).resolve()
+        if (self.root / VOICES_PREFIX).resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        try:
+            return self._path(key).is_file()
+        except ValueError:
+            return False
+
+    def put(self, key: str, data: bytes) -> bool:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file, then hard-link it into place: link() fails if the
+        # target exists, which gives atomic write-once semantics on shared volumes
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.link(tmp_name, path)
+            return True
+        except FileExistsError:
+            return False
+        except OSError as e:
+            # Volumes without hard links (some SMB/overlay mounts): exclusive create instead
+            logger.debug(f"Hard link unavailable for {key}, creating it exclusively: {e}")
+            return self._put_exclusive(path, data)
+        finally:
+            os.unlink(tmp_name)
+
+    def _put_exclusive(self, path: Path, data: bytes) -> bool:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+        except BaseException:
+            # Don't leave a truncated file behind for readers (and later puts) to trust
+            path.unlink(missing_ok=True)
+            raise
+        return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str) -> bool:
+        try:
+            self._path(key).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_objects(self, prefix: str = VOICES_PREFIX) -> Iterator[StoredObject]:
+        base = self.root / prefix
+        if not base.is_dir():
+            return
+        yield from self._walk(base)
+
+    def _walk(self, directory: Path) -> Iterator[StoredObject]:
+        # Directories and files are visited in name order so keys come out sorted
+        entries = sorted(os.scandir(directory), key=lambda e: e.name + ("/" if e.is_dir() else ""))
+        for entry in entries:
+            if entry.is_dir():
+                yield from self._walk(Path(entry.path))
+            elif entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                yield StoredObject(
+                    key=Path(entry.path).relative_to(self.root).as_posix(),
+                    size=stat.st_size,
+                    last_modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+                )
+
+
+class S3VoiceStorage(VoiceStorage):
+    """Voice files in an S3-compatible bucket shared by all API replicas"""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None,
+                 region_name: str = None, public_base_url: str = None):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("boto3 is required for the S3 voice storage backend") from e
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        self._client_error = ClientError
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region_name)
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _error_code(self, error) -> str:
+        return str(error.response.get("Error", {}).get("Code", ""))
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except self._client_error as e:
+            if self._error_code(e) in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put(self, key: str, data: bytes) -> bool:
+        if self.exists(key):
+            return False
+        try:
+            # Conditional write closes the race between replicas on stores that support it
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._object_key(key),
+                Body=data,
+                ContentType="audio/mpeg",
+                CacheControl="public, max-age=31536000, immutable",
+                IfNoneMatch="*"
+            )
+            return True
+        except self._client_error as e:
+            if self._error_code(e) in ("PreconditionFailed", "412", "ConditionalRequestConflict"):
+                return False
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+            return response["Body"].read()
+        except self._client_error as e:
+            if self._error_code(e) in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def delete(self, key: str) -> bool:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        return True
+
+    def iter_objects(self, prefix: str = VOICES_PREFIX) -> Iterator[StoredObject]:
+        # ListObjectsV2 returns keys in ascending UTF-8 byte order
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix)):
+            for item in page.get("Contents", []):
+                yield StoredObject(
+                    key=item["Key"][len(self.prefix):],
+                    size=item["Size"],
+                    last_modified=item["LastModified"]
+                )
+
+    def public_url(self, key: str) -> Optional[str]:
+        if self.public_base_url:
+            return f"{self.public_base_url}/{self._object_key(key)}"
+        return None
+
+
+class InMemoryVoiceStorage(VoiceStorage):
+    """Process-local stand-in for tests and local development without a disk or bucket"""
+
+    def __init__(self):
+        self._objects: Dict[str, Tuple[bytes, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def exists(self, key: str) -> bool:
+        return key in self._objects
+
+    def put(self, key: str, data: bytes) -> bool:
+        with self._lock:
+            if key in self._objects:
+                return False
+            self._objects[key] = (bytes(data), datetime.now(timezone.utc))
+            return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._objects.get(key)
+        return entry[0] if entry else None
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._objects.pop(key, None) is not None
+
+    def iter_objects(self, prefix: str = VOICES_PREFIX) -> Iterator[StoredObject]:
+        with self._lock:
+            items = sorted((k, v) for k, v in self._objects.items() if k.startswith(prefix))
+        for key, (data, modified) in items:
+            yield StoredObject(key=key, size=len(data), last_modified=modified)
+
+
+def create_voice_storage() -> VoiceStorage:
+    """Build the storage backend selected by VOICE_STORAGE_BACKEND (local, s3 or memory)"""
+    backend = os.getenv("VOICE_STORAGE_BACKEND", "local").lower()
+
+    if backend == "s3":
+        bucket = os.getenv("VOICE_S3_BUCKET")
+        if not bucket:
+            raise RuntimeError("VOICE_S3_BUCKET must be set when VOICE_STORAGE_BACKEND=s3")
+        logger.info(f"Using S3 voice storage in bucket {bucket}")
+        return S3VoiceStorage(
+            bucket=bucket,
+            prefix=os.getenv("VOICE_S3_PREFIX", ""),
+            endpoint_url=os.getenv("VOICE_S3_ENDPOINT_URL"),
+            region_name=os.getenv("VOICE_S3_REGION"),
+            public_base_url=os.getenv("VOICE_S3_PUBLIC_URL")
+        )
+    if backend == "memory":
+        return InMemoryVoiceStorage()
+    if backend != "local":
+        raise RuntimeError(f"Unknown voice storage backend: {backend}")
+
+    return LocalVoiceStorage(os.getenv("VOICE_STORAGE_DIR", BACKEND_DIR))
+
+
+# Global instance
+voice_storage = create_voice_storage()
@@ -0,0 +1,103 @@
+"""
+Microbenchmark: per-card cost of serializing card list responses.
+
+Compares the old path (Card.model_validate per ORM object, then FastAPI
+validating and encoding the whole list again) with the column-row fast path in
+app.card_serialization. No database is needed.
+
+Usage (from backend/):
+    python -m benchmarks.card_serialization [--cards 5000] [--repeat 5]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+
+from app.card_serialization import CARD_LIST_COLUMNS, serialize_cards
+from app.models import Card as CardORM
+from app.schemas import Card
+
+BASE_URL = "http://localhost:8000"
+
+
+def make_cards(count: int) -> List[CardORM]:
+    now = datetime.now()
+    return [
+        CardORM(
+            id=i,
+            deck_id=i % 50,
+            front=f"word {i}",
+            back=f"translation {i}",
+            accuracy=(i % 10) / 10,
+            total_attempts=i % 7,
+            correct_answers=i % 5,
+            last_reviewed_at=now - timedelta(days=i % 30) if i % 3 else None,
+            created_at=now - timedelta(days=i % 90),
+            audio_path=f"voices/en/{i:040x}.mp3" if i % 4 else None,
+            custom_data={"example_sentence": f"An example with word {i}"} if i % 2 else None,
+        )
+        for i in range(count)
+    ]
+
+
+def make_rows(cards: List[CardORM]) -> List[Row]:
+    """Rows shaped like the result of query(*CARD_LIST_COLUMNS)"""
+    from sqlalchemy.engine.result import SimpleResultMetaData
+
+    keys = [column.key for column in CARD_LIST_COLUMNS]
+    metadata = SimpleResultMetaData(keys)
+    return [
+        Row(metadata, metadata._processors, metadata._key_to_index, tuple(getattr(card, key) for key in keys))
+        for card in cards
+    ]
+
+
+def legacy_path(cards: List[CardORM]) -> bytes:
+    result = []
+    for card in cards:
+        card_schema = Card.model_validate(card)
+        card_schema.audio_url = f"{BASE_URL}/audio/{card.audio_path.replace('voices/', '')}" if card.audio_path else None
+        result.append(card_schema)
+
+    # What FastAPI does with response_model=List[Card]: dump, re-validate, encode
+    adapter = TypeAdapter(List[Card])
+    validated = adapter.validate_python([item.model_dump() for item in result])
+    return adapter.dump_json(validated)
+
+
+def fast_path(rows: List[Row]) -> bytes:
+    return serialize_cards(rows, BASE_URL)
+
+
+def bench(label: str, fn, arg, count: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - started)
+    per_card_us = best / count * 1e6
+    print(f"{label:<24} {best * 1000:9.2f} ms total   {per_card_us:7.2f} us/card")
+    return per_card_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cards = make_cards(args.cards)
+    rows = make_rows(cards)
+
+    print(f"Serializing {args.cards} cards (best of {args.repeat})")
+    legacy = bench("model_validate + FastAPI", legacy_path, cards, args.cards, args.repeat)
+    fast = bench("column rows + json", fast_path, rows, args.cards, args.repeat)
+    print(f"speedup: {legacy / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,11 +16,15 @@ import {
 import { auth } from '@/features/auth/contexts/AuthContext';
 
 const BASE_URL = import.meta.env.VITE_API_ADDRESS;
+// List endpoints are paged; the cursor of the next page comes in this header
+const NEXT_CURSOR_HEADER = 'X-Next-Cursor';
+const PAGE_SIZE = 1000;
 
 class ApiClient {
   private async request<T>(
     endpoint: string,
-    options: RequestInit = {}
+    options: RequestInit = {},
+    onResponse?: (response: Response) => void
   ): Promise<T> {
     const url = `${BASE_URL}${endpoint}`;
 
@@ -60,6 +64,7 @@ class ApiClient {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
+      onResponse?.(response);
       return await response.json();
     } catch (error) {
       console.error(`API request failed: ${endpoint}`, error);
@@ -69,7 +74,8 @@ class ApiClient {
 
   private async publicRequest<T>(
     endpoint: string,
-    options: RequestInit = {}
+    options: RequestInit = {},
+    onResponse?: (response: Response) => void
   ): Promise<T> {
     const url = `${BASE_URL}${endpoint}`;
 
@@ -88,6 +94,7 @@ class ApiClient {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
+      onResponse?.(response);
       return await response.json();
     } catch (error) {
       console.error(`Public API request failed: ${endpoint}`, error);
@@ -95,6 +102,26 @@ class ApiClient {
     }
   }
 
+  // Fetch every page of a paged list endpoint, following the next-page cursor
+  private async requestAllPages<T>(
+    endpoint: string,
+    send: (endpoint: string, options: RequestInit, onResponse: (response: Response) => void) => Promise<T[]>
+  ): Promise<T[]> {
+    const items: T[] = [];
+    const page = { cursor: null as string | null };
+    do {
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+      if (page.cursor) {
+        params.append('cursor', page.cursor);
+      }
+      const separator = endpoint.includes('?') ? '&' : '?';
+      items.push(...await send(`${endpoint}${separator}${params.toString()}`, {}, (response) => {
+        page.cursor = response.headers.get(NEXT_CURSOR_HEADER);
+      }));
+    } while (page.cursor);
+    return items;
+  }
+
   // Get all decks
   async getDecks(): Promise<Deck[]> {
     return this.request<Deck[]>('/decks');
@@ -102,12 +129,12 @@ class ApiClient {
 
   // Get cards for a specific deck
   async getDeckCards(deckId: number): Promise<Card[]> {
-    return this.request<Card[]>(`/decks/${deckId}/cards`);
+    return this.requestAllPages<Card>(`/decks/${deckId}/cards`, this.request.bind(this));
   }
 
   // Get all cards from all user's decks
   async getAllUserCards(): Promise<Card[]> {
-    return this.request<Card[]>('/decks/all/cards');
+    return this.requestAllPages<Card>('/decks/all/cards', this.request.bind(this));
   }
 
   // Start a study session (legacy - single deck)
@@ -289,12 +316,13 @@ class ApiClient {
     const queryString = params.toString();
     const endpoint = `/decks/public${queryString ? `?${queryString}` : ''}`;
 
-    return this.publicRequest<PublicDeck[]>(endpoint);
+    return this.requestAllPages<PublicDeck>(endpoint, this.publicRequest.bind(this));
   }
 
   // Get public deck cards (no authentication required)
   async getPublicDeckCards(deckId: number): Promise<Card[]> {
-    return this.publicRequest<Card[]>(`/decks/public/${deckId}/cards`);
+    // The whole deck, served from its published snapshot
+    return this.publicRequest<Card[]>(`/decks/public/${deckId}/cards?full=true`);
   }
 
   // Copy public deck to user's collection